@@ -1,20 +1,17 @@
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 import sys
 import os
-import tempfile
-import joblib
+import math
+import hashlib
+from datetime import datetime, timedelta
 
 # Získání absolutní cesty ke kořenové složce projektu
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(PROJECT_ROOT)
 
-from data_processing.pdf_text_extractor import extract_invoice_data
-from data_processing.entity_extractor import create_invoice_dataframe
-from ml_models.predict_pdf_batch import preprocess_data
-from llm_query.query_config import QUERY_CONFIG, process_query
-from rag.newsapi_client import TechNewsRAG
+# Těžké moduly (pandas, xgboost, langchain, OpenAI) se importují až na stránkách,
+# které je potřebují – úvodní stránka tak startuje bez nich
 
 # Cesty k modelu a pomocným souborům
 MODEL_PATH = os.path.join(PROJECT_ROOT, "ml_models", "xgb_model.pkl")
@@ -22,6 +19,10 @@ SCALER_PATH = os.path.join(PROJECT_ROOT, "ml_models", "scaler.pkl")
 ENCODERS_PATH = os.path.join(PROJECT_ROOT, "ml_models", "label_encoders.pkl")
 csv_path = os.path.join(PROJECT_ROOT, "utils", "synthetic_project_data.csv")
 
+# Upload do této velikosti se extrahuje v procesu aplikace – start procesů
+# by u pár faktur trval déle než samotná extrakce
+IN_PROCESS_UPLOAD_BYTES = 2 * 1024 * 1024
+
 
 # Navigace mezi stránkami
 st.sidebar.title("Navigace")
@@ -48,9 +49,51 @@ except ImportError:
 
 newsapi_key = news_key or (config.NEWSAPI_KEY if config else None)
 openai_api_key = openai_key or (config.OPENAI_API_KEY if config else None)
-
+embedding_backend = getattr(config, "EMBEDDING_BACKEND", "openai")
+vector_index_type = getattr(config, "VECTOR_INDEX_TYPE", "flat")
+vector_index_params = getattr(config, "VECTOR_INDEX_PARAMS", {})
+context_token_budget = getattr(config, "CONTEXT_TOKEN_BUDGET", 1500)
+news_refresh_seconds = getattr(config, "NEWS_REFRESH_SECONDS", 900)
+score_store_path = getattr(config, "SCORE_STORE_PATH", None)
+analytics_source = getattr(config, "ANALYTICS_SOURCE", None)
+
+@st.cache_resource(show_spinner=False)
+def load_model_artifacts():
+    """Načte model a pomocné objekty jednou za běh serveru"""
+    import joblib
+    return joblib.load(MODEL_PATH), joblib.load(SCALER_PATH), joblib.load(ENCODERS_PATH)
+
+@st.cache_resource(show_spinner=False)
+def get_score_store(path):
+    """Vrátí úložiště skóre anomálií a aktuální verzi modelu"""
+    from ml_models.score_store import ScoreStore, model_fingerprint
+    return ScoreStore(path), model_fingerprint()
+
+@st.cache_resource(show_spinner=False)
+def get_tech_news_rag(newsapi_key, openai_api_key, **kwargs):
+    """Vrátí sdílenou instanci TechNewsRAG, aby sémantická cache odpovědí přežila rerun i relace"""
+    from rag.newsapi_client import TechNewsRAG
+    return TechNewsRAG(newsapi_key=newsapi_key, openai_api_key=openai_api_key, **kwargs)
+
+# Barevné schéma typů anomálií
+ANOMALY_COLORS = {
+    "Vysoká částka + krátká splatnost": "#FA5252",
+    "Nesoulad položek + datum": "#FFA54C",
+    "Neobvyklý počet položek": "#57FD57",
+    "Neobvyklá služba": "#5B9DFF"
+}
+
+@st.fragment
 def display_anomalies(df):
-    """Zobrazí detekované anomálie s barevným zvýrazněním"""
+    """Zobrazí detekované anomálie s barevným zvýrazněním
+
+    Tabulka se filtruje, řadí a stránkuje na serveru – do prohlížeče se posílá
+    jen aktuální stránka. Jako fragment se při změně stránky nebo filtru
+    přepočítá jen tato část aplikace.
+    """
+    import numpy as np
+    import pandas as pd
+
     st.subheader("Detekované anomálie")
 
     # Legenda nad tabulkou 
@@ -89,49 +132,64 @@ def display_anomalies(df):
     """, unsafe_allow_html=True)
 
 
-
-    # Převod na číselné typy
+    # Převod na číselné typy – do nového DataFrame, výsledky v st.session_state
+    # se nemění (fragment se při každé změně stránky nebo filtru spouští znovu)
     numeric_cols = {
         "total_amount": float,
         "Jistota": float,
     }
 
-    for col, dtype in numeric_cols.items():
-        df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
-        
-    # Definice barevného schématu
-    color_palette = {
-        "Vysoká částka + krátká splatnost": "#FA5252",
-        "Nesoulad položek + datum": "#FFA54C",
-        "Neobvyklý počet položek": "#57FD57",
-        "Neobvyklá služba": "#5B9DFF"
-    }
-        
-    # Funkce pro aplikaci stylů
-    def apply_style(row):
-        anomaly_type = row["Typ anomálie"]
-        color = color_palette.get(anomaly_type, "#FFFFFF")
-        return [f'background-color: {color}'] * len(row)
-        
-    # Vytvoření stylované tabulky
-    styled_df = df.style.apply(apply_style, axis=1)
-        
+    df = df.assign(**{
+        col: pd.to_numeric(df[col], errors="coerce").astype(dtype) for col, dtype in numeric_cols.items()
+    })
+
+    # Filtrování a řazení
+    col_type, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    anomaly_types = [t for t in ANOMALY_COLORS if t in set(df["Typ anomálie"])]
+    selected_types = col_type.multiselect("Typ anomálie", anomaly_types, default=anomaly_types)
+    columns = list(df.columns)
+    sort_col = col_sort.selectbox("Řadit podle", columns, index=columns.index("Jistota"))
+    ascending = col_order.selectbox("Pořadí", ["Sestupně", "Vzestupně"]) == "Vzestupně"
+    page_size = col_size.selectbox("Řádků", [25, 50, 100, 250], index=1)
+
+    filtered = df[df["Typ anomálie"].isin(selected_types)].sort_values(sort_col, ascending=ascending, kind="stable")
+
+    # Stránkování
+    page_count = max(1, math.ceil(len(filtered) / page_size))
+    page_number = st.number_input("Stránka", min_value=1, max_value=page_count, value=1, step=1)
+    start_row = (page_number - 1) * page_size
+    page_df = filtered.iloc[start_row:start_row + page_size]
+
+    # Styl se počítá vektorově jen pro zobrazenou stránku
+    css = "background-color: " + page_df["Typ anomálie"].map(ANOMALY_COLORS).fillna("#FFFFFF")
+    styles = pd.DataFrame(
+        np.repeat(css.to_numpy()[:, np.newaxis], page_df.shape[1], axis=1),
+        index=page_df.index,
+        columns=page_df.columns
+    )
+
     # Zobrazení tabulky
     st.dataframe(
-        styled_df,
-        height=min(400, 35 * len(df)),
+        page_df.style.apply(lambda _: styles, axis=None),
+        height=min(400, 35 * (len(page_df) + 1)),
         use_container_width=True,
         hide_index=True
     )
-
-    # Tlačítko pro stažení
-    st.download_button(
-        label="Stáhnout detekované anomálie jako CSV",
-        data=df.to_csv(index=False).encode("utf-8-sig"),
-        file_name="detekovane_anomalie.csv",
-        mime="text/csv"
+    st.caption(
+        f"Zobrazeno {start_row + 1 if len(page_df) else 0}–{start_row + len(page_df)} "
+        f"z {len(filtered)} anomálií (celkem {len(df)}), stránka {page_number}/{page_count}"
     )
 
+    # CSV se generuje až na vyžádání
+    if st.button("Připravit CSV s detekovanými anomáliemi"):
+        st.download_button(
+            label="Stáhnout detekované anomálie jako CSV",
+            data=filtered.to_csv(index=False).encode("utf-8-sig"),
+            file_name="detekovane_anomalie.csv",
+            mime="text/csv",
+            on_click="ignore"
+        )
+
 # Hlavní logika pro každou stránku
 if page == "Úvod":
     st.title("Vítejte v aplikaci FinDoc AI")
@@ -153,13 +211,14 @@ if page == "Úvod":
 
     # Tlačítko pro stažení ZIP s PDF fakturami
     zip_path = os.path.join(os.path.dirname(__file__), "PDF.zip")
-    with open(zip_path, "rb") as fp:
-        st.download_button(
-            label="📥 Stáhnout ukázkové PDF faktury (ZIP)",
-            data=fp,
-            file_name="demo_faktury.zip",
-            mime="application/zip"
-        )
+    if os.path.exists(zip_path):
+        with open(zip_path, "rb") as fp:
+            st.download_button(
+                label="📥 Stáhnout ukázkové PDF faktury (ZIP)",
+                data=fp,
+                file_name="demo_faktury.zip",
+                mime="application/zip"
+            )
 
     st.markdown("---")
 
@@ -170,100 +229,186 @@ if page == "Úvod":
 
 
 if page == "Načtení a zpracování PDF":
+    from data_processing.pdf_text_extractor import extract_invoices
+    from data_processing.archive_reader import is_archive, iter_archive_pdfs
+    from data_processing.entity_extractor import create_invoice_dataframe
+    from ml_models.predict_pdf_batch import preprocess_data, predict_anomalies, ANOMALY_LABELS, NO_ANOMALY_CODE
+
     st.title("📄 Načtení a zpracování PDF faktur")
     
     uploaded_files = st.file_uploader(
-        "Nahrajte PDF faktury (můžete vybrat více souborů najednou)",
-        type="pdf",
+        "Nahrajte PDF faktury nebo archiv ZIP/TAR s fakturami (můžete vybrat více souborů najednou)",
+        type=["pdf", "zip", "tar", "gz", "tgz", "bz2", "xz"],
         accept_multiple_files=True
     )
 
     if uploaded_files:
         st.info(f"Načteno {len(uploaded_files)} souborů.")
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            file_paths = []
-            for file in uploaded_files:
-                file_path = os.path.join(tmpdir, file.name)
-                with open(file_path, "wb") as f:
-                    f.write(file.getbuffer())
-                file_paths.append(file_path)
-
-            ocr_results = []
-            progress_bar = st.progress(0)
-            for i, path in enumerate(file_paths):
-                try:
-                    data = extract_invoice_data(path)
-                    ocr_results.append(data)
-                except Exception as e:
-                    st.warning(f"Chyba u {Path(path).name}: {str(e)}")
-                progress_bar.progress((i + 1) / len(file_paths))
-
-            if ocr_results:
-                df = create_invoice_dataframe(ocr_results)
-                st.success("✅ Základní zpracování dokončeno!")
-                
-                # Zobrazení kompletních dat
-                st.write("Kompletní přehled faktur:")
-                st.dataframe(df, height=300, use_container_width=True)
-
-                # Tlačítko pro stažení kompletních dat
-                csv = df.to_csv(index=False).encode("utf-8-sig")
-                st.download_button(
-                    label="Stáhnout kompletní data jako CSV",
-                    data=csv,
-                    file_name="kompletni_data.csv",
-                    mime="text/csv",
-                    key="full_data"
-                )
-
-                # Sekce pro predikci anomálií
-                st.markdown("---")
-                if st.button("🔍 Spustit detekci anomálií", type="primary"):
-                    with st.spinner("Analyzuji faktury..."):
+        # Výsledky extrakce se drží v session podle hashe obsahu souboru,
+        # takže při rerunu (např. po kliknutí na detekci) se zpracují jen nové soubory.
+        # Každý záznam obsahuje seznam výsledků – jeden pro PDF, více pro archiv.
+        extractions = st.session_state.setdefault("pdf_extractions", {})
+        file_hashes = [hashlib.sha256(file.getbuffer()).hexdigest() for file in uploaded_files]
+        new_files = [
+            (file, file_hash) for file, file_hash in zip(uploaded_files, file_hashes)
+            if file_hash not in extractions
+        ]
+
+        if new_files:
+            # PDF se čtou přímo z bufferu uploadu (bez dočasných souborů), paralelně přes jádra;
+            # soubory z archivů se rozbalují postupně v paměti. Výsledky se skládají
+            # mimo session a do ní se zapíšou až po dokončení všech souborů – přerušená
+            # extrakce (rerun, výjimka) tak nezanechá neúplný záznam, který by se přeskočil
+            origins = []
+            pending = {file_hash: {"results": []} for _, file_hash in new_files}
+
+            def iter_upload_sources():
+                for file, file_hash in new_files:
+                    if is_archive(file.name):
+                        skipped = []
                         try:
-                            # Načtení modelu a pomocných objektů
-                            model = joblib.load(MODEL_PATH)
-                            scaler = joblib.load(SCALER_PATH)
-                            encoders = joblib.load(ENCODERS_PATH)
-                            
-                            # Příprava dat
-                            df_preprocessed = preprocess_data(df.copy())
-                            
-                            # Predikce
-                            y_pred = model.predict(df_preprocessed)
-                            y_proba = model.predict_proba(df_preprocessed).max(axis=1)
-                            
-                            # Přidání výsledků
-                            df["Kód anomálie"] = y_pred
-                            df["Jistota"] = y_proba
-                            df["Typ anomálie"] = df["Kód anomálie"].map({
-                                0: "Vysoká částka + krátká splatnost",
-                                1: "Nesoulad položek + datum",
-                                2: "Žádná anomálie",
-                                3: "Neobvyklý počet položek",
-                                4: "Neobvyklá služba"
-                            })
-                            
-                            # Filtrace a zobrazení anomálií
-                            df_anomalies = df[df["Kód anomálie"] != 2]
-                            
-                            if not df_anomalies.empty:
-                                display_anomalies(df_anomalies)
-                            else:
-                                st.success("🎉 Všechny faktury jsou v pořádku, žádné anomálie nebyly detekovány!")
-                                
+                            for name, data in iter_archive_pdfs(file, name=file.name, skipped=skipped):
+                                origins.append((file_hash, name))
+                                yield data
                         except Exception as e:
-                            st.error(f"❌ Chyba při analýze: {str(e)}")
+                            pending[file_hash]["results"].append({"name": file.name, "error": str(e)})
+                        pending[file_hash]["results"].extend(
+                            {"name": f"{file.name}/{name}", "error": reason} for name, reason in skipped
+                        )
+                    else:
+                        origins.append((file_hash, file.name))
+                        yield file
+
+            # Samotná PDF jdou jako seznam, takže se nespustí víc procesů, než je souborů;
+            # malé uploady se zpracují v procesu aplikace bez poolu
+            upload_bytes = sum(file.size for file, _ in new_files)
+            max_workers = 1 if upload_bytes <= IN_PROCESS_UPLOAD_BYTES else None
+            if any(is_archive(file.name) for file, _ in new_files):
+                sources = iter_upload_sources()
+            else:
+                sources = list(iter_upload_sources())
+
+            status = st.empty()
+            results = {}
+            for done, (i, data, error) in enumerate(extract_invoices(sources, max_workers=max_workers), start=1):
+                results[i] = {"data": data} if error is None else {"error": str(error)}
+                status.text(f"Zpracováno {done} faktur...")
+            for i, (file_hash, name) in enumerate(origins):
+                pending[file_hash]["results"].append({"name": name, **results[i]})
+            extractions.update(pending)
+            status.empty()
+
+        # Odebrané soubory se ze session zahodí
+        for file_hash in set(extractions) - set(file_hashes):
+            del extractions[file_hash]
+
+        ocr_results = []
+        for file_hash in file_hashes:
+            for result in extractions[file_hash]["results"]:
+                if "error" in result:
+                    st.warning(f"Chyba u {result['name']}: {result['error']}")
+                else:
+                    ocr_results.append(result["data"])
+
+        # DataFrame se přestaví jen při změně množiny nahraných souborů
+        cached_df = st.session_state.get("pdf_dataframe")
+        if ocr_results and (cached_df is None or cached_df["key"] != tuple(file_hashes)):
+            cached_df = {"key": tuple(file_hashes), "df": create_invoice_dataframe(ocr_results)}
+            st.session_state["pdf_dataframe"] = cached_df
+
+        if ocr_results:
+            # Kopie, aby přidané sloupce s predikcí nezměnily uložený DataFrame
+            df = cached_df["df"].copy()
+            st.success("✅ Základní zpracování dokončeno!")
+            
+            # Zobrazení kompletních dat
+            st.write("Kompletní přehled faktur:")
+            st.dataframe(df, height=300, use_container_width=True)
+
+            # Tlačítko pro stažení kompletních dat
+            csv = df.to_csv(index=False).encode("utf-8-sig")
+            st.download_button(
+                label="Stáhnout kompletní data jako CSV",
+                data=csv,
+                file_name="kompletni_data.csv",
+                mime="text/csv",
+                key="full_data"
+            )
+
+            # Sekce pro predikci anomálií
+            st.markdown("---")
+            if st.button("🔍 Spustit detekci anomálií", type="primary"):
+                with st.spinner("Analyzuji faktury..."):
+                    try:
+                        # Načtení modelu a pomocných objektů
+                        model, scaler, encoders = load_model_artifacts()
+                        
+                        # Příprava dat
+                        df_preprocessed = preprocess_data(df.copy())
+                        
+                        # Predikce; s úložištěm skóre se model volá jen pro nové nebo změněné faktury
+                        if score_store_path:
+                            from ml_models.score_store import predict_incremental
+                            store, model_version = get_score_store(score_store_path)
+                            y_pred, y_proba, _ = predict_incremental(
+                                model, df_preprocessed, df.loc[df_preprocessed.index, "invoice_id"],
+                                store, model_version
+                            )
+                        else:
+                            y_pred, y_proba = predict_anomalies(model, df_preprocessed)
+                        
+                        # Přidání výsledků
+                        df.loc[df_preprocessed.index, "Kód anomálie"] = y_pred
+                        df.loc[df_preprocessed.index, "Jistota"] = y_proba
+                        df["Typ anomálie"] = df["Kód anomálie"].map(ANOMALY_LABELS)
+                        
+                        # Faktury vyřazené v preprocessingu (neplatná částka nebo počet
+                        # položek) nemají predikci – nejsou anomálie, zobrazí se zvlášť
+                        scored = df["Kód anomálie"].notna()
+                        df.loc[~scored, "Typ anomálie"] = "Neklasifikováno"
+
+                        # Filtrace anomálií; výsledek se drží v session, aby stránkování
+                        # a filtry tabulky fungovaly i po dalších rerunech
+                        st.session_state["anomaly_results"] = {
+                            "key": cached_df["key"],
+                            "df": df[scored & (df["Kód anomálie"] != NO_ANOMALY_CODE)],
+                            "unscored": df[~scored]
+                        }
+                            
+                    except Exception as e:
+                        st.error(f"❌ Chyba při analýze: {str(e)}")
+
+            anomaly_results = st.session_state.get("anomaly_results")
+            if anomaly_results and anomaly_results["key"] == cached_df["key"]:
+                if not anomaly_results["df"].empty:
+                    display_anomalies(anomaly_results["df"])
+                elif anomaly_results["unscored"].empty:
+                    st.success("🎉 Všechny faktury jsou v pořádku, žádné anomálie nebyly detekovány!")
+                else:
+                    st.success("Mezi klasifikovanými fakturami nebyly detekovány žádné anomálie.")
+                unscored = anomaly_results["unscored"]
+                if not unscored.empty:
+                    st.warning(f"⚠️ {len(unscored)} faktur nebylo klasifikováno "
+                               f"(neplatná částka nebo počet položek).")
+                    with st.expander("Zobrazit neklasifikované faktury"):
+                        st.dataframe(unscored, use_container_width=True, hide_index=True)
 
 
 elif page == "Analytika":
     if not openai_api_key:
         st.warning("Pro Analytiku zadejte OpenAI API klíč v postranním panelu.")
     else:
+        import pandas as pd
+        from llm_query.query_config import QUERY_CONFIG, process_query
+
         st.title("Analytické přehledy")
-        invoices_df = pd.read_csv(csv_path)
-        invoices_df['total_amount'] = invoices_df['total_amount'].round().astype(int)
+        if analytics_source:
+            # Agregace běží v SQL nad Parquet soubory, data se do paměti nenačítají
+            invoices_df = None
+        else:
+            invoices_df = pd.read_csv(csv_path)
+            invoices_df['total_amount'] = invoices_df['total_amount'].round().astype(int)
 
         # Výběr dotazu
         query_options = [config["question"] for config in QUERY_CONFIG.values()]
@@ -278,7 +423,7 @@ elif page == "Analytika":
         )
 
         # Zpracování dotazu
-        result = process_query(selected_key, invoices_df, openai_api_key)
+        result = process_query(selected_key, invoices_df, openai_api_key, source=analytics_source)
 
         st.subheader(result["question"])
 
@@ -305,8 +450,21 @@ elif page == "Tech Novinky":
         # Inicializace RAG systému
         try:
             # Předání obou API klíčů při inicializaci
-            rag = TechNewsRAG(newsapi_key=newsapi_key, openai_api_key=openai_api_key)
+            rag = get_tech_news_rag(
+                newsapi_key=newsapi_key,
+                openai_api_key=openai_api_key,
+                embedding_backend=embedding_backend,
+                index_type=vector_index_type,
+                index_params=vector_index_params,
+                context_budget=context_token_budget,
+                refresh_seconds=news_refresh_seconds
+            )
             st.success("✅ Systém úspěšně inicializován!")
+            if rag.dedup_stats.get("duplicates"):
+                st.caption(
+                    f"Odstraněno {rag.dedup_stats['duplicates']} duplicitních článků z {rag.dedup_stats['articles']} "
+                    f"(ušetřeno {rag.dedup_stats['duplicates']} embeddingů a ~{rag.dedup_stats['saved_tokens']} tokenů kontextu)."
+                )
         except Exception as e:
             st.error(f"❌ Chyba při inicializaci: {str(e)}")
             st.stop()
@@ -314,11 +472,19 @@ elif page == "Tech Novinky":
         # Hlavní funkcionalita
         query = st.text_input("Zadejte dotaz v přirozeném jazyce:", "")
 
+        # Filtry – prohledávají se jen odpovídající oddíly vektorového úložiště
+        col_lang, col_period = st.columns(2)
+        language_options = {"Čeština i angličtina": None, "Pouze čeština": "cs", "Pouze angličtina": "en"}
+        period_options = {"Posledních 30 dní": None, "Posledních 14 dní": 14, "Poslední týden": 7}
+        selected_language = language_options[col_lang.selectbox("Jazyk zdrojů:", list(language_options))]
+        selected_days = period_options[col_period.selectbox("Období:", list(period_options))]
+        since = (datetime.now() - timedelta(days=selected_days)).date() if selected_days else None
+
         if st.button("Souhrn"):
             with st.spinner("🔍 Vyhledávám relevantní články a generuji odpověď..."):
                 try:
                     # Získání odpovědi a výsledků vyhledávání
-                    answer, results = rag.query(query)
+                    answer, results = rag.query(query, language=selected_language, since=since)
                         
                     st.markdown("---")
                     st.write("📝 Souhrn:")
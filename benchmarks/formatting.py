@@ -0,0 +1,168 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+"""
+Benchmark českého formátování výsledků analytiky (utils.formatting).
+
+Nad vygenerovanou knihou faktur se spočítají souhrny po odběratelích
+a po dodavatelích (částka, počet, podíl, průměrné zpoždění) a naformátují
+se dvakrát: původním způsobem (Series.apply s Python funkcí pro každý
+řádek) a vektorizovaně. Kniha se rozšíří na --customers různých firem, aby
+šlo o velké tabulky. Změří se i měsíční popisky nad celou knihou (původně
+převod každého řádku na text "YYYY-MM") a velikost tabulky posílané do
+prohlížeče (Arrow) se všemi sloupci a jen se zobrazenými sloupci.
+Pokud se výstupy obou způsobů liší, skončí s návratovým kódem 1.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.formatting
+python -m benchmarks.formatting --rows 5000000 --customers 200000
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import add_instrumentation_arguments, instrumented
+
+LEGACY_MONTHS = {
+    1: 'Leden', 2: 'Únor', 3: 'Březen', 4: 'Duben', 5: 'Květen', 6: 'Červen',
+    7: 'Červenec', 8: 'Srpen', 9: 'Září', 10: 'Říjen', 11: 'Listopad', 12: 'Prosinec'
+}
+
+
+def legacy_format_czk(value):
+    return f"{int(round(value)):,}".replace(",", " ") + ",- Kč"
+
+
+def legacy_format(data):
+    """Původní řádkové formátování (Series.apply)"""
+    return data.assign(
+        total_amount_formatted=data['total_amount'].apply(legacy_format_czk),
+        count_formatted=data['count'].apply(lambda v: f"{v} ks"),
+        podil_formatted=data['podil'].apply(lambda x: f"{x} %"),
+        avg_delay_formatted=data['avg_delay'].apply(lambda v: f"{v:.1f} dní"),
+    )
+
+
+def vectorized_format(data):
+    from utils.formatting import format_czk, format_count, format_percent, format_decimal
+
+    return data.assign(
+        total_amount_formatted=format_czk(data['total_amount']),
+        count_formatted=format_count(data['count']),
+        podil_formatted=format_percent(data['podil']),
+        avg_delay_formatted=format_decimal(data['avg_delay'], 1, " dní"),
+    )
+
+
+def legacy_months(df):
+    import pandas as pd
+
+    months = pd.to_datetime(df['invoice_date']).dt.to_period('M').astype(str)
+    totals = df.groupby(months)['total_amount'].sum().reset_index()
+    return totals.assign(invoice_date=totals['invoice_date'].apply(
+        lambda m: f"{LEGACY_MONTHS[int(m.split('-')[1])]} {m.split('-')[0]}"
+    ))
+
+
+def vectorized_months(df):
+    import pandas as pd
+    from utils.formatting import month_label
+
+    months = pd.to_datetime(df['invoice_date']).dt.to_period('M')
+    totals = df.groupby(months)['total_amount'].sum().reset_index()
+    return totals.assign(invoice_date=month_label(totals['invoice_date']))
+
+
+def build_ledger(rows, customers, seed):
+    """Vygeneruje knihu faktur a rozdělí odběratele a dodavatele na zadaný počet firem"""
+    import numpy as np
+    import pandas as pd
+    from utils.synthetic_bulk import iter_invoice_chunks
+
+    columns = ['invoice_date', 'transaction_type', 'total_amount', 'customer_name', 'supplier_name', 'delay_days']
+    df = pd.concat([chunk[columns] for chunk in iter_invoice_chunks(rows, seed=seed)], ignore_index=True)
+    suffix = pd.Series(np.random.default_rng(seed).integers(0, customers, len(df))).astype(str)
+    for column in ('customer_name', 'supplier_name'):
+        df[column] = df[column] + " " + suffix
+    return df
+
+
+def summarize(df, transaction_type, by):
+    """Souhrn po firmách ve tvaru výsledků QUERY_CONFIG"""
+    data = (
+        df[df['transaction_type'] == transaction_type]
+        .groupby(by)
+        .agg(total_amount=('total_amount', 'sum'), count=('total_amount', 'count'),
+             avg_delay=('delay_days', 'mean'))
+        .reset_index()
+    )
+    return data.assign(podil=(data['total_amount'] / data['total_amount'].sum() * 100).round(1))
+
+
+def arrow_kb(frame):
+    import pyarrow as pa
+    return pa.Table.from_pandas(frame, preserve_index=False).nbytes / 1024
+
+
+def best_time(func, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(rows, customers, seed, repeat):
+    import pandas as pd
+
+    print(f"Generuji knihu faktur: {rows} řádků, {customers} odběratelů/dodavatelů...")
+    df = build_ledger(rows, customers, seed)
+
+    failures = []
+    print(f"\n{'granularita':<16} {'řádků':>9} {'apply [s]':>10} {'vektor. [s]':>12} {'zrychlení':>10} "
+          f"{'payload vše':>12} {'zobrazené':>10}")
+    for label, transaction_type, by in (("odběratelé", "Příjmy", "customer_name"),
+                                        ("dodavatelé", "Výdaje", "supplier_name")):
+        data = summarize(df, transaction_type, by)
+        legacy_seconds, expected = best_time(lambda: legacy_format(data), repeat)
+        vector_seconds, actual = best_time(lambda: vectorized_format(data), repeat)
+        try:
+            pd.testing.assert_frame_equal(expected, actual)
+        except AssertionError as error:
+            failures.append(f"{label}: {error}")
+        displayed = actual[[by, 'total_amount_formatted', 'podil_formatted']]
+        print(f"{label:<16} {len(data):>9} {legacy_seconds:>10.3f} {vector_seconds:>12.3f} "
+              f"{legacy_seconds / vector_seconds:>9.1f}× {arrow_kb(actual):>9.0f} kB {arrow_kb(displayed):>7.0f} kB")
+
+    legacy_seconds, expected = best_time(lambda: legacy_months(df), repeat)
+    vector_seconds, actual = best_time(lambda: vectorized_months(df), repeat)
+    if expected['invoice_date'].tolist() != actual['invoice_date'].tolist() or \
+            expected['total_amount'].tolist() != actual['total_amount'].tolist():
+        failures.append("měsíce: popisky nebo součty se liší")
+    print(f"{'měsíce (kniha)':<16} {len(df):>9} {legacy_seconds:>10.3f} {vector_seconds:>12.3f} "
+          f"{legacy_seconds / vector_seconds:>9.1f}×")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark vektorizovaného českého formátování výsledků analytiky')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Počet faktur v knize (výchozí: 1000000)')
+    parser.add_argument('--customers', type=int, default=50_000,
+                        help='Počet různých odběratelů a dodavatelů (výchozí: 50000)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed generovaných dat (výchozí: 42)')
+    parser.add_argument('--repeat', type=int, default=3, help='Počet opakování měření (výchozí: 3)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        failures = run_benchmark(args.rows, args.customers, args.seed, args.repeat)
+
+    if failures:
+        print("\n❌ Vektorizované formátování se liší od původního:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Vektorizované formátování dává stejný výstup jako původní.")
@@ -0,0 +1,75 @@
+import re
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+
+"""
+Benchmark doby importu vstupních bodů aplikace pomocí python -X importtime.
+
+Pro každý vstupní bod spustí čistý interpret, sečte vlastní časy všech
+importovaných modulů a porovná je s rozpočtem. Při překročení rozpočtu
+skončí s návratovým kódem 1, takže jde použít i v CI.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.import_time
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Vstupní bod -> (kód spuštěný v čistém interpretu, rozpočet v ms)
+ENTRY_POINTS = {
+    "app (Úvod)": ("import runpy; runpy.run_path('app.py', run_name='__main__')", 800),
+    "batch_processor": ("import data_processing.batch_processor", 400),
+    "query_config": ("import llm_query.query_config", 1200),
+    "newsapi_client": ("import rag.newsapi_client", 1200),
+}
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_import_time(code):
+    """Spustí kód s -X importtime a vrátí (celkový čas v ms, nejtěžší moduly)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Spuštění selhalo:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        total_us += int(self_us)
+        # Moduly importované přímo (nejmenší odsazení) s kumulativním časem
+        if len(indent) == 1:
+            top_level.append((int(cumulative_us), module))
+    return total_us / 1000, sorted(top_level, reverse=True)[:5]
+
+
+def run_benchmark(repeat):
+    over_budget = []
+    print(f"{'vstupní bod':<18} {'import [ms]':>12} {'rozpočet [ms]':>14}  nejtěžší importy")
+    for name, (code, budget_ms) in ENTRY_POINTS.items():
+        # Nejlepší z několika běhů omezí vliv šumu (diskové cache apod.)
+        runs = [measure_import_time(code) for _ in range(repeat)]
+        total_ms, heaviest = min(runs, key=lambda run: run[0])
+        status = "" if total_ms <= budget_ms else "  ❌ PŘEKROČENO"
+        heaviest_str = ", ".join(f"{module} {us / 1000:.0f}" for us, module in heaviest[:3])
+        print(f"{name:<18} {total_ms:>12.0f} {budget_ms:>14}  {heaviest_str}{status}")
+        if total_ms > budget_ms:
+            over_budget.append(name)
+    return over_budget
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark doby importu vstupních bodů')
+    parser.add_argument('--repeat', type=int, default=3, help='Počet opakování měření (výchozí: 3)')
+    args = parser.parse_args()
+
+    if run_benchmark(args.repeat):
+        sys.exit(1)
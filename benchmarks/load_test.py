@@ -0,0 +1,571 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta
+from collections import defaultdict
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+Zátěžový test aplikace Streamlit (app.py) se souběžnými relacemi.
+
+Spustí skutečný server `streamlit run app.py` a proti němu N relací přes
+websocket (stejný protokol jako prohlížeč, včetně nahrávání souborů). OpenAI
+a NewsAPI nahrazuje lokální falešný backend s nastavitelnou latencí, takže
+test neplatí za API a běží i bez sítě. Každá relace prochází realistické
+scénáře v náhodném pořadí:
+    pdf        nahraje K PDF faktur a spustí detekci anomálií
+    analytics  projde všechny dotazy z QUERY_CONFIG
+    rag        otevře Tech Novinky a položí několik dotazů
+
+Vypíše percentily latence jednotlivých kroků (od odeslání rerunu po dokončení
+skriptu), propustnost a paměť serveru (RSS včetně podprocesů) – na začátku,
+ve špičce a přírůstek na jednu otevřenou relaci. Pokud některý krok skončí
+výjimkou nebo chybovou hláškou aplikace, skončí s návratovým kódem 1.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.load_test
+python -m benchmarks.load_test --sessions 20 --pdfs 10 --iterations 2 --llm_latency 1.5
+python -m benchmarks.load_test --flows analytics --sessions 50 --think 0
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import metrics, add_instrumentation_arguments, instrumented
+
+FLOW_PAGES = {"pdf": "Načtení a zpracování PDF", "analytics": "Analytika", "rag": "Tech Novinky"}
+
+RAG_QUESTIONS = [
+    "Jaké jsou novinky v oblasti umělé inteligence?",
+    "Co nového u polovodičů a čipů?",
+    "What happened in cloud computing this week?",
+    "Jaké bezpečnostní incidenty se objevily?",
+    "Novinky o elektromobilech a bateriích",
+]
+
+# Domény, které TechNewsRAG přijímá pro daný jazyk
+NEWS_DOMAINS = {
+    "cs": ["zive.cz", "root.cz", "lupa.cz", "cnews.cz", "technet.idnes.cz"],
+    "en": ["techcrunch.com", "theverge.com", "wired.com", "engadget.com", "arstechnica.com"],
+}
+NEWS_TOPICS = ["umělá inteligence", "čipy", "cloud", "bezpečnost", "elektromobily", "roboti", "5G", "startupy"]
+
+EMBEDDING_DIMENSIONS = 1536
+
+# Server se spouští přes tento zavaděč: přepíše hodnoty z config.py a adresu
+# NewsAPI na falešný backend a pak spustí `streamlit run app.py`
+SERVER_BOOTSTRAP = """
+import sys, json, types
+settings = json.loads(sys.argv[1])
+try:
+    import config
+except ImportError:
+    config = sys.modules["config"] = types.ModuleType("config")
+for name, value in settings["config"].items():
+    setattr(config, name, value)
+import rag.newsapi_client
+rag.newsapi_client.NEWSAPI_URL = settings["newsapi_url"]
+from streamlit.web import cli
+sys.argv = ["streamlit", "run", "app.py", *settings["flags"]]
+cli.main()
+"""
+
+
+def start_fake_backends(llm_latency, articles, seed):
+    """Spustí falešné OpenAI (chat, embeddings) a NewsAPI ve vlákně; vrátí (server, adresa)"""
+    rng = random.Random(seed)
+    news = {}
+    for language, domains in NEWS_DOMAINS.items():
+        news[language] = [{
+            "title": f"{rng.choice(NEWS_TOPICS).capitalize()}: zpráva {i} ({language})",
+            "description": " ".join(rng.choices(NEWS_TOPICS, k=12)),
+            "url": f"https://{domains[i % len(domains)]}/clanek-{language}-{i}",
+            "source": {"name": domains[i % len(domains)]},
+            "publishedAt": (datetime.now() - timedelta(days=rng.randint(0, 25))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        } for i in range(articles)]
+
+    def embedding(value):
+        text = value if isinstance(value, str) else " ".join(map(str, value))
+        seed_value = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        local = random.Random(seed_value)
+        return [local.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            language = parse_qs(urlparse(self.path).query).get("language", ["en"])[0]
+            items = news.get(language, [])
+            self._reply({"status": "ok", "totalResults": len(items), "articles": items})
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path.endswith("/embeddings"):
+                inputs = request.get("input", [])
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                self._reply({
+                    "object": "list", "model": request.get("model", ""),
+                    "data": [{"object": "embedding", "index": i, "embedding": embedding(value)}
+                             for i, value in enumerate(inputs)],
+                    "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                })
+                return
+            # Chat completion: odpověď po simulované latenci modelu
+            time.sleep(llm_latency)
+            self._reply({
+                "id": f"fake-{uuid.uuid4().hex[:8]}", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "gpt-3.5-turbo"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                    "role": "assistant", "content": "Testovací odpověď: " + " ".join(rng.choices(NEWS_TOPICS, k=20))
+                }}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app_server(port, backend_url, work_dir, embedding_backend, outbound_rate):
+    """Spustí streamlit run app.py napojený na falešný backend; vrátí (proces, log)"""
+    overrides = {
+        "EMBEDDING_BACKEND": embedding_backend,
+        # Vlastní úložiště skóre, aby test nezapisoval do ml_models/anomaly_scores.db
+        "SCORE_STORE_PATH": str(Path(work_dir) / "anomaly_scores.db"),
+    }
+    if outbound_rate:
+        limit = {"rate": outbound_rate, "burst": max(1, int(outbound_rate)), "max_concurrency": 16}
+        overrides["OUTBOUND_LIMITS"] = {"openai": limit, "newsapi": limit}
+    settings = {
+        "config": overrides,
+        "newsapi_url": f"{backend_url}/v2/everything",
+        "flags": [
+            "--server.port", str(port), "--server.address", "127.0.0.1", "--server.headless", "true",
+            "--server.enableXsrfProtection", "false", "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+    }
+    env = {**os.environ, "OPENAI_BASE_URL": f"{backend_url}/v1", "OPENAI_API_BASE": f"{backend_url}/v1"}
+    log_path = Path(work_dir) / "server.log"
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_BOOTSTRAP, json.dumps(settings)],
+        cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, log_path
+
+
+async def wait_until_ready(port, process, timeout=120):
+    from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+
+    client = AsyncHTTPClient()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server Streamlit skončil při startu")
+        try:
+            await client.fetch(f"http://127.0.0.1:{port}/_stcore/health")
+            return
+        except (HTTPClientError, OSError):
+            await asyncio.sleep(0.5)
+    raise RuntimeError("Server Streamlit nenastartoval včas")
+
+
+def rss_mb(pid):
+    """RSS procesu a všech jeho podprocesů v MB (z /proc, jen Linux; jinak None)"""
+    def process_rss_kb(current):
+        try:
+            status = Path(f"/proc/{current}/status").read_text()
+            children = [int(child) for task in Path(f"/proc/{current}/task").iterdir()
+                        for child in (task / "children").read_text().split()]
+        except OSError:
+            return None
+        rss = next((int(line.split()[1]) for line in status.splitlines() if line.startswith("VmRSS")), 0)
+        return rss + sum(process_rss_kb(child) or 0 for child in children)
+
+    total_kb = process_rss_kb(pid)
+    return None if total_kb is None else total_kb / 1024
+
+
+class Session:
+    """Jedna relace prohlížeče – websocket spojení se serverem Streamlit
+
+    Udržuje stav widgetů (jako prohlížeč posílá při každém rerunu všechny
+    hodnoty) a ID widgetů zjišťuje z elementů, které server poslal při
+    posledním běhu skriptu.
+    """
+
+    def __init__(self, port, name, step_timeout):
+        self.port = port
+        self.name = name
+        self.step_timeout = step_timeout
+        self.connection = None
+        self.session_id = None
+        self.page_script_hash = ""
+        self.widgets = {}
+        self.states = {}
+        self.errors = []
+        self.timings = defaultdict(list)
+        self._request_id = 0
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        self.connection = await websocket_connect(f"ws://127.0.0.1:{self.port}/_stcore/stream",
+                                                  max_message_size=256 * 1024 * 1024)
+        await self.rerun("connect")
+
+    async def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    async def _read(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        data = await asyncio.wait_for(self.connection.read_message(), self.step_timeout)
+        if data is None:
+            raise ConnectionError(f"{self.name}: server ukončil spojení")
+        message = ForwardMsg()
+        message.ParseFromString(data)
+        return message
+
+    def _on_delta(self, delta):
+        from streamlit.proto.Alert_pb2 import Alert
+
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(f"{element.exception.type}: {element.exception.message}")
+        elif kind == "alert" and element.alert.format == Alert.ERROR:
+            self.errors.append(element.alert.body)
+        elif kind in ("radio", "selectbox", "text_input", "button", "file_uploader"):
+            widget = getattr(element, kind)
+            self.widgets[(kind, widget.label)] = widget
+
+    def widget(self, kind, label):
+        try:
+            return self.widgets[(kind, label)]
+        except KeyError:
+            raise LookupError(f"{self.name}: widget {kind} '{label}' na stránce není") from None
+
+    def set_value(self, kind, label, field, value):
+        """Nastaví hodnotu widgetu pro další reruny (jako vstup uživatele)"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id = self.widget(kind, label).id
+        state = WidgetState(id=widget_id)
+        if field == "file_uploader_state_value":
+            state.file_uploader_state_value.CopyFrom(value)
+        else:
+            setattr(state, field, value)
+        self.states[widget_id] = state
+
+    def open_page(self, page):
+        radio = self.widget("radio", "Vyberte stránku")
+        self.set_value("radio", radio.label, "int_value", list(radio.options).index(page))
+
+    async def rerun(self, step, click=None):
+        """Pošle rerun s aktuálním stavem widgetů (a případně kliknutím na tlačítko)
+        a počká na dokončení skriptu; latenci zapíše pod názvem kroku"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        client_state = message.rerun_script
+        client_state.page_script_hash = self.page_script_hash
+        client_state.widget_states.widgets.extend(self.states.values())
+        if click is not None:
+            trigger = client_state.widget_states.widgets.add()
+            trigger.id = self.widget("button", click).id
+            trigger.trigger_value = True
+
+        self.widgets = {}
+        errors_before = len(self.errors)
+        start = time.perf_counter()
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        while True:
+            reply = await self._read()
+            kind = reply.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = reply.new_session.page_script_hash
+                if reply.new_session.HasField("initialize"):
+                    self.session_id = reply.new_session.initialize.session_id
+            elif kind == "delta":
+                self._on_delta(reply.delta)
+            elif kind == "script_finished" and reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        elapsed = time.perf_counter() - start
+        self.timings[step].append(elapsed)
+        metrics.observe("load_test_step_seconds", elapsed, step=step)
+        if len(self.errors) > errors_before:
+            metrics.inc("load_test_step_errors_total", step=step)
+
+    async def upload(self, label, files):
+        """Nahraje soubory (název, obsah) do file_uploaderu stejně jako prohlížeč"""
+        from tornado.httpclient import AsyncHTTPClient
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.Common_pb2 import FileUploaderState
+
+        self._request_id += 1
+        request_id = f"{self.name}-{self._request_id}"
+        message = BackMsg()
+        message.file_urls_request.request_id = request_id
+        message.file_urls_request.session_id = self.session_id
+        message.file_urls_request.file_names.extend(name for name, _ in files)
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        while True:
+            reply = await self._read()
+            if reply.WhichOneof("type") == "file_urls_response" and reply.file_urls_response.response_id == request_id:
+                break
+
+        client = AsyncHTTPClient()
+        state = FileUploaderState(max_file_id=len(files))
+        for i, (file_urls, (name, content)) in enumerate(zip(reply.file_urls_response.file_urls, files)):
+            boundary = uuid.uuid4().hex
+            body = (
+                f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                f'Content-Type: application/pdf\r\n\r\n'
+            ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+            await client.fetch(
+                f"http://127.0.0.1:{self.port}{file_urls.upload_url}", method="PUT", body=body,
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                request_timeout=self.step_timeout
+            )
+            info = state.uploaded_file_info.add(id=i + 1, name=name, size=len(content), file_id=file_urls.file_id)
+            info.file_urls.CopyFrom(file_urls)
+        self.set_value("file_uploader", label, "file_uploader_state_value", state)
+
+
+UPLOAD_LABEL = "Nahrajte PDF faktury nebo archiv ZIP/TAR s fakturami (můžete vybrat více souborů najednou)"
+
+
+async def pdf_flow(session, files, think):
+    """Nahraje PDF faktury a spustí detekci anomálií"""
+    session.open_page(FLOW_PAGES["pdf"])
+    await session.rerun("pdf_open")
+    await asyncio.sleep(think())
+    await session.upload(UPLOAD_LABEL, files)
+    await session.rerun("pdf_upload")
+    await asyncio.sleep(think())
+    await session.rerun("pdf_detect", click="🔍 Spustit detekci anomálií")
+
+
+async def analytics_flow(session, think):
+    """Projde všechny analytické dotazy z QUERY_CONFIG"""
+    session.open_page(FLOW_PAGES["analytics"])
+    await session.rerun("analytics_open")
+    selectbox = session.widget("selectbox", "Vyberte analytický dotaz:")
+    for question in list(selectbox.options)[1:]:
+        await asyncio.sleep(think())
+        session.set_value("selectbox", selectbox.label, "string_value", question)
+        await session.rerun("analytics_query")
+
+
+async def rag_flow(session, questions, think):
+    """Otevře Tech Novinky a položí několik dotazů"""
+    session.open_page(FLOW_PAGES["rag"])
+    await session.rerun("rag_open")
+    for question in questions:
+        await asyncio.sleep(think())
+        session.set_value("text_input", "Zadejte dotaz v přirozeném jazyce:", "string_value", question)
+        await session.rerun("rag_question", click="Souhrn")
+
+
+async def run_session(session, flows, pdf_files, questions, iterations, think, keys):
+    """Připojí relaci, zadá API klíče a projde scénáře"""
+    await session.connect()
+    session.set_value("text_input", "OpenAI API klíč", "string_value", keys[0])
+    session.set_value("text_input", "News API klíč", "string_value", keys[1])
+    for _ in range(iterations):
+        for flow in flows:
+            if flow == "pdf":
+                await pdf_flow(session, pdf_files, think)
+            elif flow == "analytics":
+                await analytics_flow(session, think)
+            else:
+                await rag_flow(session, questions, think)
+
+
+def prepare_pdfs(sessions, pdfs, seed):
+    """Vygeneruje pro každou relaci vlastní sadu K PDF faktur"""
+    from utils.synthetic_data import generate_invoices, iter_pdf_invoices
+
+    invoices = generate_invoices(max(sessions * pdfs, 50), seed=seed)
+    rendered = list(iter_pdf_invoices(invoices, num_invoices=sessions * pdfs, seed=seed))
+    return [rendered[i * pdfs:(i + 1) * pdfs] for i in range(sessions)]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def report(sessions, elapsed, memory):
+    timings = defaultdict(list)
+    for session in sessions:
+        for step, values in session.timings.items():
+            timings[step].extend(values)
+
+    print(f"\n{'krok':<18} {'počet':>6} {'p50 [s]':>8} {'p90 [s]':>8} {'p99 [s]':>8} {'max [s]':>8}")
+    for step, values in timings.items():
+        print(f"{step:<18} {len(values):>6} {percentile(values, 0.5):>8.2f} {percentile(values, 0.9):>8.2f} "
+              f"{percentile(values, 0.99):>8.2f} {max(values):>8.2f}")
+
+    steps = sum(len(values) for values in timings.values())
+    print(f"\nPropustnost: {steps / elapsed:.2f} rerunů/s, {len(sessions) / elapsed * 60:.1f} relací/min "
+          f"({len(sessions)} relací za {elapsed:.1f} s)")
+    baseline, peak, loaded = memory
+    if baseline is not None:
+        print(f"Paměť serveru: po zahřátí {baseline:.0f} MB, špička {peak:.0f} MB, "
+              f"s otevřenými relacemi {loaded:.0f} MB – {(loaded - baseline) / len(sessions):.1f} MB na relaci")
+    else:
+        print("Paměť serveru: nedostupná (čte se z /proc, jen Linux)")
+
+
+async def run_load_test(args):
+    flows = [flow.strip() for flow in args.flows.split(",") if flow.strip()]
+    unknown = set(flows) - set(FLOW_PAGES)
+    if unknown:
+        raise ValueError(f"Neznámé scénáře: {', '.join(sorted(unknown))} (povolené: {', '.join(FLOW_PAGES)})")
+
+    rng = random.Random(args.seed)
+    pdf_sets = prepare_pdfs(args.sessions + 1, args.pdfs, args.seed) if "pdf" in flows else [[]] * (args.sessions + 1)
+    backend, backend_url = start_fake_backends(args.llm_latency, args.articles, args.seed)
+    work_dir = tempfile.mkdtemp(prefix="findoc_load_")
+    port = free_port()
+    process, log_path = start_app_server(port, backend_url, work_dir, args.embedding_backend, args.outbound_rate)
+
+    def think():
+        return rng.uniform(0, 2 * args.think) if args.think else 0
+
+    try:
+        await wait_until_ready(port, process)
+        print(f"Server běží na portu {port}, falešný backend {backend_url}, log {log_path}")
+
+        # Zahřátí: jedna relace projde všechny scénáře, aby se načetly sdílené
+        # cache (model, RAG index) a měření paměti ukazovalo jen přírůstek relací
+        warmup = Session(port, "warmup", args.step_timeout)
+        try:
+            await run_session(warmup, flows, pdf_sets[-1], RAG_QUESTIONS[:1], 1, lambda: 0, ("sk-test", "news-test"))
+        finally:
+            await warmup.close()
+            if warmup.errors:
+                print("Chyby při zahřátí:", *warmup.errors[:5], sep="\n  ")
+        metrics.reset()
+
+        baseline = rss_mb(process.pid)
+        peak = baseline
+        sessions = []
+        for i in range(args.sessions):
+            session_flows = flows[:]
+            rng.shuffle(session_flows)
+            keys = (f"sk-test-{i}", f"news-test-{i}") if args.distinct_keys else ("sk-test", "news-test")
+            questions = rng.sample(RAG_QUESTIONS, min(args.questions, len(RAG_QUESTIONS)))
+            sessions.append((Session(port, f"relace-{i}", args.step_timeout), session_flows, pdf_sets[i], questions, keys))
+
+        async def sample_memory():
+            nonlocal peak
+            while True:
+                current = rss_mb(process.pid)
+                if current is not None:
+                    peak = max(peak, current)
+                await asyncio.sleep(0.2)
+
+        sampler = asyncio.ensure_future(sample_memory())
+        print(f"Spouštím {args.sessions} souběžných relací ({', '.join(flows)}, {args.iterations}×)...")
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            run_session(session, session_flows, files, questions, args.iterations, think, keys)
+            for session, session_flows, files, questions, keys in sessions
+        ), return_exceptions=True)
+        elapsed = time.perf_counter() - start
+        loaded = rss_mb(process.pid)
+        sampler.cancel()
+
+        for (session, *_), result in zip(sessions, results):
+            if isinstance(result, Exception):
+                session.errors.append(f"{type(result).__name__}: {result}")
+            await session.close()
+
+        report([session for session, *_ in sessions], elapsed,
+               (baseline, max(peak or 0, loaded or 0), loaded))
+        return [f"{session.name}: {error}" for session, *_ in sessions for error in session.errors]
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        backend.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Zátěžový test aplikace Streamlit se souběžnými relacemi')
+    parser.add_argument('--sessions', type=int, default=10, help='Počet souběžných relací (výchozí: 10)')
+    parser.add_argument('--flows', type=str, default="pdf,analytics,rag",
+                        help='Scénáře relace oddělené čárkou: pdf, analytics, rag (výchozí: všechny)')
+    parser.add_argument('--iterations', type=int, default=1, help='Kolikrát relace projde scénáře (výchozí: 1)')
+    parser.add_argument('--pdfs', type=int, default=5, help='Počet nahraných PDF na relaci (výchozí: 5)')
+    parser.add_argument('--questions', type=int, default=3, help='Počet RAG dotazů na relaci (výchozí: 3)')
+    parser.add_argument('--think', type=float, default=0.5,
+                        help='Průměrná pauza uživatele mezi kroky v sekundách (výchozí: 0.5)')
+    parser.add_argument('--llm_latency', type=float, default=0.5,
+                        help='Latence falešného LLM v sekundách (výchozí: 0.5)')
+    parser.add_argument('--articles', type=int, default=60, help='Počet falešných článků na jazyk (výchozí: 60)')
+    parser.add_argument('--embedding_backend', type=str, default="hashing",
+                        help='Embedding backend serveru: hashing, nebo openai přes falešný backend '
+                             '(tiktoken potřebuje stažený slovník; výchozí: hashing)')
+    parser.add_argument('--outbound_rate', type=float, default=None,
+                        help='Přepíše limit požadavků/s na OpenAI a NewsAPI (výchozí: limity z config.py)')
+    parser.add_argument('--distinct_keys', action='store_true',
+                        help='Každá relace zadá vlastní API klíče (vlastní instance RAG)')
+    parser.add_argument('--step_timeout', type=float, default=300, help='Timeout jednoho kroku v sekundách (výchozí: 300)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed dat a pořadí scénářů (výchozí: 42)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        failures = asyncio.run(run_load_test(args))
+
+    if failures:
+        print(f"\n❌ {len(failures)} chyb během testu:")
+        for failure in failures[:20]:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ Všechny relace prošly bez chyb.")
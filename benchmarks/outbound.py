@@ -0,0 +1,153 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+Ověření sdílené vrstvy odchozích volání (utils.outbound) proti lokálnímu stub serveru.
+
+Stub server propouští jen --server_rate požadavků za sekundu, ostatním
+vrací 429 s hlavičkou Retry-After a náhodně i 503. Stejná dávka souběžných
+požadavků se pošle třikrát: přímo bez vrstvy (requests bez limitu a opakování),
+přes ProviderClient (requests) a přes OpenAI SDK nad sdíleným httpx klientem.
+Vypíše úspěšnost, počty opakování a čekání ve frontě. Pokud přes vrstvu
+nějaký požadavek neprojde, skončí s návratovým kódem 1.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.outbound
+python -m benchmarks.outbound --requests 200 --threads 16 --server_rate 20 --error_rate 0.1
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import metrics, add_instrumentation_arguments, instrumented
+
+CHAT_COMPLETION = {
+    "id": "stub", "object": "chat.completion", "created": 0, "model": "gpt-3.5-turbo",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+def start_stub_server(server_rate, error_rate, seed):
+    """Spustí stub server ve vlákně; vrátí (server, adresa)"""
+    accepted = deque()
+    lock = threading.Lock()
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body, headers=()):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            with lock:
+                now = time.monotonic()
+                while accepted and now - accepted[0] > 1.0:
+                    accepted.popleft()
+                throttled = len(accepted) >= server_rate
+                failed = not throttled and rng.random() < error_rate
+                if not throttled and not failed:
+                    accepted.append(now)
+            if throttled:
+                self._reply(429, {"error": "rate limited"}, [("Retry-After", "1")])
+            elif failed:
+                self._reply(503, {"error": "unavailable"})
+            elif self.path.endswith("/chat/completions"):
+                self._reply(200, CHAT_COMPLETION)
+            else:
+                self._reply(200, {"status": "ok", "articles": []})
+
+        do_GET = _handle
+        do_POST = _handle
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_batch(label, send, requests_count, threads):
+    """Pošle requests_count požadavků z threads vláken; vrátí počet úspěšných"""
+    def one(_):
+        try:
+            return send()
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        succeeded = sum(pool.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {succeeded:>5}/{requests_count:<5} {elapsed:>8.2f} s")
+    return succeeded
+
+
+def provider_summary(name):
+    snapshot = metrics.snapshot()
+    retries = sum(c["value"] for c in snapshot["counters"]
+                  if c["name"] == "outbound_retries_total" and c["labels"]["provider"] == name)
+    queue = next((h for h in snapshot["histograms"]
+                  if h["name"] == "outbound_queue_seconds" and h["labels"]["provider"] == name), None)
+    if queue:
+        print(f"{'':<28} opakování {retries:.0f}, čekání ve frontě průměr {queue['mean']:.2f} s, max {queue['max']:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ověření vrstvy odchozích volání proti stub serveru s omezením')
+    parser.add_argument('--requests', type=int, default=100, help='Počet požadavků v dávce (výchozí: 100)')
+    parser.add_argument('--threads', type=int, default=16, help='Počet souběžných vláken (výchozí: 16)')
+    parser.add_argument('--server_rate', type=int, default=20, help='Propustnost stub serveru za sekundu (výchozí: 20)')
+    parser.add_argument('--error_rate', type=float, default=0.05, help='Podíl náhodných odpovědí 503 (výchozí: 0.05)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed náhodných chyb (výchozí: 42)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    import requests
+    import openai
+    from utils.outbound import ProviderClient
+
+    server, url = start_stub_server(args.server_rate, args.error_rate, args.seed)
+    # Klient vrstvy s limitem těsně pod propustností serveru
+    limits = {"rate": args.server_rate * 0.9, "burst": max(1, args.server_rate // 4), "max_concurrency": 8}
+    rest = ProviderClient("stub_rest", **limits)
+    llm = ProviderClient("stub_openai", **limits)
+    client = openai.OpenAI(api_key="stub", base_url=f"{url}/v1", http_client=llm.httpx_client(), max_retries=0)
+
+    print(f"{'režim':<28} {'úspěšné':>11} {'čas':>10}")
+    with instrumented(args):
+        run_batch("bez vrstvy (requests)", lambda: requests.get(url).ok, args.requests, args.threads)
+        ok_rest = run_batch("vrstva (requests)", lambda: rest.get(url).ok, args.requests, args.threads)
+        provider_summary("stub_rest")
+        ok_llm = run_batch(
+            "vrstva (OpenAI SDK)",
+            lambda: client.chat.completions.create(
+                model="gpt-3.5-turbo", messages=[{"role": "user", "content": "ping"}]
+            ).choices[0].message.content == "ok",
+            args.requests, args.threads
+        )
+        provider_summary("stub_openai")
+    server.shutdown()
+
+    if ok_rest < args.requests or ok_llm < args.requests:
+        print("\n❌ Některé požadavky přes vrstvu neprošly.")
+        sys.exit(1)
+    print("\n✅ Všechny požadavky přes vrstvu prošly.")
@@ -0,0 +1,175 @@
+import io
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+"""
+End-to-end benchmark zpracování faktur nad syntetickým korpusem.
+
+Korpus se generuje deterministicky (utils.synthetic_data) podle seedu, takže
+výsledky jsou porovnatelné mezi běhy. Měří se jednotlivé kroky pipeline:
+extrakce PDF, parsování textu, tvorba DataFrame, preprocessing, predikce
+modelu a všechny agregace z QUERY_CONFIG. Pro každý krok se vypíše
+propustnost (položek/s) a špička alokované paměti a výsledky se porovnají
+s uloženými baseline hodnotami. Při regresi skončí s návratovým kódem 1.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.pipeline
+python -m benchmarks.pipeline --n 100000 --pdfs 200
+python -m benchmarks.pipeline --update-baseline
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import add_instrumentation_arguments, instrumented
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+
+def measure(func, repeat):
+    """Změří nejlepší čas z několika běhů a špičku paměti jednoho běhu
+
+    Paměť se měří zvlášť přes tracemalloc, aby jeho režie nezkreslila čas.
+
+    Returns:
+    tuple: (nejlepší čas v sekundách, špička paměti v MB, výsledek funkce)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1024 / 1024, result
+
+
+def build_stages(n, pdfs, records, seed):
+    """Připraví korpus a vrátí seznam kroků (název, funkce, počet položek)"""
+    import pandas as pd
+    import joblib
+    from utils.synthetic_data import generate_invoices, iter_pdf_invoices, to_extracted_frame
+    from data_processing.pdf_text_extractor import extract_invoice_data, extract_pdf_text, parse_invoice_text
+    from data_processing.entity_extractor import create_invoice_dataframe
+    from ml_models.predict_pdf_batch import preprocess_data, predict_anomalies
+    from llm_query.query_config import QUERY_CONFIG
+
+    invoices = generate_invoices(n, seed=seed)
+    # Analytika pracuje s daty načtenými z CSV, stejně jako aplikace
+    buffer = io.StringIO()
+    invoices.to_csv(buffer, index=False)
+    buffer.seek(0)
+    analytics_df = pd.read_csv(buffer)
+
+    pdf_bytes = [content for _, content in iter_pdf_invoices(invoices, num_invoices=min(pdfs, n), seed=seed)]
+    texts = [extract_pdf_text(content) for content in pdf_bytes]
+    parsed = [parse_invoice_text(text) for text in texts]
+    parsed_records = (parsed * (records // len(parsed) + 1))[:records]
+
+    extracted_df = to_extracted_frame(invoices)
+    model = joblib.load(PROJECT_ROOT / "ml_models" / "xgb_model.pkl")
+    features = preprocess_data(extracted_df)
+
+    stages = [
+        ("extract_invoice_data", lambda: [extract_invoice_data(content) for content in pdf_bytes], len(pdf_bytes)),
+        ("parse_invoice_text", lambda: [parse_invoice_text(text) for text in texts], len(texts)),
+        ("create_invoice_dataframe", lambda: create_invoice_dataframe(parsed_records), len(parsed_records)),
+        ("preprocess_data", lambda: preprocess_data(extracted_df), len(extracted_df)),
+        ("predict_anomalies", lambda: predict_anomalies(model, features), len(features)),
+    ]
+    for key, config in QUERY_CONFIG.items():
+        stages.append((
+            f"query:{key}",
+            lambda config=config: config["format_func"](config["agg_func"](analytics_df)),
+            len(analytics_df),
+        ))
+    return stages
+
+
+def load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+    return None
+
+
+def compare(results, baseline, settings, tolerance):
+    """Vrátí kroky, jejichž propustnost klesla nebo paměť vzrostla nad toleranci"""
+    if baseline is None:
+        print("\nBaseline neexistuje – uložte ji pomocí --update-baseline.")
+        return []
+    if baseline.get("settings") != settings:
+        print(f"\nBaseline byla změřena s jiným nastavením ({baseline.get('settings')}), porovnání se přeskakuje.")
+        return []
+
+    regressions = []
+    for name, result in results.items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        if result["throughput"] < reference["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: propustnost {result['throughput']:.0f}/s (baseline {reference['throughput']:.0f}/s)")
+        if result["peak_mb"] > reference["peak_mb"] * (1 + tolerance) + 1:
+            regressions.append(f"{name}: paměť {result['peak_mb']:.1f} MB (baseline {reference['peak_mb']:.1f} MB)")
+    return regressions
+
+
+def run_benchmark(n, pdfs, records, seed, repeat):
+    print(f"Generuji korpus: {n} faktur, {pdfs} PDF (seed {seed})...")
+    stages = build_stages(n, pdfs, records, seed)
+
+    results = {}
+    print(f"\n{'krok':<30} {'položek':>9} {'čas [s]':>9} {'položek/s':>11} {'paměť [MB]':>11}")
+    for name, func, count in stages:
+        seconds, peak_mb, _ = measure(func, repeat)
+        results[name] = {
+            "items": count,
+            "seconds": round(seconds, 4),
+            "throughput": round(count / seconds, 1),
+            "peak_mb": round(peak_mb, 2),
+        }
+        print(f"{name:<30} {count:>9} {seconds:>9.3f} {count / seconds:>11.0f} {peak_mb:>11.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='End-to-end benchmark zpracování faktur')
+    parser.add_argument('--n', type=int, default=20000, help='Počet syntetických faktur (výchozí: 20000)')
+    parser.add_argument('--pdfs', type=int, default=50, help='Počet vykreslených PDF (výchozí: 50)')
+    parser.add_argument('--records', type=int, default=1000,
+                        help='Počet záznamů pro create_invoice_dataframe (výchozí: 1000)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed korpusu (výchozí: 42)')
+    parser.add_argument('--repeat', type=int, default=3, help='Počet opakování měření (výchozí: 3)')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Povolené zhoršení oproti baseline jako podíl (výchozí: 0.5)')
+    parser.add_argument('--update-baseline', action='store_true', help='Uloží výsledky jako novou baseline')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    settings = {"n": args.n, "pdfs": args.pdfs, "records": args.records, "seed": args.seed}
+    with instrumented(args):
+        results = run_benchmark(args.n, args.pdfs, args.records, args.seed, args.repeat)
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(
+            json.dumps({"settings": settings, "results": results}, indent=2, ensure_ascii=False) + "\n",
+            encoding="utf-8"
+        )
+        print(f"\nBaseline uložena do {BASELINE_PATH}")
+        sys.exit(0)
+
+    regressions = compare(results, load_baseline(), settings, args.tolerance)
+    if regressions:
+        print("\n❌ Regrese oproti baseline:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print("\n✅ Bez regresí oproti baseline.")
@@ -0,0 +1,117 @@
+import sys
+import time
+import inspect
+import argparse
+from pathlib import Path
+
+"""
+Benchmark kompaktních analytických promptů (llm_query.prompt_builder).
+
+Pro každý dotaz z QUERY_CONFIG s "prompt_spec" porovná původní prompt
+(prompt_func – markdown tabulka s formátovanými částkami) s kompaktním
+promptem v rozpočtu tokenů: počet tokenů, úsporu, počet řádků sloučených
+do "Ostatní" nebo vynechaných (měsíce mimo rozpočet) a dobu sestavení.
+Doba "původní + kompaktní" odpovídá dřívějšímu process_query, které kvůli
+metrice úspory sestavovalo a tokenizovalo i původní prompt.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.prompts
+python -m benchmarks.prompts --widen 20 --budget 200
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import add_instrumentation_arguments, instrumented
+
+
+def widen_categories(df, factor):
+    """Rozdělí kategorie, odběratele a typy anomálií na factor variant (simulace růstu)"""
+    widened = df.copy()
+    suffix = (widened.index % factor).astype(str)
+    for column in ("category", "customer_name", "anomaly_type"):
+        widened[column] = widened[column].where(widened[column].isna(), widened[column] + " " + suffix)
+    return widened
+
+
+def legacy_prompt(config, data, typ):
+    if len(inspect.signature(config["prompt_func"]).parameters) == 2:
+        return config["prompt_func"](data, typ)
+    return config["prompt_func"](data)
+
+
+def best_time(func, repeat):
+    """Nejlepší čas z repeat opakování v milisekundách"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def compare_prompts(df, typ="Příjmy", budget=None, repeat=5):
+    """Porovná původní (prompt_func) a kompaktní prompty všech dotazů
+
+    Returns:
+    list: Slovníky s klíči query, legacy, compact, rolled_up, legacy_ms a compact_ms
+    """
+    from rag.tokenizer import count_tokens
+    from llm_query.prompt_builder import build_prompt
+    from llm_query.query_config import QUERY_CONFIG
+
+    rows = []
+    for key, config in QUERY_CONFIG.items():
+        if "prompt_spec" not in config:
+            continue
+        data = config["format_func"](config["agg_func"](df))
+        legacy = legacy_prompt(config, data, typ)
+        _, tokens, rolled_up = build_prompt(config["prompt_spec"], data, typ=typ, budget=budget)
+
+        def compact_only():
+            build_prompt(config["prompt_spec"], data, typ=typ, budget=budget)
+
+        def with_legacy():
+            count_tokens(legacy_prompt(config, data, typ))
+            compact_only()
+
+        rows.append({
+            "query": key, "legacy": count_tokens(legacy), "compact": tokens, "rolled_up": rolled_up,
+            "legacy_ms": best_time(with_legacy, repeat), "compact_ms": best_time(compact_only, repeat),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Porovnání tokenů a doby sestavení původních a kompaktních promptů')
+    parser.add_argument('--csv', type=str, default=str(PROJECT_ROOT / 'utils' / 'synthetic_project_data.csv'),
+                        help='CSV s fakturami (výchozí: utils/synthetic_project_data.csv)')
+    parser.add_argument('--widen', type=int, default=1,
+                        help='Rozdělí kategorie a typy anomálií na N variant – simulace většího počtu řádků')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='Rozpočet tokenů pro všechny dotazy (výchozí: "budget" v prompt_spec)')
+    parser.add_argument('--repeat', type=int, default=5, help='Počet opakování měření času (výchozí: 5)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    import pandas as pd
+    from rag.tokenizer import tokenizer_name
+
+    with instrumented(args):
+        invoices = pd.read_csv(args.csv)
+        invoices['total_amount'] = invoices['total_amount'].round().astype(int)
+        if args.widen > 1:
+            invoices = widen_categories(invoices, args.widen)
+        results = compare_prompts(invoices, budget=args.budget, repeat=args.repeat)
+
+    print(f"Tokenizer: {tokenizer_name()}\n")
+    print(f"{'dotaz':<25} {'původní':>8} {'kompaktní':>10} {'úspora':>8} {'zkráceno':>9} "
+          f"{'původní+kompaktní [ms]':>23} {'kompaktní [ms]':>15}")
+    for row in results:
+        saving = 1 - row["compact"] / row["legacy"]
+        print(f"{row['query']:<25} {row['legacy']:>8} {row['compact']:>10} {saving:>7.0%} {row['rolled_up']:>9} "
+              f"{row['legacy_ms']:>23.2f} {row['compact_ms']:>15.2f}")
+    legacy_total = sum(row["legacy"] for row in results)
+    compact_total = sum(row["compact"] for row in results)
+    print(f"{'celkem':<25} {legacy_total:>8} {compact_total:>10} {1 - compact_total / legacy_total:>7.0%} {'':>9} "
+          f"{sum(row['legacy_ms'] for row in results):>23.2f} {sum(row['compact_ms'] for row in results):>15.2f}")
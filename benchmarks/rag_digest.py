@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+"""
+Benchmark ranního přehledu Tech Novinek: N pevných otázek přes TechNewsRAG.
+
+Porovná dva způsoby: otázky po jedné přes query (každá se zembedduje
+zvlášť, vyhledává zvlášť a generuje sekvenčně) a jednou dávkou přes
+query_many (jedno dávkové embedování a vyhledávání, souběžné generování).
+Články se stáhnou jednou při vytvoření instance (refresh_seconds je delší
+než běh benchmarku). OpenAI a NewsAPI nahrazuje lokální
+falešný backend z benchmarks.load_test s nastavitelnou latencí modelu.
+Ověří, že oba způsoby vrátí pro každou otázku stejné články, a vypíše
+celkový čas a časy jednotlivých otázek dávky. Pokud se vyhledané články
+liší, skončí s návratovým kódem 1.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.rag_digest
+python -m benchmarks.rag_digest --questions 40 --llm_latency 2 --max_workers 8 --outbound_rate 20
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import add_instrumentation_arguments, instrumented
+from benchmarks.load_test import NEWS_TOPICS, start_fake_backends, percentile
+
+QUESTION_TEMPLATES = [
+    "Jaké jsou novinky v oblasti {topic}?",
+    "Co se tento týden stalo kolem {topic}?",
+    "What is new in {topic}?",
+    "Shrň nejdůležitější zprávy o {topic}",
+]
+
+
+def digest_questions(count):
+    """Pevná sada otázek ranního přehledu (kombinace šablon a témat)"""
+    questions = [template.format(topic=topic) for topic in NEWS_TOPICS for template in QUESTION_TEMPLATES]
+    return [questions[i % len(questions)] for i in range(count)]
+
+
+def retrieved_urls(results):
+    return [meta["url"] for meta in results["metadatas"][0]] if results else []
+
+
+def run_benchmark(args):
+    from utils import outbound
+
+    backend, backend_url = start_fake_backends(args.llm_latency, args.articles, args.seed)
+    os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = f"{backend_url}/v1"
+    import rag.newsapi_client
+    rag.newsapi_client.NEWSAPI_URL = f"{backend_url}/v2/everything"
+    if args.outbound_rate:
+        for name in ("openai", "newsapi"):
+            outbound._providers[name] = outbound.ProviderClient(
+                name, rate=args.outbound_rate, burst=max(1, int(args.outbound_rate)), max_concurrency=16
+            )
+
+    questions = digest_questions(args.questions)
+    rag_client = rag.newsapi_client.TechNewsRAG(
+        newsapi_key="benchmark", openai_api_key="benchmark", embedding_backend=args.embedding_backend
+    )
+
+    print(f"Ranní přehled: {len(questions)} otázek, latence modelu {args.llm_latency} s")
+    rag_client.answer_cache.clear()
+    start = time.perf_counter()
+    sequential = [rag_client.query(question) for question in questions]
+    sequential_seconds = time.perf_counter() - start
+
+    rag_client.answer_cache.clear()
+    start = time.perf_counter()
+    batch = rag_client.query_many(questions, max_workers=args.max_workers)
+    batch_seconds = time.perf_counter() - start
+    backend.shutdown()
+
+    mismatches = [
+        item["question"] for (_, results), item in zip(sequential, batch)
+        if retrieved_urls(results) != retrieved_urls(item["results"])
+    ]
+    totals = [item["timings"]["total"] for item in batch]
+    shared = batch[0]["timings"] if batch else {}
+    print(f"\n{'způsob':<24} {'celkem [s]':>11}")
+    print(f"{'query po jedné':<24} {sequential_seconds:>11.2f}")
+    print(f"{'query_many':<24} {batch_seconds:>11.2f}   zrychlení {sequential_seconds / batch_seconds:.1f}×")
+    if batch:
+        print(f"\nquery_many: aktualizace {shared['refresh']:.2f} s, embedding {shared['embed']:.3f} s, "
+              f"vyhledávání {shared['search']:.3f} s")
+        print(f"odpověď hotová od začátku dávky: p50 {percentile(totals, 0.5):.2f} s, "
+              f"p95 {percentile(totals, 0.95):.2f} s, max {max(totals):.2f} s")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark dávkových dotazů Tech Novinek (query vs. query_many)')
+    parser.add_argument('--questions', type=int, default=20, help='Počet otázek přehledu (výchozí: 20)')
+    parser.add_argument('--llm_latency', type=float, default=0.5,
+                        help='Latence falešného LLM v sekundách (výchozí: 0.5)')
+    parser.add_argument('--articles', type=int, default=60, help='Počet falešných článků na jazyk (výchozí: 60)')
+    parser.add_argument('--max_workers', type=int, default=4,
+                        help='Počet souběžně generovaných odpovědí v query_many (výchozí: 4)')
+    parser.add_argument('--embedding_backend', type=str, default="hashing", choices=["hashing", "openai"],
+                        help='Embedding backend (výchozí: hashing; openai potřebuje pro tiktoken síť)')
+    parser.add_argument('--outbound_rate', type=float, default=None,
+                        help='Přepíše limit požadavků za sekundu na OpenAI a NewsAPI (výchozí: OUTBOUND_LIMITS)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed falešných článků (výchozí: 42)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        mismatches = run_benchmark(args)
+
+    if mismatches:
+        print("\n❌ query_many vrátil jiné články než query pro otázky:")
+        for question in mismatches:
+            print(f"  - {question}")
+        sys.exit(1)
+    print("\n✅ query_many vrací pro každou otázku stejné články jako query.")
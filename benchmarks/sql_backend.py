@@ -0,0 +1,173 @@
+import sys
+import time
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+"""
+Kontrola shody a benchmark SQL backendu analytických dotazů (llm_query.sql_backend).
+
+Nejdřív se ověří, že SQL agregace vrací stejný výsledek jako agg_func
+z QUERY_CONFIG – nad ukázkovými daty projektu (CSV) i nad vygenerovaným
+Parquet souborem. Pak se změří doba všech dotazů v DuckDB a pro srovnání
+i v pandas (načtení potřebných sloupců + agg_func). Pandas se u velkých
+objemů přeskakuje (--pandas_max_rows), protože se data do paměti nevejdou.
+Při neshodě výsledků skončí s návratovým kódem 1.
+
+Spuštění (z kořenového adresáře projektu):
+python -m benchmarks.sql_backend
+python -m benchmarks.sql_backend --rows 50000000 --memory_limit 2GB
+"""
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from utils.metrics import add_instrumentation_arguments, instrumented
+
+SAMPLE_CSV = PROJECT_ROOT / "utils" / "synthetic_project_data.csv"
+
+# Sloupce, které agregace používají (pandas je načítá jen tyto)
+QUERY_COLUMNS = [
+    'invoice_id', 'invoice_date', 'transaction_type', 'total_amount', 'customer_name',
+    'category', 'delay_days', 'is_anomaly', 'anomaly_type'
+]
+
+
+def peak_rss_mb():
+    """Špička rezidentní paměti procesu v MB (včetně alokací DuckDB mimo Python)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def compare_results(expected, actual):
+    """Porovná výsledek agg_func a SQL backendu; vrátí popis rozdílu nebo None
+
+    Součty částek se porovnávají přesně (obě strany sčítají celé koruny),
+    podíly a průměry s relativní tolerancí.
+    """
+    import pandas as pd
+
+    try:
+        pd.testing.assert_frame_equal(expected, actual, check_exact=False, rtol=1e-9)
+        return None
+    except AssertionError as error:
+        return str(error)
+
+
+def app_frame(df):
+    """Připraví data stejně jako stránka Analytika (částky zaokrouhlené na celé koruny)"""
+    df = df.copy()
+    df['total_amount'] = df['total_amount'].round().astype(int)
+    return df
+
+
+def check_parity(df, source, label):
+    """Porovná všechny dotazy QUERY_CONFIG mezi pandas (nad daty připravenými
+    jako v aplikaci) a SQL; vrátí seznam neshod"""
+    from llm_query.query_config import QUERY_CONFIG
+    from llm_query.sql_backend import aggregate
+
+    df = app_frame(df)
+    failures = []
+    for key, config in QUERY_CONFIG.items():
+        difference = compare_results(config["agg_func"](df), aggregate(key, source))
+        status = "OK" if difference is None else "NESHODA"
+        print(f"  {label:<10} {key:<25} {status}")
+        if difference is not None:
+            failures.append(f"{label}/{key}: {difference}")
+    return failures
+
+
+def prepare_parquet(path, rows, seed):
+    """Vygeneruje Parquet s rows fakturami, pokud už neexistuje se stejným počtem řádků"""
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    if path.exists() and pq.ParquetFile(path).metadata.num_rows == rows:
+        print(f"Používám existující data {path} ({rows} faktur)")
+        return path
+    # Generuje se v samostatném procesu, aby paměť generátoru nezkreslila měření
+    subprocess.run(
+        [sys.executable, "-m", "utils.synthetic_bulk", "--n", str(rows), "--output", str(path), "--seed", str(seed)],
+        cwd=PROJECT_ROOT, check=True
+    )
+    print(f"  velikost {path.stat().st_size / 1024 ** 2:.0f} MB")
+    return path
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(rows, data_path, seed, repeat, memory_limit, pandas_max_rows):
+    import pandas as pd
+    from llm_query.query_config import QUERY_CONFIG
+    from llm_query.sql_backend import aggregate, connect
+
+    print("Kontrola shody pandas vs. SQL:")
+    failures = check_parity(pd.read_csv(SAMPLE_CSV), SAMPLE_CSV, "CSV")
+
+    source = prepare_parquet(data_path, rows, seed)
+
+    # SQL se měří před pandas, aby špička paměti odpovídala jen DuckDB
+    conn = connect(memory_limit=memory_limit)
+    sql_times = {
+        key: best_time(lambda key=key: aggregate(key, source, conn=conn), repeat)
+        for key in QUERY_CONFIG
+    }
+    conn.close()
+    sql_peak = peak_rss_mb()
+
+    pandas_times = {}
+    load_time = None
+    if rows <= pandas_max_rows:
+        start = time.perf_counter()
+        df = app_frame(pd.read_parquet(source, columns=QUERY_COLUMNS))
+        load_time = time.perf_counter() - start
+        failures += check_parity(df, source, "Parquet")
+        pandas_times = {key: best_time(lambda config=config: config["agg_func"](df), repeat)
+                        for key, config in QUERY_CONFIG.items()}
+    else:
+        print(f"  Parquet    pandas přeskočeno ({rows} > --pandas_max_rows {pandas_max_rows})")
+
+    print(f"\n{'dotaz':<25} {'SQL [s]':>9} {'pandas [s]':>11} {'řádků/s (SQL)':>15}")
+    for key in QUERY_CONFIG:
+        pandas_text = f"{pandas_times[key]:>11.3f}" if key in pandas_times else f"{'–':>11}"
+        print(f"{key:<25} {sql_times[key]:>9.3f} {pandas_text} {rows / sql_times[key]:>15,.0f}")
+    print(f"\nSQL celkem: {sum(sql_times.values()):.2f} s, špička paměti procesu {sql_peak:.0f} MB")
+    if load_time is not None:
+        print(f"pandas celkem: {load_time + sum(pandas_times.values()):.2f} s "
+              f"(z toho načtení {load_time:.2f} s), špička paměti procesu {peak_rss_mb():.0f} MB")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Kontrola shody a benchmark SQL backendu analytických dotazů')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Počet faktur v Parquet souboru (výchozí: 1000000)')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Parquet soubor s daty (výchozí: synthetic_invoices_<rows>.parquet, vygeneruje se)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed generovaných dat (výchozí: 42)')
+    parser.add_argument('--repeat', type=int, default=3, help='Počet opakování měření (výchozí: 3)')
+    parser.add_argument('--memory_limit', type=str, default=None, help='Limit paměti DuckDB, např. 2GB')
+    parser.add_argument('--pandas_max_rows', type=int, default=5_000_000,
+                        help='Nad tento počet řádků se pandas neměří (výchozí: 5000000)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        failures = run_benchmark(
+            args.rows, args.data or f"synthetic_invoices_{args.rows}.parquet", args.seed,
+            args.repeat, args.memory_limit, args.pandas_max_rows
+        )
+
+    if failures:
+        print("\n❌ Výsledky SQL a pandas se liší:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\n✅ SQL backend dává stejné výsledky jako pandas.")
@@ -1,2 +1,11 @@
 NEWSAPI_KEY = ""
-OPENAI_API_KEY = ""
\ No newline at end of file
+OPENAI_API_KEY = ""
+EMBEDDING_BACKEND = "openai"
+VECTOR_INDEX_TYPE = "flat"
+VECTOR_INDEX_PARAMS = {}
+CONTEXT_TOKEN_BUDGET = 1500
+NEWS_REFRESH_SECONDS = 900
+SCORE_STORE_PATH = "ml_models/anomaly_scores.db"
+ANALYTICS_SOURCE = None
+PROMPT_TOKEN_BUDGETS = {}
+OUTBOUND_LIMITS = {}
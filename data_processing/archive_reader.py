@@ -0,0 +1,72 @@
+import os
+import tarfile
+import zipfile
+
+# Přípony archivů, ze kterých se načítají PDF faktury
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Maximální velikost jednoho PDF v archivu (ochrana proti zip bombám)
+MAX_MEMBER_SIZE = 50 * 1024 * 1024
+
+
+def is_archive(name):
+    """Vrátí True, pokud název souboru odpovídá podporovanému archivu"""
+    return str(name).lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def _skip(name, size, max_member_size, skipped):
+    """Zaznamená příliš velký soubor, který se přeskočí"""
+    if skipped is not None:
+        skipped.append((name, f"soubor má {size} B, limit je {max_member_size} B – přeskočen"))
+
+
+def _iter_zip(source, max_member_size, skipped):
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                continue
+            if info.file_size > max_member_size:
+                _skip(info.filename, info.file_size, max_member_size, skipped)
+                continue
+            yield info.filename, archive.read(info)
+
+
+def _iter_tar(source, max_member_size, skipped):
+    # Režim "r|*" čte archiv sekvenčně jako proud – v paměti je vždy jen aktuální soubor
+    if isinstance(source, (str, os.PathLike)):
+        archive = tarfile.open(source, mode="r|*")
+    else:
+        archive = tarfile.open(fileobj=source, mode="r|*")
+    with archive:
+        for member in archive:
+            if not member.isfile() or not member.name.lower().endswith(".pdf"):
+                continue
+            if member.size > max_member_size:
+                _skip(member.name, member.size, max_member_size, skipped)
+                continue
+            yield member.name, archive.extractfile(member).read()
+
+
+def iter_archive_pdfs(source, name=None, max_member_size=MAX_MEMBER_SIZE, skipped=None):
+    """Postupně (lazy) vrací PDF soubory z archivu ZIP nebo TAR bez rozbalení na disk
+
+    PDF větší než max_member_size se přeskočí (zbytek archivu se zpracuje)
+    a zapíše do seznamu skipped.
+
+    Parameters:
+    source: Cesta k archivu nebo file-like objekt (např. Streamlit UploadedFile)
+    name (str): Název archivu pro určení typu, pokud source není cesta
+    max_member_size (int): Maximální velikost jednoho PDF v bajtech
+    skipped (list): Seznam, do kterého se připíšou přeskočené soubory jako
+        dvojice (název souboru v archivu, důvod)
+
+    Yields:
+    tuple: (název souboru v archivu, obsah PDF jako bytes)
+    """
+    name = str(name or source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if name.lower().endswith(".zip"):
+        yield from _iter_zip(source, max_member_size, skipped)
+    else:
+        yield from _iter_tar(source, max_member_size, skipped)
@@ -1,7 +1,9 @@
 import os
+import time
 import argparse
-from .pdf_text_extractor import extract_invoice_data
-from .entity_extractor import create_invoice_dataframe
+from .pdf_text_extractor import extract_invoices
+from .archive_reader import is_archive, iter_archive_pdfs
+from utils.metrics import metrics, add_instrumentation_arguments, instrumented
 
 def get_pdf_files(directory):
     pdf_files = []
@@ -11,31 +13,68 @@ def get_pdf_files(directory):
                 pdf_files.append(os.path.join(root, file))
     return pdf_files
 
+def iter_pdf_sources(path, names):
+    """Postupně vrací zdroje PDF ze složky nebo archivu a jejich názvy ukládá do names
+
+    Složka se vrátí jako seznam cest (extract_invoices pak nespustí víc
+    procesů, než je souborů), archiv jako generátor čtený postupně.
+    """
+    if not is_archive(path):
+        pdf_files = get_pdf_files(path)
+        names.extend(os.path.basename(pdf_path) for pdf_path in pdf_files)
+        return pdf_files
+    return _iter_archive_sources(path, names)
+
+def _iter_archive_sources(path, names):
+    skipped = []
+    for name, data in iter_archive_pdfs(path, skipped=skipped):
+        names.append(name)
+        yield data
+    for name, reason in skipped:
+        print(f"Přeskočeno {name}: {reason}")
+
 # Zpracování faktur
 if __name__ == "__main__":
     # Argumenty příkazové řádky
     parser = argparse.ArgumentParser(description='Dávkové zpracování PDF faktur')
-    parser.add_argument('--pdf_dir', type=str, required=True, help='Cesta k adresáři s PDF fakturami')
+    parser.add_argument('--pdf_dir', type=str, required=True,
+                       help='Cesta k adresáři s PDF fakturami nebo k archivu ZIP/TAR')
     parser.add_argument('--output', type=str, default="vysledky_faktur.csv", 
                        help='Název výstupního CSV souboru (výchozí: vysledky_faktur.csv)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Počet paralelních procesů (výchozí: počet jader)')
+    add_instrumentation_arguments(parser)
     args = parser.parse_args()
-    
-    pdf_files = get_pdf_files(args.pdf_dir)
-    print(f"Nalezeno {len(pdf_files)} PDF souborů.")
-
-    # Extrakce dat z každého PDF
-    pdf_results = []
-    for path in pdf_files:
-        try:
-            data = extract_invoice_data(path)
-            pdf_results.append(data)
-            print(f"Zpracováno: {os.path.basename(path)}")
-        except Exception as e:
-            print(f"Chyba při zpracování {path}: {str(e)}")
-
-    # Vytvoření DataFrame
-    df = create_invoice_dataframe(pdf_results)
-
-    # Uložení výsledků
-    df.to_csv(args.output, index=False, encoding="utf-8-sig")
-    print(f"Hotovo! Výsledky jsou uloženy v souboru {args.output}")
\ No newline at end of file
+
+    with instrumented(args):
+        # Složka se projde jen jednou – vypsaný počet odpovídá zpracovaným souborům
+        names = []
+        sources = iter_pdf_sources(args.pdf_dir, names)
+        if not is_archive(args.pdf_dir):
+            print(f"Nalezeno {len(sources)} PDF souborů.")
+
+        # Extrakce dat z každého PDF (z archivu se čte postupně bez rozbalení na disk)
+        start = time.perf_counter()
+        results = {}
+        for i, data, error in extract_invoices(sources, max_workers=args.workers):
+            if error is None:
+                results[i] = data
+                print(f"Zpracováno: {names[i]}")
+            else:
+                print(f"Chyba při zpracování {names[i]}: {str(error)}")
+        pdf_results = [results[i] for i in sorted(results)]
+        elapsed = time.perf_counter() - start
+        metrics.observe("batch_extract_seconds", elapsed)
+        print(f"Extrahováno {len(pdf_results)}/{len(names)} faktur za {elapsed:.1f} s")
+
+        if not pdf_results:
+            print("Nebyly zpracovány žádné faktury.")
+            raise SystemExit(1)
+
+        # Vytvoření DataFrame (pandas se načítá až tady, když jsou co zpracovat)
+        from .entity_extractor import create_invoice_dataframe
+        df = create_invoice_dataframe(pdf_results)
+
+        # Uložení výsledků
+        df.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"Hotovo! Výsledky jsou uloženy v souboru {args.output}")
\ No newline at end of file
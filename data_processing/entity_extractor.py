@@ -2,6 +2,7 @@ import pandas as pd
 from datetime import datetime
 from .pdf_text_extractor import extract_invoice_data  
 from pandas.tseries.offsets import MonthEnd
+from utils.metrics import metrics
 
 def is_month_end_or_two_days_before(date):
     """Vrátí True pokud datum je poslední den měsíce nebo 2 dny před koncem měsíce"""
@@ -59,7 +60,8 @@ def process_items(items):
 
 def create_invoice_dataframe(extracted_data_list):
     """Vytvoří DataFrame z listu extrahovaných textových dat"""
-    return pd.concat([process_extracted_data(data) for data in extracted_data_list], ignore_index=True)
+    with metrics.timer("invoice_dataframe"):
+        return pd.concat([process_extracted_data(data) for data in extracted_data_list], ignore_index=True)
 
 # Příklad použití
 # if __name__ == "__main__":
@@ -0,0 +1,299 @@
+"""
+Průběžné zpracování faktur ze sledované složky (inbox).
+
+Démon v intervalech prochází složku, nové PDF zpracuje po malých dávkách
+(extrakce, preprocessing a predikce XGBoost modelem, který zůstává načtený
+v paměti) a výsledky připisuje do úložiště faktur (CSV). Zpracované soubory
+se zapisují do manifestu, takže po pádu nebo restartu se nic nezpracuje
+dvakrát ani nevynechá.
+
+Spuštění (z kořenového adresáře projektu):
+python -m data_processing.inbox_watcher --inbox "/cesta/k/inboxu" --store vysledky_inbox.csv
+"""
+
+import os
+import json
+import time
+import signal
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+from .pdf_text_extractor import extract_invoices
+from utils.metrics import metrics, add_instrumentation_arguments, instrumented
+
+MODEL_PATH = Path(__file__).parent.parent / "ml_models" / "xgb_model.pkl"
+
+
+def _append_durably(path, text):
+    """Připíše text na konec souboru a počká na zápis na disk (fsync)"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _repair_torn_tail(path):
+    """Po pádu uprostřed zápisu odřízne neúplný poslední řádek souboru"""
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with open(path, "rb+") as f:
+        # Čte se od konce po blocích, úložiště může být velké
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            block_start = max(0, position - 65536)
+            f.seek(block_start)
+            block = f.read(position - block_start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                cut = block_start + newline + 1
+                break
+            position = block_start
+        else:
+            cut = 0
+        if cut != end:
+            f.truncate(cut)
+
+
+class ProcessedManifest:
+    """Append-only manifest zpracovaných souborů (JSON Lines)
+
+    Záznam obsahuje název, velikost a čas změny souboru – soubor, který
+    se stejným názvem později změní obsah, se zpracuje znovu.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        _repair_torn_tail(self.path)
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.entries[entry["name"]] = entry
+
+    def is_processed(self, name, stat):
+        entry = self.entries.get(name)
+        return entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def mark(self, items):
+        """Zapíše dávku záznamů (name, stat, status, error) jedním zápisem"""
+        lines = []
+        for name, stat, status, error in items:
+            entry = {
+                "name": name,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "status": status,
+                "error": error,
+                "processed_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self.entries[name] = entry
+            lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        if lines:
+            _append_durably(self.path, "".join(lines))
+
+
+class InboxWatcher:
+    """Sleduje složku s příchozími PDF a průběžně je zpracovává a skóruje"""
+
+    def __init__(self, inbox, store, manifest=None, batch_size=16, workers=1, interval=2.0):
+        """
+        Parameters:
+        inbox (str): Sledovaná složka s příchozími PDF
+        store (str): CSV úložiště faktur, do kterého se připisují výsledky
+        manifest (str): Soubor manifestu (výchozí: <store>.manifest.jsonl)
+        batch_size (int): Maximální počet souborů v jedné dávce
+        workers (int): Počet procesů pro extrakci PDF
+        interval (float): Interval procházení složky v sekundách
+        """
+        self.inbox = Path(inbox)
+        self.store = Path(store)
+        self.manifest = ProcessedManifest(manifest or f"{store}.manifest.jsonl")
+        self.batch_size = batch_size
+        self.workers = workers
+        self.interval = interval
+        self._pending_stats = {}  # název -> (velikost, mtime) z minulého průchodu
+        self._stop = False
+
+        # Model, encodery a scaler se načtou jednou a zůstanou v paměti
+        import joblib
+        from ml_models.predict_pdf_batch import load_artifact
+        self.model = joblib.load(MODEL_PATH)
+        load_artifact("label_encoders.pkl")
+        load_artifact("scaler.pkl")
+
+        _repair_torn_tail(self.store)
+        self._reconcile()
+
+    def _reconcile(self):
+        """Doplní do manifestu soubory, které už jsou v úložišti (pád mezi zápisy)"""
+        if not self.store.exists() or self.store.stat().st_size == 0:
+            return
+        import pandas as pd
+
+        stored = set(pd.read_csv(self.store, usecols=["source_file"])["source_file"].astype(str))
+        missing = []
+        for name in stored:
+            path = self.inbox / name
+            if path.exists() and not self.manifest.is_processed(name, path.stat()):
+                missing.append((name, path.stat(), "ok", None))
+        self.manifest.mark(missing)
+
+    def stop(self, *_):
+        """Ukončí smyčku po dokončení rozpracované dávky"""
+        self._stop = True
+
+    def scan(self):
+        """Vrátí nové PDF, jejichž velikost a čas změny se od minulého průchodu nezměnily
+
+        Soubor, který se teprve kopíruje, se tak nezpracuje rozepsaný.
+        """
+        ready = []
+        current = {}
+        with os.scandir(self.inbox) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(".pdf"):
+                    continue
+                stat = entry.stat()
+                if self.manifest.is_processed(entry.name, stat):
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                current[entry.name] = signature
+                if self._pending_stats.get(entry.name) == signature:
+                    ready.append((stat.st_mtime, entry.name, stat))
+        self._pending_stats = current
+        # Nejstarší soubory první
+        return [(name, stat) for _, name, stat in sorted(ready)]
+
+    def process_batch(self, batch):
+        """Zpracuje dávku souborů a vrátí počet úspěšně zpracovaných faktur
+
+        Chyba jednoho souboru (extrakce, sestavení záznamu) ani chyba skórování
+        dávky démona neukončí – dotčené soubory se zapíšou do manifestu jako "error".
+        """
+        import pandas as pd
+        from .entity_extractor import create_invoice_dataframe
+        from ml_models.predict_pdf_batch import preprocess_data, predict_anomalies, ANOMALY_LABELS, NO_ANOMALY_CODE
+
+        frames = {}
+        manifest_items = []
+        paths = [str(self.inbox / name) for name, _ in batch]
+        for i, data, error in extract_invoices(paths, max_workers=self.workers):
+            name, stat = batch[i]
+            if error is None:
+                # Záznam se sestavuje po souborech – chybějící pole vyřadí jen svou fakturu
+                try:
+                    frames[i] = create_invoice_dataframe([data])
+                except Exception as e:
+                    error = e
+            if error is not None:
+                print(f"Chyba při zpracování {name}: {error}")
+                manifest_items.append((name, stat, "error", str(error)))
+
+        processed = 0
+        if frames:
+            order = sorted(frames)
+            try:
+                df = pd.concat([frames[i] for i in order], ignore_index=True)
+                df.insert(0, "source_file", [batch[i][0] for i in order])
+                # Preprocessing vyřadí faktury s neplatnou částkou nebo počtem položek,
+                # predikce se proto přiřazují podle indexu stejně jako v aplikaci
+                X = preprocess_data(df)
+                y_pred, y_proba = predict_anomalies(self.model, X)
+            except Exception as e:
+                print(f"Chyba při skórování dávky: {e}")
+                manifest_items.extend((batch[i][0], batch[i][1], "error", str(e)) for i in order)
+            else:
+                dropped = df.index.difference(X.index)
+                for row in dropped:
+                    manifest_items.append((
+                        df.at[row, "source_file"], batch[order[row]][1], "error",
+                        "neplatná částka nebo počet položek"
+                    ))
+                scored_rows = [order[row] for row in X.index]
+
+                df = df.loc[X.index]
+                df["anomaly_type_pred"] = y_pred
+                df["anomaly_label"] = pd.Series(y_pred, index=X.index).map(ANOMALY_LABELS)
+                df["anomaly_confidence"] = y_proba
+                df["processed_at"] = datetime.now().isoformat(timespec="seconds")
+
+                if scored_rows:
+                    # Nejdřív výsledky, pak manifest – při pádu mezi zápisy je dorovná _reconcile
+                    write_header = not self.store.exists() or self.store.stat().st_size == 0
+                    _append_durably(self.store, df.to_csv(index=False, header=write_header))
+                    manifest_items.extend((batch[i][0], batch[i][1], "ok", None) for i in scored_rows)
+                    processed = len(scored_rows)
+
+                    # Latence od příchodu souboru (čas změny) po zápis výsledku
+                    now = time.time()
+                    latencies = [now - batch[i][1].st_mtime for i in scored_rows]
+                    for latency in latencies:
+                        metrics.observe("inbox_latency_seconds", latency)
+                    anomalies = int((df["anomaly_type_pred"] != NO_ANOMALY_CODE).sum())
+                    metrics.inc("inbox_anomalies_total", anomalies)
+                    print(f"Zpracováno {processed} faktur ({anomalies} anomálií), "
+                          f"latence průměr {sum(latencies) / len(latencies):.1f} s, max {max(latencies):.1f} s")
+
+        self.manifest.mark(manifest_items)
+        metrics.inc("inbox_errors_total", sum(item[2] == "error" for item in manifest_items))
+        metrics.inc("inbox_batches_total")
+        return processed
+
+    def run_once(self):
+        """Jeden průchod složkou – zpracuje všechny připravené soubory po dávkách"""
+        ready = self.scan()
+        processed = 0
+        for start in range(0, len(ready), self.batch_size):
+            batch = ready[start:start + self.batch_size]
+            try:
+                with metrics.timer("inbox_batch"):
+                    processed += self.process_batch(batch)
+            except Exception as e:
+                # Nečekaná chyba (např. zápis do úložiště) – soubory dávky, které ještě
+                # nejsou v manifestu, se označí jako chybné a démon pokračuje
+                print(f"Chyba při zpracování dávky: {e}")
+                self.manifest.mark([
+                    (name, stat, "error", str(e)) for name, stat in batch
+                    if not self.manifest.is_processed(name, stat)
+                ])
+            for name, _ in batch:
+                self._pending_stats.pop(name, None)
+            if self._stop:
+                break
+        return processed
+
+    def run(self, once=False):
+        """Hlavní smyčka; s once=True skončí, jakmile ve složce nejsou nové soubory"""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        print(f"Sleduji složku {self.inbox} (interval {self.interval} s, dávka {self.batch_size})")
+        while not self._stop:
+            self.run_once()
+            if once and not self._pending_stats:
+                break
+            time.sleep(self.interval)
+        print("Sledování ukončeno.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Průběžné zpracování a skórování faktur ze sledované složky')
+    parser.add_argument('--inbox', type=str, required=True, help='Sledovaná složka s příchozími PDF')
+    parser.add_argument('--store', type=str, default="vysledky_inbox.csv",
+                        help='CSV úložiště výsledků (výchozí: vysledky_inbox.csv)')
+    parser.add_argument('--manifest', type=str, default=None,
+                        help='Manifest zpracovaných souborů (výchozí: <store>.manifest.jsonl)')
+    parser.add_argument('--batch_size', type=int, default=16, help='Maximální velikost dávky (výchozí: 16)')
+    parser.add_argument('--workers', type=int, default=1, help='Počet procesů pro extrakci (výchozí: 1)')
+    parser.add_argument('--interval', type=float, default=2.0, help='Interval procházení v sekundách (výchozí: 2)')
+    parser.add_argument('--once', action='store_true', help='Zpracuje aktuální obsah složky a skončí')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        InboxWatcher(
+            args.inbox, args.store, manifest=args.manifest, batch_size=args.batch_size,
+            workers=args.workers, interval=args.interval
+        ).run(once=args.once)
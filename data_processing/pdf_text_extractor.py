@@ -1,6 +1,12 @@
+import io
+import os
 import re
+import time
 from pypdf import PdfReader
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from utils.metrics import metrics
 
 def parse_invoice_text(text):
     result = defaultdict(list)
@@ -60,8 +66,21 @@ def parse_invoice_text(text):
     
     return dict(result)
 
-def extract_invoice_data(pdf_path):
-    reader = PdfReader(pdf_path)
+def _as_pdf_source(source):
+    """Převede vstup na objekt čitelný pro PdfReader bez zápisu na disk
+
+    Cesta a file-like objekt (např. Streamlit UploadedFile) se předají přímo,
+    bytes se obalí do BytesIO, které v CPythonu sdílí buffer bez kopírování.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+def extract_pdf_text(source):
+    """Vrátí text PDF v layout režimu (vstup jako u extract_invoice_data)"""
+    reader = PdfReader(_as_pdf_source(source))
     text = ""
     
     for page in reader.pages:
@@ -72,7 +91,96 @@ def extract_invoice_data(pdf_path):
             layout_mode_space_vertically=False
         ) + "\n\n"
     
-    return parse_invoice_text(text)
+    return text
+
+def extract_invoice_data(source):
+    """Extrahuje data faktury z PDF
+
+    Parameters:
+    source: Cesta k souboru, bytes/bytearray/memoryview s obsahem PDF
+        nebo file-like objekt (BytesIO, UploadedFile)
+    """
+    return parse_invoice_text(extract_pdf_text(source))
+
+def _timed_extract(source):
+    """Extrahuje data faktury a vrátí je spolu s dobou extrakce textu a parsování
+
+    Běží i v podřízených procesech, kde by metriky zapsané přímo do registru
+    zanikly – časy se proto vracejí a zapisuje je až hlavní proces.
+    """
+    start = time.perf_counter()
+    text = extract_pdf_text(source)
+    parsed_at = time.perf_counter()
+    data = parse_invoice_text(text)
+    return data, parsed_at - start, time.perf_counter() - parsed_at
+
+def _record(index, result, error):
+    """Zapíše metriky jedné faktury a vrátí výsledek ve tvaru (index, data, chyba)"""
+    if error is not None:
+        metrics.inc("invoices_failed_total")
+        return index, None, error
+    data, extract_seconds, parse_seconds = result
+    metrics.inc("invoices_extracted_total")
+    metrics.observe("pdf_extract_seconds", extract_seconds)
+    metrics.observe("pdf_parse_seconds", parse_seconds)
+    return index, data, None
+
+def _picklable_source(source):
+    """Připraví vstup pro předání do jiného procesu (file-like objekty nejdou serializovat)"""
+    if isinstance(source, (str, os.PathLike, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+def extract_invoices(sources, max_workers=None, max_pending=None):
+    """Extrahuje data z více PDF, při více jádrech paralelně v procesech
+
+    Parameters:
+    sources (iterable): Vstupy ve formátu jako pro extract_invoice_data;
+        může jít i o generátor (např. soubory z archivu), čte se postupně
+    max_workers (int): Počet procesů (výchozí: počet jader)
+    max_pending (int): Maximální počet rozpracovaných souborů najednou
+        (výchozí: 2 × počet procesů) – drží paměť omezenou i u velkých archivů
+
+    Yields:
+    tuple: (index vstupu, extrahovaná data nebo None, výjimka nebo None)
+        v pořadí dokončení
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if hasattr(sources, "__len__"):
+        workers = min(workers, len(sources))
+    if workers <= 1:
+        for i, source in enumerate(sources):
+            try:
+                result = _timed_extract(source)
+            except Exception as e:
+                yield _record(i, None, e)
+            else:
+                yield _record(i, result, None)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        for i, source in enumerate(sources):
+            pending[executor.submit(_timed_extract, _picklable_source(source))] = i
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _future_result(future, pending.pop(future))
+        for future in as_completed(pending):
+            yield _future_result(future, pending[future])
+
+def _future_result(future, index):
+    try:
+        result = future.result()
+    except Exception as e:
+        return _record(index, None, e)
+    return _record(index, result, None)
 
 # # Příklad použití
 # if __name__ == "__main__":
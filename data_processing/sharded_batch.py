@@ -0,0 +1,465 @@
+"""
+Koordinované dávkové zpracování faktur na více strojích najednou.
+
+Soubory ze sdílené složky se zaregistrují do manifestu (SQLite databáze
+na sdíleném úložišti) a rozdělí do bloků. Každý pracovník (worker) si
+blok zabere pronájmem (lease) s omezenou platností, během zpracování ho
+průběžně obnovuje a po dokončení uloží výsledek bloku a označí ho jako
+hotový. Pronájem, který vyprší (pád nebo odpojení stroje), si převezme
+jiný pracovník. Blok, který selže opakovaně (DEFAULT_MAX_ATTEMPTS pokusů),
+se označí jako selhaný a už se znovu nezabírá. Nakonec se výsledky všech
+bloků sloučí do jednoho CSV.
+
+Spuštění (z kořenového adresáře projektu):
+python -m data_processing.sharded_batch register --manifest /share/manifest.db --pdf_dir /share/faktury
+python -m data_processing.sharded_batch work --manifest /share/manifest.db --output_dir /share/vysledky
+python -m data_processing.sharded_batch merge --manifest /share/manifest.db --output vysledky_faktur.csv
+
+Lokální simulace více strojů (procesy místo uzlů):
+python -m data_processing.sharded_batch local --manifest manifest.db --pdf_dir faktury --output_dir vysledky --nodes 4
+"""
+
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+from .batch_processor import get_pdf_files
+from .pdf_text_extractor import extract_invoices
+from utils.metrics import metrics, add_instrumentation_arguments, instrumented
+
+DEFAULT_CHUNK_SIZE = 50
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending / leased / done / failed
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    chunk_id INTEGER REFERENCES chunks(id)
+);
+CREATE INDEX IF NOT EXISTS files_chunk ON files(chunk_id);
+"""
+
+
+class WorkManifest:
+    """Sdílený manifest práce v SQLite s pronájmy bloků
+
+    Každá operace otevírá vlastní krátké spojení, takže manifest jde
+    bezpečně používat z více procesů, strojů i vláken (obnova pronájmu).
+    Zabrání bloku probíhá v transakci BEGIN IMMEDIATE, kterou SQLite
+    serializuje zámkem databázového souboru.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Manifest založený starší verzí nemá sloupec s poslední chybou bloku
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+            if "last_error" not in columns:
+                try:
+                    conn.execute("ALTER TABLE chunks ADD COLUMN last_error TEXT")
+                except sqlite3.OperationalError:
+                    pass  # Sloupec mezitím přidal jiný pracovník
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def register(self, root, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Zaregistruje PDF ze složky root a nové soubory rozdělí do bloků
+
+        Opakované volání je bezpečné – už registrované soubory se přeskočí.
+        Cesty se ukládají relativně ke root, aby fungovaly i na strojích,
+        kde je sdílená složka připojená jinde.
+
+        Returns:
+        int: Počet nově zaregistrovaných souborů
+        """
+        root = Path(root)
+        paths = sorted(os.path.relpath(path, root) for path in get_pdf_files(root))
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (str(root.resolve()),))
+            conn.executemany("INSERT OR IGNORE INTO files (path) VALUES (?)", [(p,) for p in paths])
+            new_paths = [row[0] for row in conn.execute("SELECT path FROM files WHERE chunk_id IS NULL ORDER BY path")]
+            for start in range(0, len(new_paths), chunk_size):
+                chunk_id = conn.execute("INSERT INTO chunks DEFAULT VALUES").lastrowid
+                conn.executemany(
+                    "UPDATE files SET chunk_id = ? WHERE path = ?",
+                    [(chunk_id, p) for p in new_paths[start:start + chunk_size]]
+                )
+        return len(new_paths)
+
+    def root(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        return row[0] if row else None
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Zabere první volný blok nebo blok s propadlým pronájmem
+
+        Blok s propadlým pronájmem, který už vyčerpal max_attempts pokusů
+        (např. soubor, na kterém pracovník opakovaně spadne), se místo
+        převzetí označí jako selhaný.
+
+        Returns:
+        tuple: (id bloku, seznam relativních cest) nebo None, pokud není co dělat
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE chunks SET status = 'failed', owner = NULL, lease_expires = NULL, "
+                "last_error = COALESCE(last_error, 'pronájem vypršel') "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id FROM chunks WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            chunk_id = row[0]
+            conn.execute(
+                "UPDATE chunks SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker_id, now + lease_seconds, chunk_id)
+            )
+            paths = [r[0] for r in conn.execute("SELECT path FROM files WHERE chunk_id = ? ORDER BY path", (chunk_id,))]
+        return chunk_id, paths
+
+    def renew(self, chunk_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Prodlouží pronájem; vrátí False, pokud blok mezitím převzal někdo jiný"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE chunks SET lease_expires = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+                (time.time() + lease_seconds, chunk_id, worker_id)
+            ).rowcount
+        return updated == 1
+
+    def complete(self, chunk_id, worker_id, output, errors=0):
+        """Označí blok jako hotový; vrátí False, pokud pronájem mezitím ztratil"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE chunks SET status = 'done', output = ?, errors = ?, lease_expires = NULL "
+                "WHERE id = ? AND owner = ? AND status = 'leased'",
+                (output, errors, chunk_id, worker_id)
+            ).rowcount
+        return updated == 1
+
+    def release(self, chunk_id, worker_id, error=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Vrátí blok po chybě zpracování zpět do fronty
+
+        Po max_attempts pokusech se blok místo vrácení označí jako selhaný.
+
+        Returns:
+        str: Nový stav bloku ('pending' nebo 'failed'), None při ztrátě pronájmu
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM chunks WHERE id = ? AND owner = ? AND status = 'leased'",
+                (chunk_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            status = "failed" if row[0] >= max_attempts else "pending"
+            conn.execute(
+                "UPDATE chunks SET status = ?, owner = NULL, lease_expires = NULL, last_error = ? WHERE id = ?",
+                (status, error, chunk_id)
+            )
+        return status
+
+    def progress(self):
+        """Vrátí počty bloků podle stavu, např. {'pending': 3, 'leased': 2, 'done': 10, 'failed': 0}"""
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM chunks GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("pending", "leased", "done", "failed")}
+
+    def failed(self):
+        """Vrátí selhané bloky jako seznam (id bloku, počet pokusů, poslední chyba, seznam cest)"""
+        with self._connect() as conn:
+            chunks = conn.execute(
+                "SELECT id, attempts, last_error FROM chunks WHERE status = 'failed' ORDER BY id"
+            ).fetchall()
+            return [
+                (chunk_id, attempts, last_error,
+                 [r[0] for r in conn.execute("SELECT path FROM files WHERE chunk_id = ? ORDER BY path", (chunk_id,))])
+                for chunk_id, attempts, last_error in chunks
+            ]
+
+    def outputs(self):
+        """Vrátí výstupní soubory hotových bloků v pořadí bloků"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT output FROM chunks WHERE status = 'done' ORDER BY id")]
+
+
+class LeaseKeeper(threading.Thread):
+    """Vlákno, které během zpracování bloku průběžně obnovuje jeho pronájem"""
+
+    def __init__(self, manifest, chunk_id, worker_id, lease_seconds):
+        super().__init__(daemon=True)
+        self.manifest = manifest
+        self.chunk_id = chunk_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stopped = threading.Event()
+
+    def run(self):
+        # Obnova ve třetině doby pronájmu nechává rezervu na výpadky úložiště
+        while not self._stopped.wait(self.lease_seconds / 3):
+            if not self.manifest.renew(self.chunk_id, self.worker_id, self.lease_seconds):
+                self.lost = True
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def process_chunk(root, paths, output_path, workers=None):
+    """Zpracuje soubory bloku a výsledek atomicky uloží do output_path
+
+    Chyba jednoho souboru (extrakce i sestavení záznamu) se jen započítá,
+    zbytek bloku se zpracuje normálně.
+
+    Returns:
+    tuple: (počet zpracovaných faktur, počet chyb)
+    """
+    import pandas as pd
+    from .entity_extractor import create_invoice_dataframe
+
+    frames = {}
+    errors = 0
+    full_paths = [os.path.join(root, path) for path in paths]
+    for i, data, error in extract_invoices(full_paths, max_workers=workers):
+        if error is None:
+            try:
+                frames[i] = create_invoice_dataframe([data])
+            except Exception as e:
+                error = e
+        if error is not None:
+            errors += 1
+            print(f"Chyba při zpracování {paths[i]}: {error}")
+
+    order = sorted(frames)
+    if order:
+        df = pd.concat([frames[i] for i in order], ignore_index=True)
+        df.insert(0, "source_file", [paths[i] for i in order])
+    else:
+        df = pd.DataFrame(columns=["source_file"])
+
+    # Zápis přes dočasný soubor – rozepsaný výstup nikdy neleží pod finálním názvem.
+    # Název je náhodný: pracovníci na různých strojích ve sdílené složce mohou mít stejné PID
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    df.to_csv(tmp_path, index=False, encoding="utf-8")
+    os.replace(tmp_path, output_path)
+    return len(order), errors
+
+
+def run_worker(manifest_path, output_dir, worker_id=None, pdf_dir=None,
+               lease_seconds=DEFAULT_LEASE_SECONDS, workers=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Zabírá a zpracovává bloky, dokud nějaké zbývají
+
+    Parameters:
+    manifest_path (str): Cesta ke sdílenému manifestu
+    output_dir (str): Sdílená složka pro výstupy bloků
+    worker_id (str): Identifikátor pracovníka (výchozí: hostname-pid)
+    pdf_dir (str): Kořen složky s PDF na tomto stroji (výchozí: z manifestu)
+    lease_seconds (float): Doba platnosti pronájmu bloku
+    workers (int): Počet procesů pro extrakci na tomto stroji
+    max_attempts (int): Počet pokusů, po kterém se blok označí jako selhaný
+
+    Returns:
+    int: Počet bloků dokončených tímto pracovníkem
+    """
+    manifest = WorkManifest(manifest_path)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    root = pdf_dir or manifest.root()
+    os.makedirs(output_dir, exist_ok=True)
+
+    completed = 0
+    while True:
+        claimed = manifest.claim(worker_id, lease_seconds, max_attempts)
+        if claimed is None:
+            break
+        chunk_id, paths = claimed
+        output_path = os.path.join(output_dir, f"chunk_{chunk_id:06d}.csv")
+
+        keeper = LeaseKeeper(manifest, chunk_id, worker_id, lease_seconds)
+        keeper.start()
+        try:
+            with metrics.timer("shard_chunk"):
+                processed, errors = process_chunk(root, paths, output_path, workers=workers)
+        except Exception as e:
+            keeper.stop()
+            status = manifest.release(chunk_id, worker_id, str(e), max_attempts)
+            if status == "failed":
+                metrics.inc("shard_chunks_failed_total")
+                print(f"[{worker_id}] Blok {chunk_id} selhal i v posledním pokusu, označen jako selhaný: {e}")
+            else:
+                print(f"[{worker_id}] Blok {chunk_id} selhal: {e}")
+            continue
+        keeper.stop()
+
+        if keeper.lost or not manifest.complete(chunk_id, worker_id, os.path.basename(output_path), errors):
+            print(f"[{worker_id}] Pronájem bloku {chunk_id} vypršel, blok dokončí jiný pracovník")
+            continue
+        completed += 1
+        metrics.inc("shard_chunks_total")
+        print(f"[{worker_id}] Blok {chunk_id}: {processed} faktur, {errors} chyb")
+    return completed
+
+
+def merge_outputs(manifest_path, output_dir, output):
+    """Sloučí výstupy hotových bloků do jednoho CSV (v pořadí bloků)
+
+    Selhané bloky se do výsledku nedostanou, vypíšou se i s jejich soubory.
+
+    Returns:
+    int: Počet řádků výsledného CSV
+    """
+    import pandas as pd
+
+    manifest = WorkManifest(manifest_path)
+    progress = manifest.progress()
+    if progress["pending"] or progress["leased"]:
+        raise RuntimeError(f"Zpracování ještě neskončilo: {progress}")
+
+    frames = [pd.read_csv(os.path.join(output_dir, name), dtype=str) for name in manifest.outputs()]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    df.to_csv(output, index=False, encoding="utf-8-sig")
+
+    failed = manifest.failed()
+    if failed:
+        print(f"⚠️ {len(failed)} bloků selhalo, jejich soubory ve výsledku chybí:")
+        print_failed(failed)
+    return len(df)
+
+
+def print_failed(failed):
+    """Vypíše selhané bloky z WorkManifest.failed()"""
+    for chunk_id, attempts, last_error, paths in failed:
+        print(f"  blok {chunk_id} ({attempts} pokusů, {len(paths)} souborů): {last_error}")
+        for path in paths:
+            print(f"    - {path}")
+
+
+def _local_node(args):
+    manifest_path, output_dir, node, lease_seconds, max_attempts = args
+    return run_worker(manifest_path, output_dir, worker_id=f"{socket.gethostname()}-node{node}",
+                      lease_seconds=lease_seconds, workers=1, max_attempts=max_attempts)
+
+
+def run_local(manifest_path, pdf_dir, output_dir, output, nodes, chunk_size, lease_seconds,
+              max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Simuluje více strojů lokálními procesy: registrace, zpracování, sloučení"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    registered = WorkManifest(manifest_path).register(pdf_dir, chunk_size)
+    print(f"Zaregistrováno {registered} nových souborů")
+    with ProcessPoolExecutor(max_workers=nodes) as executor:
+        completed = list(executor.map(
+            _local_node, [(manifest_path, output_dir, node, lease_seconds, max_attempts) for node in range(nodes)]
+        ))
+    print(f"Dokončené bloky podle uzlů: {completed}")
+    rows = merge_outputs(manifest_path, output_dir, output)
+    print(f"Hotovo! {rows} faktur uloženo do {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Koordinované dávkové zpracování PDF faktur na více strojích')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    register_parser = subparsers.add_parser("register", help="Zaregistruje PDF ze složky do manifestu")
+    register_parser.add_argument('--pdf_dir', type=str, required=True, help='Sdílená složka s PDF fakturami')
+    register_parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE,
+                                 help=f'Počet souborů v bloku (výchozí: {DEFAULT_CHUNK_SIZE})')
+
+    work_parser = subparsers.add_parser("work", help="Zpracovává bloky, dokud nějaké zbývají")
+    work_parser.add_argument('--output_dir', type=str, required=True, help='Sdílená složka pro výstupy bloků')
+    work_parser.add_argument('--pdf_dir', type=str, default=None,
+                             help='Kořen složky s PDF na tomto stroji (výchozí: cesta z registrace)')
+    work_parser.add_argument('--worker_id', type=str, default=None, help='Identifikátor pracovníka (výchozí: hostname-pid)')
+    work_parser.add_argument('--workers', type=int, default=None, help='Počet procesů na tomto stroji (výchozí: počet jader)')
+    work_parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS,
+                             help=f'Doba pronájmu bloku v sekundách (výchozí: {DEFAULT_LEASE_SECONDS})')
+    work_parser.add_argument('--max_attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                             help=f'Počet pokusů, po kterém se blok označí jako selhaný (výchozí: {DEFAULT_MAX_ATTEMPTS})')
+
+    merge_parser = subparsers.add_parser("merge", help="Sloučí výstupy bloků do jednoho CSV")
+    merge_parser.add_argument('--output_dir', type=str, required=True, help='Složka s výstupy bloků')
+    merge_parser.add_argument('--output', type=str, default="vysledky_faktur.csv",
+                              help='Výstupní CSV soubor (výchozí: vysledky_faktur.csv)')
+
+    subparsers.add_parser("status", help="Vypíše stav zpracování")
+
+    local_parser = subparsers.add_parser("local", help="Simulace více strojů lokálními procesy")
+    local_parser.add_argument('--pdf_dir', type=str, required=True, help='Složka s PDF fakturami')
+    local_parser.add_argument('--output_dir', type=str, required=True, help='Složka pro výstupy bloků')
+    local_parser.add_argument('--output', type=str, default="vysledky_faktur.csv",
+                              help='Výstupní CSV soubor (výchozí: vysledky_faktur.csv)')
+    local_parser.add_argument('--nodes', type=int, default=4, help='Počet simulovaných uzlů (výchozí: 4)')
+    local_parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE,
+                              help=f'Počet souborů v bloku (výchozí: {DEFAULT_CHUNK_SIZE})')
+    local_parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS,
+                              help=f'Doba pronájmu bloku v sekundách (výchozí: {DEFAULT_LEASE_SECONDS})')
+    local_parser.add_argument('--max_attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                              help=f'Počet pokusů, po kterém se blok označí jako selhaný (výchozí: {DEFAULT_MAX_ATTEMPTS})')
+
+    for subparser in (register_parser, work_parser, merge_parser, local_parser):
+        subparser.add_argument('--manifest', type=str, required=True, help='Cesta ke sdílenému manifestu (SQLite)')
+        add_instrumentation_arguments(subparser)
+    subparsers.choices["status"].add_argument('--manifest', type=str, required=True,
+                                              help='Cesta ke sdílenému manifestu (SQLite)')
+    args = parser.parse_args()
+
+    with instrumented(args):
+        if args.command == "register":
+            count = WorkManifest(args.manifest).register(args.pdf_dir, args.chunk_size)
+            print(f"Zaregistrováno {count} nových souborů")
+        elif args.command == "work":
+            done = run_worker(args.manifest, args.output_dir, worker_id=args.worker_id, pdf_dir=args.pdf_dir,
+                              lease_seconds=args.lease, workers=args.workers, max_attempts=args.max_attempts)
+            print(f"Pracovník dokončil {done} bloků")
+        elif args.command == "merge":
+            rows = merge_outputs(args.manifest, args.output_dir, args.output)
+            print(f"Hotovo! {rows} faktur uloženo do {args.output}")
+        elif args.command == "status":
+            manifest = WorkManifest(args.manifest)
+            print(manifest.progress())
+            print_failed(manifest.failed())
+        elif args.command == "local":
+            run_local(args.manifest, args.pdf_dir, args.output_dir, args.output,
+                      args.nodes, args.chunk_size, args.lease, args.max_attempts)
@@ -0,0 +1,149 @@
+"""
+Úsporné sestavení promptů pro analytické dotazy.
+
+Místo markdown tabulek s předformátovanými částkami ("30 336 677,- Kč")
+se tabulka posílá jako kompaktní text oddělený svislítky s holými čísly
+(jednotka je uvedená jednou v záhlaví sloupce). Počet tokenů se měří
+lokálně (rag.tokenizer) a prompt se vejde do rozpočtu dotazu – pokud je
+tabulka příliš dlouhá, ponechá se jen top N řádků a zbytek se sečte do
+řádku "Ostatní". Tabulky bez "rollup" jsou chronologické (např. měsíce)
+a zkrátí se na posledních N řádků.
+
+Dotaz v QUERY_CONFIG popisuje prompt klíčem "prompt_spec":
+    intro       úvodní věta (může obsahovat {typ})
+    filter      volitelně lambda data, typ: ... – výběr řádků podle parametru
+    table       lambda data: DataFrame se sloupci pro model (holá čísla)
+    facts       volitelně lambda data: {"název": hodnota} – souhrnná čísla
+    tasks       seznam bodů požadovaného výstupu
+    rollup      volitelně {"label", "order", "sum", "mean": {sloupec: váha}}
+    amounts     False, pokud tabulka neobsahuje částky (vynechá pokyn k formátu Kč)
+    budget      rozpočet v tokenech (jinak DEFAULT_PROMPT_BUDGET)
+
+Porovnání s původními prompty (z kořenového adresáře projektu):
+python -m benchmarks.prompts
+"""
+
+import math
+
+import pandas as pd
+
+from rag.tokenizer import count_tokens
+from utils.metrics import metrics
+
+DEFAULT_PROMPT_BUDGET = 400
+OTHER_LABEL = "Ostatní"
+AMOUNT_FORMAT_NOTE = "Částky ve výstupu uváděj v českém formátu (30 336 677,- Kč)."
+
+
+def format_value(value):
+    """Zapíše hodnotu co nejkratší – celá čísla bez oddělovačů, ostatní na 1 desetinné místo"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if float(value).is_integer() or abs(value) >= 100:
+            return str(int(round(value)))
+        return f"{value:.1f}"
+    return str(value)
+
+
+def serialize_table(table):
+    """Převede DataFrame na kompaktní text: záhlaví a řádky oddělené svislítkem"""
+    lines = ["|".join(map(str, table.columns))]
+    for row in table.itertuples(index=False):
+        lines.append("|".join(format_value(value) for value in row))
+    return "\n".join(lines)
+
+
+def rollup(table, top_n, label, order, sum_columns=(), mean_columns=None):
+    """Ponechá top_n řádků podle sloupce order a ostatní sloučí do řádku "Ostatní"
+
+    Parameters:
+    table (DataFrame): Tabulka pro prompt
+    top_n (int): Počet ponechaných řádků
+    label (str): Sloupec s popiskem řádku
+    order (str): Sloupec, podle kterého se vybírá top N (sestupně)
+    sum_columns (list): Sloupce, které se pro "Ostatní" sečtou
+    mean_columns (dict): Sloupce průměrů a sloupec jejich váhy (např. počet faktur)
+
+    Returns:
+    DataFrame: top_n řádků + řádek "Ostatní (k)"
+    """
+    if len(table) <= top_n:
+        return table
+    ranked = table.sort_values(order, ascending=False, kind="stable")
+    kept, rest = ranked.iloc[:top_n], ranked.iloc[top_n:]
+    other = {column: None for column in table.columns}
+    other[label] = f"{OTHER_LABEL} ({len(rest)})"
+    for column in sum_columns:
+        other[column] = rest[column].sum()
+    for column, weight in (mean_columns or {}).items():
+        weights = rest[weight].sum()
+        other[column] = (rest[column] * rest[weight]).sum() / weights if weights else None
+    return pd.concat([kept, pd.DataFrame([other], columns=table.columns)], ignore_index=True)
+
+
+def render_prompt(spec, table, facts, typ=None, note=None):
+    """Složí prompt z úvodu, tabulky, souhrnných čísel a bodů výstupu
+
+    note je volitelná poznámka za úvodem (např. že tabulka byla zkrácena).
+    """
+    intro = spec["intro"].format(typ=(typ or "").lower())
+    if note:
+        intro = f"{intro.rstrip(':')}, {note}:" if intro.endswith(":") else f"{intro} ({note})"
+    parts = [intro, serialize_table(table)]
+    if facts:
+        parts.append("Souhrn: " + "; ".join(f"{name} {format_value(value)}" for name, value in facts.items()))
+    parts.append("Výstup:\n" + "\n".join(f"{i}. {task}" for i, task in enumerate(spec["tasks"], 1)))
+    if spec.get("amounts", True):
+        parts.append(AMOUNT_FORMAT_NOTE)
+    return "\n".join(parts)
+
+
+def build_prompt(spec, data, typ=None, budget=None):
+    """Sestaví prompt podle prompt_spec a vejde se do rozpočtu tokenů
+
+    Pokud se celá tabulka nevejde, hledá se (binárně) největší počet
+    ponechaných řádků, se kterým se prompt do rozpočtu vejde. Dotaz s "rollup"
+    ponechá top N řádků a zbytek sloučí do "Ostatní", dotaz bez něj ponechá
+    posledních N řádků (nejnovější měsíce) – zkrácení se započítá do metriky
+    prompt_budget_exceeded_total.
+
+    Returns:
+    tuple: (prompt, počet tokenů, počet řádků tabulky sloučených do "Ostatní" nebo vynechaných)
+    """
+    budget = budget or spec.get("budget", DEFAULT_PROMPT_BUDGET)
+    if "filter" in spec:
+        data = spec["filter"](data, typ)
+    table = spec["table"](data)
+    facts = spec["facts"](data) if "facts" in spec else None
+
+    prompt = render_prompt(spec, table, facts, typ)
+    tokens = count_tokens(prompt)
+    if tokens <= budget or len(table) <= 1:
+        return prompt, tokens, 0
+
+    options = spec.get("rollup")
+
+    def fitted(top_n):
+        if options:
+            rolled = rollup(table, top_n, options["label"], options["order"],
+                            options.get("sum", ()), options.get("mean"))
+            text = render_prompt(spec, rolled, facts, typ)
+        else:
+            # Souhrnná čísla (facts) zůstávají za celé období
+            text = render_prompt(spec, table.iloc[-top_n:], facts, typ,
+                                 note=f"posledních {top_n} z {len(table)} řádků")
+        return text, count_tokens(text)
+
+    low, high = 1, len(table) - 1
+    best = fitted(low)
+    while low <= high:
+        middle = (low + high) // 2
+        text, middle_tokens = fitted(middle)
+        if middle_tokens <= budget:
+            best, low = (text, middle_tokens), middle + 1
+        else:
+            high = middle - 1
+    if best[1] > budget or not options:
+        metrics.inc("prompt_budget_exceeded_total")
+    return best[0], best[1], len(table) - max(high, 1)
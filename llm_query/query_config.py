@@ -1,8 +1,7 @@
 import pandas as pd
-import plotly.express as px
-from openai import OpenAI
 import streamlit as st
 import inspect
+from functools import lru_cache
 from pathlib import Path
 import sys
 import os
@@ -13,6 +12,15 @@ API_KEY_FROM_UI = None  # Globální proměnná pro předání API klíče z UI
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
+from utils.lazy_import import lazy_import
+from utils.metrics import metrics
+from utils.outbound import openai_client
+from llm_query.prompt_builder import build_prompt
+from utils.formatting import format_czk, format_count, format_percent, format_decimal, month_label, month_order
+
+# Těžké knihovny se načtou až při prvním vykreslení grafu
+px = lazy_import("plotly.express")
+
 # Volitelný import config.py
 try:
     import config
@@ -22,54 +30,65 @@ except ImportError:
 # Získání API klíče z prostředí nebo config.py (bez vyvolání chyby)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or getattr(config, "OPENAI_API_KEY", None)
 
+# Rozpočty tokenů promptu podle dotazu (přepisují "budget" v prompt_spec)
+PROMPT_TOKEN_BUDGETS = getattr(config, "PROMPT_TOKEN_BUDGETS", {})
+
 # Cesty k souborům
 project_root = Path(__file__).parent.parent
 csv_path = project_root / 'utils' / 'synthetic_project_data.csv'
 
-# Načtení dat
-df = pd.read_csv(csv_path)
+@lru_cache(maxsize=1)
+def load_invoices():
+    """Načte syntetická data faktur (až při prvním použití)"""
+    return pd.read_csv(csv_path)
 
-# client pro OpenAI API
-client = OpenAI(api_key=OPENAI_API_KEY)
+def get_client(api_key):
+    """Vrátí sdíleného OpenAI klienta pro daný API klíč (limity a opakování viz utils.outbound)"""
+    return openai_client(api_key)
 
-# Globální formátovací funkce
-def format_czk(value):
-    return f"{int(round(value)):,}".replace(",", " ") + ",- Kč"
+def __getattr__(name):
+    # Zpětná kompatibilita pro dřívější globální proměnné df a client
+    if name == "df":
+        return load_invoices()
+    if name == "client":
+        return get_client(OPENAI_API_KEY)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-CZECH_MONTHS = {
-    1: 'Leden', 2: 'Únor', 3: 'Březen', 4: 'Duben',
-    5: 'Květen', 6: 'Červen', 7: 'Červenec', 8: 'Srpen',
-    9: 'Září', 10: 'Říjen', 11: 'Listopad', 12: 'Prosinec'
-}
-
-CZECH_MONTHS_ORDER = [
-    "Leden 2024", "Únor 2024", "Březen 2024", "Duben 2024", "Květen 2024", "Červen 2024",
-    "Červenec 2024", "Srpen 2024", "Září 2024", "Říjen 2024", "Listopad 2024", "Prosinec 2024"
-]
+# Formátování (format_czk, format_count, ...) je vektorizované v utils.formatting –
+# formátuje se celý sloupec najednou, ne Series.apply po řádcích
 
 def set_month_order(df):
-    df['month'] = pd.Categorical(df['month'], categories=CZECH_MONTHS_ORDER, ordered=True)
+    """Seřadí měsíce chronologicky (kategorie z dat, ne pevně daný rok)"""
+    df['month'] = pd.Categorical(df['month'], categories=month_order(df['month']), ordered=True)
     return df.sort_values('month')
 
+def display_table(data, columns):
+    """Zobrazí tabulku jen se sloupci, které se uživateli ukazují (přejmenované)
+
+    Parameters:
+    data (DataFrame): Výsledek format_func
+    columns (dict): Sloupec -> zobrazený název, v pořadí zobrazení
+    """
+    return st.dataframe(data[list(columns)].rename(columns=columns))
+
 # --- Definice dotazů ---
 QUERY_CONFIG = {
     "monthly_cashflow": {
         "question": "Měsíční cashflow",
         "agg_func": lambda df: (
-            df.assign(month=pd.to_datetime(df['invoice_date']).dt.to_period('M').astype(str))
+            # Seskupuje se podle Period (celé číslo), popisky měsíců až nad výsledkem
+            df.assign(month=pd.to_datetime(df['invoice_date']).dt.to_period('M'))
             .groupby(['month', 'transaction_type'])['total_amount']
             .sum()
             .unstack(fill_value=0)
             .reset_index()
-            .assign(month=lambda x: x['month'].apply(
-                      lambda m: f"{CZECH_MONTHS[int(m.split('-')[1])]} {m.split('-')[0]}"
-                  ))
+            .assign(month=lambda x: month_label(x['month']))
             .astype({'Příjmy': int, 'Výdaje': int})
         ),
         "format_func": lambda data: set_month_order(
             data.assign(
-                Příjmy_formatted=data['Příjmy'].apply(format_czk),
-                Výdaje_formatted=data['Výdaje'].apply(format_czk),
+                Příjmy_formatted=format_czk(data['Příjmy']),
+                Výdaje_formatted=format_czk(data['Výdaje']),
                 Bilance=data['Příjmy'] - data['Výdaje']
             )
         ),
@@ -88,16 +107,25 @@ QUERY_CONFIG = {
             2. Identifikace 3 nejlepších a nejhorších měsíců
             3. Doporučení pro optimalizaci
         """,
+        "prompt_spec": {
+            "intro": "Analyzuj měsíční cashflow (Kč):",
+            "table": lambda data: data[['month', 'Příjmy', 'Výdaje']].rename(columns={'month': 'měsíc'}),
+            "facts": lambda data: {
+                "příjmy celkem": data['Příjmy'].sum(),
+                "výdaje celkem": data['Výdaje'].sum(),
+                "bilance": data['Bilance'].sum()
+            },
+            "tasks": [
+                "Celkové cashflow a trendy",
+                "Identifikace 3 nejlepších a nejhorších měsíců",
+                "Doporučení pro optimalizaci"
+            ],
+            "budget": 400,
+        },
         "renderer": lambda data: (
             st.line_chart(data.set_index('month')[['Příjmy', 'Výdaje']]),
             st.write("**Data:**"),
-            st.dataframe(
-                data[['month', 'Příjmy_formatted', 'Výdaje_formatted']]
-                .rename(columns={
-                    'Příjmy_formatted': 'Příjmy',
-                    'Výdaje_formatted': 'Výdaje'
-                })
-            ),
+            display_table(data, {'month': 'month', 'Příjmy_formatted': 'Příjmy', 'Výdaje_formatted': 'Výdaje'}),
             st.write(f"**Celková bilance:** {format_czk(data['Bilance'].sum())}")
         ),
     },
@@ -115,8 +143,8 @@ QUERY_CONFIG = {
         ),
         "format_func": lambda data: (
             data.assign(
-                total_amount_formatted=data['total_amount'].apply(format_czk),
-                podil_formatted=data['podil'].apply(lambda x: f"{x} %")
+                total_amount_formatted=format_czk(data['total_amount']),
+                podil_formatted=format_percent(data['podil'])
             )
         ),
         "prompt_func": lambda data: f"""
@@ -132,9 +160,23 @@ QUERY_CONFIG = {
             2. Doporučení pro další spolupráci
             3. Rizika přílišné závislosti
             """,
+        "prompt_spec": {
+            "intro": "Analyzuj největší odběratele podle příjmů:",
+            "table": lambda data: data[['customer_name', 'total_amount', 'podil']].rename(columns={
+                'customer_name': 'odběratel', 'total_amount': 'Kč', 'podil': 'podíl %'
+            }),
+            "facts": lambda data: {"celkem Kč": data['total_amount'].sum()},
+            "tasks": [
+                "Shrnutí významu těchto odběratelů",
+                "Doporučení pro další spolupráci",
+                "Rizika přílišné závislosti"
+            ],
+            "rollup": {"label": 'odběratel', "order": 'Kč', "sum": ['Kč', 'podíl %']},
+            "budget": 300,
+        },
         "renderer": lambda data: (
             fig := px.bar(
-                data,
+                data[['customer_name', 'total_amount', 'total_amount_formatted']],
                 x='customer_name',
                 y='total_amount',
                 text='total_amount_formatted',
@@ -157,14 +199,11 @@ QUERY_CONFIG = {
             fig.update_traces(textposition='outside'),
             st.plotly_chart(fig, use_container_width=True),
             st.write("**Data:**"),
-            st.dataframe(
-                data[['customer_name', 'total_amount_formatted', 'podil_formatted']]
-                .rename(columns={
-                    'customer_name': 'Odběratel',
-                    'total_amount_formatted': 'Celková částka',
-                    'podil_formatted': 'Podíl na příjmech'
-                })
-            )
+            display_table(data, {
+                'customer_name': 'Odběratel',
+                'total_amount_formatted': 'Celková částka',
+                'podil_formatted': 'Podíl na příjmech'
+            })
         )
     },
     "expense_by_category": {
@@ -179,8 +218,8 @@ QUERY_CONFIG = {
         ),
         "format_func": lambda data: (
             data.assign(
-                total_amount_formatted=data['total_amount'].apply(format_czk),
-                podil_formatted=data['podil'].apply(lambda x: f"{x} %")
+                total_amount_formatted=format_czk(data['total_amount']),
+                podil_formatted=format_percent(data['podil'])
             )
         ),
         "prompt_func": lambda data: f"""
@@ -196,10 +235,24 @@ QUERY_CONFIG = {
             2. Doporučení na optimalizaci největších položek
             3. Identifikace kategorií s nejvyšším podílem
         """,
+        "prompt_spec": {
+            "intro": "Analyzuj rozložení výdajů podle kategorií:",
+            "table": lambda data: data[['category', 'total_amount', 'podil']].rename(columns={
+                'category': 'kategorie', 'total_amount': 'Kč', 'podil': 'podíl %'
+            }),
+            "facts": lambda data: {"výdaje celkem Kč": data['total_amount'].sum()},
+            "tasks": [
+                "Shrnutí hlavních kategorií výdajů",
+                "Doporučení na optimalizaci největších položek",
+                "Identifikace kategorií s nejvyšším podílem"
+            ],
+            "rollup": {"label": 'kategorie', "order": 'Kč', "sum": ['Kč', 'podíl %']},
+            "budget": 300,
+        },
         "renderer": lambda data: (
             st.plotly_chart(
                 px.treemap(
-                    data,
+                    data[['category', 'total_amount']],
                     path=['category'],
                     values='total_amount',
                     color='total_amount',
@@ -209,14 +262,11 @@ QUERY_CONFIG = {
                 use_container_width=True
             ),
             st.write("**Data:**"),
-            st.dataframe(
-                data[['category', 'total_amount_formatted', 'podil_formatted']]
-                .rename(columns={
-                    'category': 'Kategorie',
-                    'total_amount_formatted': 'Celková částka',
-                    'podil_formatted': 'Podíl na výdajích'
-                })
-            )
+            display_table(data, {
+                'category': 'Kategorie',
+                'total_amount_formatted': 'Celková částka',
+                'podil_formatted': 'Podíl na výdajích'
+            })
         )
     },
     "payment_distribution": {
@@ -252,9 +302,9 @@ QUERY_CONFIG = {
             )
             # Formátování
             .assign(
-                count_formatted=lambda x: x['count'].apply(lambda v: f"{v} ks"),
-                percentage_formatted=lambda x: x['percentage'].apply(lambda v: f"{v} %"),
-                avg_delay_formatted=lambda x: x['avg_delay'].apply(lambda v: f"{v:.1f} dní")
+                count_formatted=lambda x: format_count(x['count']),
+                percentage_formatted=lambda x: format_percent(x['percentage']),
+                avg_delay_formatted=lambda x: format_decimal(x['avg_delay'], 1, " dní")
             )
             # Odstranění pomocného sloupce
             .drop(columns=['total_per_type'])
@@ -268,6 +318,21 @@ QUERY_CONFIG = {
             2. Riziková období
             3. Doporučení pro zlepšení
         """,
+        "prompt_spec": {
+            "intro": "Analyzuj distribuci splatností faktur pro {typ}:",
+            "filter": lambda data, typ: data[data['transaction_type'] == (typ or "Příjmy")],
+            "table": lambda data: data[['delay_bucket', 'count', 'percentage', 'avg_delay']].rename(columns={
+                'delay_bucket': 'splatnost', 'count': 'počet', 'percentage': '%', 'avg_delay': 'průměr dní'
+            }),
+            "tasks": [
+                "Shrnutí platební morálky",
+                "Riziková období",
+                "Doporučení pro zlepšení"
+            ],
+            "rollup": {"label": 'splatnost', "order": 'počet', "sum": ['počet', '%'], "mean": {'průměr dní': 'počet'}},
+            "amounts": False,
+            "budget": 300,
+        },
         "renderer": lambda data: (
             # Výběr typu faktury
             typ := st.radio(
@@ -281,7 +346,7 @@ QUERY_CONFIG = {
             # Graf
             st.plotly_chart(
                 px.pie(
-                    filtered_data,
+                    filtered_data[['delay_bucket', 'count']],
                     names='delay_bucket',
                     values='count',
                     hole=0.3,
@@ -293,30 +358,22 @@ QUERY_CONFIG = {
             ),
             # Tabulka
             st.write("**Podrobná data:**"),
-            st.dataframe(
-                filtered_data[['delay_bucket', 'count_formatted', 'avg_delay_formatted']]
-                .rename(columns={
-                    'delay_bucket': 'Splatnost',
-                    'count_formatted': 'Počet faktur',
-                    'avg_delay_formatted': 'Průměrné zpoždění'
-                })
-            ),
+            display_table(filtered_data, {
+                'delay_bucket': 'Splatnost',
+                'count_formatted': 'Počet faktur',
+                'avg_delay_formatted': 'Průměrné zpoždění'
+            }),
             # Analýza se generuje dynamicky podle volby
             st.subheader("Analýza"),
             (st.write(
-                OpenAI(api_key=API_KEY_FROM_UI or OPENAI_API_KEY).chat.completions.create(
+                get_client(API_KEY_FROM_UI or OPENAI_API_KEY).chat.completions.create(
                     model="gpt-3.5-turbo",
                     messages=[{
                         "role": "user",
-                        "content": f"""
-                            Analyzuj distribuci splatností faktur pro {typ.lower()}:
-                            {filtered_data[['delay_bucket', 'count_formatted', 'percentage_formatted', 'avg_delay_formatted']].to_markdown(index=False)}
-                            
-                            Výstup formátuj jako:
-                            1. Shrnutí platební morálky pro {typ.lower()}
-                            2. Riziková období
-                            3. Doporučení pro zlepšení
-                        """
+                        "content": build_prompt(
+                            QUERY_CONFIG["payment_distribution"]["prompt_spec"], data, typ=typ,
+                            budget=PROMPT_TOKEN_BUDGETS.get("payment_distribution")
+                        )[0]
                     }],
                     temperature=0,
                     max_tokens=500
@@ -338,8 +395,8 @@ QUERY_CONFIG = {
         ),
         "format_func": lambda data: (
             data.assign(
-                total_amount_formatted=data['total_amount'].apply(format_czk),
-                count_formatted=data['count'].apply(lambda x: f"{x} ks")
+                total_amount_formatted=format_czk(data['total_amount']),
+                count_formatted=format_count(data['count'])
             )
         ),
         "prompt_func": lambda data: f"""
@@ -351,10 +408,23 @@ QUERY_CONFIG = {
             2. Doporučení pro prevenci a kontrolu
             3. Identifikace nejrizikovějších oblastí
         """,
+        "prompt_spec": {
+            "intro": "Analyzuj výskyt anomálií ve fakturách:",
+            "table": lambda data: data[['anomaly_type', 'count', 'total_amount']].rename(columns={
+                'anomaly_type': 'typ anomálie', 'count': 'počet', 'total_amount': 'Kč'
+            }),
+            "tasks": [
+                "Nejčastější typy anomálií a jejich dopad",
+                "Doporučení pro prevenci a kontrolu",
+                "Identifikace nejrizikovějších oblastí"
+            ],
+            "rollup": {"label": 'typ anomálie', "order": 'počet', "sum": ['počet', 'Kč']},
+            "budget": 300,
+        },
         "renderer": lambda data: (
             st.plotly_chart(
                 px.bar(
-                    data,
+                    data[['anomaly_type', 'count', 'count_formatted']],
                     x='anomaly_type',
                     y='count',
                     text='count_formatted',
@@ -365,32 +435,36 @@ QUERY_CONFIG = {
                 use_container_width=True
             ),
             st.write("**Podrobná data:**"),
-            st.dataframe(
-                data[['anomaly_type', 'count_formatted', 'total_amount_formatted']]
-                .rename(columns={
-                    'anomaly_type': 'Typ anomálie',
-                    'count_formatted': 'Počet výskytů',
-                    'total_amount_formatted': 'Celková částka'
-                })
-            )
+            display_table(data, {
+                'anomaly_type': 'Typ anomálie',
+                'count_formatted': 'Počet výskytů',
+                'total_amount_formatted': 'Celková částka'
+            })
         )
     }
 }
 
-def process_query(query_key: str, df: pd.DataFrame, api_key=None, typ: str = None) -> dict:
+def process_query(query_key: str, df: pd.DataFrame, api_key=None, typ: str = None, source=None) -> dict:
     config = QUERY_CONFIG[query_key]
     
-    # 1. Zpracování dat
-    result_data = config["agg_func"](df)
-    formatted_data = config["format_func"](result_data)
-    
-    # 2. Dynamické volání prompt_func
-    sig = inspect.signature(config["prompt_func"])
-    params = sig.parameters
+    # 1. Zpracování dat – se zdrojem (Parquet/CSV) se agreguje v SQL bez načtení do paměti
+    with metrics.timer("query_aggregation", query=query_key, backend="sql" if source else "pandas"):
+        if source:
+            from llm_query.sql_backend import aggregate
+            result_data = aggregate(query_key, source)
+        else:
+            result_data = config["agg_func"](df)
+        formatted_data = config["format_func"](result_data)
     
-    if len(params) == 2:  # Pro dotazy s parametrem typ
-        if typ is None:
-            typ = "Příjmy"  # Výchozí hodnota
+    # 2. Prompt – kompaktní v rozpočtu tokenů (prompt_spec), jinak původní prompt_func;
+    # porovnání s původními prompty je v benchmarks/prompts.py, ne při každém dotazu
+    if typ is None:
+        typ = "Příjmy"  # Výchozí hodnota pro dotazy s parametrem typ
+    if "prompt_spec" in config:
+        budget = PROMPT_TOKEN_BUDGETS.get(query_key)
+        prompt, prompt_tokens, _ = build_prompt(config["prompt_spec"], formatted_data, typ=typ, budget=budget)
+        metrics.inc("prompt_tokens_total", prompt_tokens, query=query_key)
+    elif len(inspect.signature(config["prompt_func"]).parameters) == 2:  # Pro dotazy s parametrem typ
         prompt = config["prompt_func"](formatted_data, typ)
     else:  # Pro ostatní dotazy
         prompt = config["prompt_func"](formatted_data)
@@ -408,16 +482,20 @@ def process_query(query_key: str, df: pd.DataFrame, api_key=None, typ: str = Non
     global API_KEY_FROM_UI
     API_KEY_FROM_UI = api_key
     
-    # Vytvoření klienta s aktuálním API klíčem
-    current_client = OpenAI(api_key=current_api_key)
+    # Klient s aktuálním API klíčem (sdílený mezi dotazy)
+    current_client = get_client(current_api_key)
     
     # Volání API
-    response = current_client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-        max_tokens=500
-    )
+    with metrics.timer("llm_request", query=query_key):
+        response = current_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=500
+        )
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.inc("llm_tokens_total", usage.total_tokens, query=query_key)
     
     return {
         "question": config["question"],
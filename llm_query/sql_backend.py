@@ -0,0 +1,171 @@
+"""
+SQL backend pro agregace z QUERY_CONFIG nad Parquet (nebo CSV) soubory.
+
+Místo načtení celé knihy faktur do paměti se agregace spočítá v DuckDB
+přímo nad soubory – skenují se jen potřebné sloupce a data mohou být větší
+než RAM. Z databáze se vrací jen malý výsledek (desítky řádků), který se
+dotvaruje stejnými pandas kroky jako v agg_func, takže výstup má stejné
+sloupce, typy i pořadí a dál ho zpracují beze změny format_func, prompt_func
+i renderer.
+
+Použití:
+    from llm_query.sql_backend import aggregate
+    data = aggregate("monthly_cashflow", "faktury.parquet")
+
+Zdroj může být soubor .parquet, glob (např. "data/*.parquet"), složka
+s Parquet soubory nebo soubor .csv.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from utils.lazy_import import lazy_import
+from utils.formatting import month_label
+
+duckdb = lazy_import("duckdb")
+
+PAYMENT_BUCKETS = ['V termínu', '1-14 dní', '15-30 dní', '31-60 dní', '60+ dní']
+
+
+# Součet částek jako v aplikaci: ta před agregací zaokrouhlí total_amount na celé
+# koruny (Series.round() – na sudou, proto ROUND_EVEN) a sčítá celá čísla,
+# součty jsou tak přesné i přes miliony řádků
+AMOUNT_SUM = "CAST(SUM(CAST(ROUND_EVEN(total_amount, 0) AS BIGINT)) AS BIGINT)"
+
+# Každý dotaz: SQL (sken, filtr a seskupení nad {source}, součet částek {amount_sum})
+# a post_func, která z malého výsledku udělá přesně totéž, co vrací agg_func
+# v QUERY_CONFIG nad daty připravenými aplikací.
+SQL_QUERIES = {
+    "monthly_cashflow": {
+        "sql": """
+            SELECT strftime(month_start, '%Y-%m') AS month, transaction_type, total_amount
+            FROM (
+                SELECT date_trunc('month', CAST(invoice_date AS DATE)) AS month_start,
+                       transaction_type,
+                       {amount_sum} AS total_amount
+                FROM {source}
+                GROUP BY 1, 2
+            )
+            ORDER BY 1, 2
+        """,
+        "post_func": lambda result: (
+            result.set_index(['month', 'transaction_type'])['total_amount']
+            .unstack(fill_value=0)
+            .reset_index()
+            .assign(month=lambda x: month_label(x['month']))
+            .astype({'Příjmy': int, 'Výdaje': int})
+        ),
+    },
+    "top_customers": {
+        "sql": """
+            SELECT customer_name, {amount_sum} AS total_amount
+            FROM {source}
+            WHERE transaction_type = 'Příjmy'
+            GROUP BY customer_name
+            ORDER BY total_amount DESC, customer_name
+            LIMIT 5
+        """,
+        "post_func": lambda result: result.assign(
+            podil=lambda x: (x['total_amount'] / x['total_amount'].sum() * 100).round(1)
+        ),
+    },
+    "expense_by_category": {
+        "sql": """
+            SELECT category, {amount_sum} AS total_amount
+            FROM {source}
+            WHERE transaction_type = 'Výdaje'
+            GROUP BY category
+            ORDER BY category
+        """,
+        "post_func": lambda result: result.assign(
+            podil=lambda x: (x['total_amount'] / x['total_amount'].sum() * 100).round(1)
+        ),
+    },
+    "payment_distribution": {
+        # Hranice odpovídají pd.cut(bins=[-1, 0, 14, 30, 60, inf]) – intervaly zprava uzavřené
+        "sql": """
+            SELECT transaction_type,
+                   CASE WHEN delay_days <= 0 THEN 0
+                        WHEN delay_days <= 14 THEN 1
+                        WHEN delay_days <= 30 THEN 2
+                        WHEN delay_days <= 60 THEN 3
+                        ELSE 4 END AS bucket,
+                   COUNT(invoice_id) AS count,
+                   AVG(delay_days) AS avg_delay
+            FROM {source}
+            WHERE delay_days > -1
+            GROUP BY 1, 2
+        """,
+        "post_func": lambda result: (
+            result.assign(delay_bucket=pd.Categorical.from_codes(result['bucket'], categories=PAYMENT_BUCKETS))
+            # Seskupení doplní prázdné koše (počet 0, průměr NaN) stejně jako observed=False v agg_func
+            .groupby(['transaction_type', 'delay_bucket'], observed=False)
+            .agg(count=('count', 'sum'), avg_delay=('avg_delay', 'first'))
+            .assign(
+                total=lambda x: x.groupby('transaction_type')['count'].transform('sum')
+            )
+            .reset_index()
+        ),
+    },
+    "anomaly_analysis": {
+        "sql": """
+            SELECT anomaly_type,
+                   COUNT(invoice_id) AS count,
+                   {amount_sum} AS total_amount
+            FROM {source}
+            WHERE is_anomaly = TRUE AND anomaly_type IS NOT NULL
+            GROUP BY anomaly_type
+            ORDER BY anomaly_type
+        """,
+        "post_func": lambda result: result.sort_values('count', ascending=False),
+    },
+}
+
+
+def source_relation(source):
+    """Vrátí SQL výraz pro čtení zdroje (Parquet soubor, glob, složka nebo CSV)"""
+    path = Path(source)
+    if path.is_dir():
+        pattern = str(path / "**" / "*.parquet")
+    else:
+        pattern = str(path)
+    quoted = "'" + pattern.replace("'", "''") + "'"
+    if path.suffix == ".csv":
+        return f"read_csv_auto({quoted})"
+    return f"read_parquet({quoted}, union_by_name = true)"
+
+
+def connect(memory_limit=None, threads=None):
+    """Vytvoří DuckDB spojení v paměti; memory_limit (např. "1GB") omezí RAM, zbytek jde na disk"""
+    conn = duckdb.connect()
+    conn.execute("SET enable_progress_bar = false")
+    if memory_limit:
+        conn.execute(f"SET memory_limit = '{memory_limit}'")
+    if threads:
+        conn.execute(f"SET threads = {int(threads)}")
+    return conn
+
+
+def aggregate(query_key, source, conn=None):
+    """Spočítá agregaci dotazu z QUERY_CONFIG pomocí SQL nad souborem
+
+    Parameters:
+    query_key (str): Klíč dotazu (stejný jako v QUERY_CONFIG)
+    source (str): Parquet soubor, glob, složka s Parquet soubory nebo CSV
+    conn: Existující DuckDB spojení (jinak se vytvoří nové)
+
+    Returns:
+    DataFrame: Stejný výsledek jako QUERY_CONFIG[query_key]["agg_func"](df) nad daty
+        se zaokrouhlenými částkami (stejně jako v aplikaci)
+    """
+    query = SQL_QUERIES[query_key]
+    sql = query["sql"].format(source=source_relation(source), amount_sum=AMOUNT_SUM)
+    own_connection = conn is None
+    conn = conn or connect()
+    try:
+        result = conn.execute(sql).df()
+    finally:
+        if own_connection:
+            conn.close()
+    return query["post_func"](result)
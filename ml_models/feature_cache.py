@@ -0,0 +1,213 @@
+"""
+Cache předzpracované matice příznaků jako float32 .npy (memory-mapped).
+
+Matice po preprocessingu a škálování se uloží jednou a opakované skórování
+(jiný práh, jiná verze modelu, analýzy) ji jen namapuje do paměti bez
+kopírování – více procesů pak sdílí jednu kopii v page cache. XGBoost
+počítá ve float32, float32 matice proto dává stejné predikce.
+
+Vedle matice <cache>.npy se ukládají:
+    <cache>.ids.npy      invoice_id pro každý řádek matice
+    <cache>.rows.npy     pozice řádku ve zdrojovém CSV (preprocessing může řádky vyřadit)
+    <cache>.schema.json  názvy příznaků, verze scaleru a encoderů, zdrojový soubor
+
+Spuštění (z kořenového adresáře projektu):
+python -m ml_models.feature_cache build --input kniha_faktur.csv --cache features.npy
+python -m ml_models.feature_cache score --cache features.npy --output skore.csv --min_confidence 0.9
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import metrics
+
+ML_DIR = Path(__file__).parent
+SCALER_PATH = ML_DIR / "scaler.pkl"
+ENCODERS_PATH = ML_DIR / "label_encoders.pkl"
+
+
+class StaleCacheError(ValueError):
+    """Cache neodpovídá aktuálnímu scaleru, encoderům nebo zdrojovému souboru"""
+
+
+def _sidecar(cache_path, suffix):
+    cache_path = Path(cache_path)
+    return cache_path.with_name(cache_path.stem + suffix)
+
+
+def artifact_versions():
+    """Verze scaleru a encoderů (otisky souborů), se kterými byla matice spočítána"""
+    from ml_models.score_store import model_fingerprint
+    return {"scaler": model_fingerprint((SCALER_PATH,)), "encoders": model_fingerprint((ENCODERS_PATH,))}
+
+
+def _source_info(source):
+    stat = os.stat(source)
+    return {"path": str(Path(source).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _save_array(path, array):
+    """Uloží pole atomicky (zápis do dočasného souboru a přejmenování)"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def materialize(X, invoice_ids, cache_path, source=None):
+    """Uloží matici příznaků (výstup preprocess_data) jako float32 .npy se sidecar soubory
+
+    Parameters:
+    X (DataFrame): Předzpracované a škálované příznaky
+    invoice_ids: invoice_id ve stejném pořadí jako řádky X
+    cache_path (str): Cílový soubor .npy
+    source (str): Zdrojové CSV (pro kontrolu, zda cache není zastaralá)
+    """
+    cache_path = Path(cache_path)
+    with metrics.timer("feature_cache_write"):
+        # Matice se zapisuje přímo do memmapu, bez další kopie v paměti
+        tmp = cache_path.with_name(cache_path.name + ".tmp")
+        matrix = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=X.shape)
+        matrix[:] = X.to_numpy()
+        matrix.flush()
+        del matrix
+        os.replace(tmp, cache_path)
+
+        ids = np.asarray(invoice_ids)
+        if ids.dtype == object:
+            ids = ids.astype(str)
+        _save_array(_sidecar(cache_path, ".ids.npy"), ids)
+        _save_array(_sidecar(cache_path, ".rows.npy"), np.asarray(X.index, dtype=np.int64))
+
+        # Schéma se zapisuje jako poslední – bez něj se cache nepoužije
+        schema = {
+            "features": list(X.columns),
+            "rows": int(X.shape[0]),
+            "dtype": "float32",
+            "versions": artifact_versions(),
+            "source": _source_info(source) if source else None,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        schema_path = _sidecar(cache_path, ".schema.json")
+        tmp = schema_path.with_name(schema_path.name + ".tmp")
+        tmp.write_text(json.dumps(schema, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, schema_path)
+    return schema
+
+
+def load_features(cache_path, source=None):
+    """Namapuje matici příznaků z cache do paměti (jen pro čtení, bez kopírování)
+
+    Parameters:
+    cache_path (str): Soubor .npy vytvořený funkcí materialize
+    source (str): Pokud je zadán, ověří se, že se zdrojové CSV od vytvoření nezměnilo
+
+    Returns:
+    tuple: (DataFrame nad memmapem, invoice_id, pozice řádků ve zdroji, schéma)
+
+    Raises:
+    StaleCacheError: Cache chybí nebo je spočítaná s jiným scalerem/encodery či z jiných dat
+    """
+    cache_path = Path(cache_path)
+    schema_path = _sidecar(cache_path, ".schema.json")
+    if not schema_path.exists() or not cache_path.exists():
+        raise StaleCacheError(f"Cache {cache_path} neexistuje")
+    schema = json.loads(schema_path.read_text(encoding="utf-8"))
+    if schema["versions"] != artifact_versions():
+        raise StaleCacheError(f"Cache {cache_path} byla spočítána s jiným scalerem nebo encodery")
+    if source is not None and schema["source"] != _source_info(source):
+        raise StaleCacheError(f"Zdroj {source} se od vytvoření cache změnil")
+
+    matrix = np.load(cache_path, mmap_mode="r")
+    ids = np.load(_sidecar(cache_path, ".ids.npy"), mmap_mode="r")
+    rows = np.load(_sidecar(cache_path, ".rows.npy"), mmap_mode="r")
+    # DataFrame nad jedním float32 blokem se vytvoří bez kopie dat
+    X = pd.DataFrame(matrix, columns=schema["features"], copy=False)
+    metrics.inc("feature_cache_rows_loaded_total", len(X))
+    return X, ids, rows, schema
+
+
+def build_cache(source, cache_path, df=None):
+    """Spočítá příznaky ze zdrojového CSV (nebo už načteného df) a uloží je do cache"""
+    from ml_models.predict_pdf_batch import preprocess_data
+
+    if df is None:
+        df = pd.read_csv(source, parse_dates=["invoice_date", "due_date"])
+    X = preprocess_data(df)
+    return materialize(X, df.loc[X.index, "invoice_id"], cache_path, source=source)
+
+
+def load_or_build(source, cache_path, df=None):
+    """Vrátí příznaky z cache; pokud chybí nebo je zastaralá, spočítá je z CSV a uloží
+
+    Parameters:
+    source (str): Zdrojové CSV
+    cache_path (str): Soubor cache (.npy)
+    df (DataFrame): Už načtené zdrojové CSV (ušetří druhé čtení při přepočtu)
+
+    Returns:
+    tuple: (DataFrame příznaků, invoice_id, pozice řádků ve zdroji, schéma)
+    """
+    try:
+        features = load_features(cache_path, source=source)
+        metrics.inc("feature_cache_hits_total")
+        return features
+    except StaleCacheError as error:
+        print(f"{error} – počítám příznaky znovu")
+        metrics.inc("feature_cache_misses_total")
+    build_cache(source, cache_path, df)
+    return load_features(cache_path, source=source)
+
+
+def score_cache(cache_path, model_path, output_csv, min_confidence=0.0):
+    """Skóruje matici z cache a uloží invoice_id s predikcí a jistotou
+
+    Returns:
+    int: Počet uložených řádků
+    """
+    from ml_models.predict_pdf_batch import load_model, predict_anomalies
+
+    X, ids, _, _ = load_features(cache_path)
+    y_pred, y_proba = predict_anomalies(load_model(model_path), X.to_numpy(copy=False))
+    result = pd.DataFrame({"invoice_id": ids, "anomaly_type_pred": y_pred, "anomaly_confidence": y_proba})
+    if min_confidence:
+        result = result[result["anomaly_confidence"] >= min_confidence]
+    result.to_csv(output_csv, index=False)
+    return len(result)
+
+
+if __name__ == "__main__":
+    from utils.metrics import add_instrumentation_arguments, instrumented
+
+    parser = argparse.ArgumentParser(description='Cache předzpracovaných příznaků (float32 memmap)')
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help='Spočítá příznaky z CSV a uloží je do cache')
+    build.add_argument('--input', type=str, required=True, help='Vstupní CSV s fakturami')
+    build.add_argument('--cache', type=str, required=True, help='Soubor cache (.npy)')
+
+    score = subparsers.add_parser("score", help='Skóruje příznaky z cache bez preprocessingu')
+    score.add_argument('--cache', type=str, required=True, help='Soubor cache (.npy)')
+    score.add_argument('--model', type=str, default=str(ML_DIR / "xgb_model.pkl"),
+                       help='Cesta k modelu (výchozí: ml_models/xgb_model.pkl)')
+    score.add_argument('--output', type=str, default="skore.csv", help='Výstupní CSV (výchozí: skore.csv)')
+    score.add_argument('--min_confidence', type=float, default=0.0,
+                       help='Uloží jen řádky s jistotou alespoň této hodnoty (výchozí: 0 = vše)')
+
+    for subparser in (build, score):
+        add_instrumentation_arguments(subparser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        if args.command == "build":
+            schema = build_cache(args.input, args.cache)
+            print(f"Uloženo {schema['rows']} × {len(schema['features'])} příznaků do {args.cache}")
+        else:
+            count = score_cache(args.cache, args.model, args.output, args.min_confidence)
+            print(f"Uloženo {count} řádků do {args.output}")
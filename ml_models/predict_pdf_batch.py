@@ -1,20 +1,77 @@
 import pandas as pd
 import joblib
 import os
+import sys
+from pathlib import Path
+from functools import lru_cache
+
+# Nastavení cest
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from utils.metrics import metrics
 
 
 def load_model(model_path):
     """Načte uložený model."""
     return joblib.load(model_path)
 
+@lru_cache(maxsize=None)
+def load_artifact(file_name):
+    """Načte pomocný objekt modelu (label encodery, scaler) jen jednou za běh procesu."""
+    return joblib.load(os.path.join(os.path.dirname(__file__), file_name))
+
+# Příznaky modelu v pořadí, ve kterém je očekává scaler i model
+FEATURES = ['total_amount', 'is_month_end', 'items_count', 'avg_item_value',
+   'days_to_due', 'customer_mean', 'customer_std', 'supplier_mean',
+   'supplier_std', 'supplier_name_encoded', 'customer_name_encoded',
+   'category_encoded', 'transaction_type_encoded', 'note_encoded',
+   'supplier_category_encoded', 'customer_category_encoded']
+
+CATEGORICAL_COLUMNS = ["supplier_name", "customer_name", "category", "note", "transaction_type"]
+
+# Třídy modelu (anomaly_type z trénovacích dat) v pořadí kódů predikce
+# a jejich popisky v aplikaci; train.py odmítne aktivovat model s jiným pořadím
+MODEL_CLASSES = ("High Value + Short Due Date", "Items Total Mismatch + Unusual Due Date", "No Anomaly",
+                 "Unusual Number of Items", "Unusual Service for Customer")
+NO_ANOMALY_CODE = MODEL_CLASSES.index("No Anomaly")
+ANOMALY_LABELS = {
+    0: "Vysoká částka + krátká splatnost",
+    1: "Nesoulad položek + datum",
+    2: "Žádná anomálie",
+    3: "Neobvyklý počet položek",
+    4: "Neobvyklá služba"
+}
+
+# Počet faktur, od kterého je dodavatel/odběratel "Top"
+SUPPLIER_THRESHOLD = 3000
+CUSTOMER_THRESHOLD = 4500
+
 def preprocess_data(df):
     """Kompletní preprocessing dat a příprava pro model."""
+    with metrics.timer("preprocess"):
+        return _preprocess_data(df)
+
+def _preprocess_data(df):
+    df = clean_invoices(df)
+    df = apply_statistics(df, group_statistics(df))
+    encode_columns(df, load_artifact("label_encoders.pkl"))
+    df_features = select_features(df)
+
+    # 8. Scaling 
+    scaler = load_artifact("scaler.pkl")
+    X_scaled = scaler.transform(df_features)
+    
+    # Index zůstává shodný se vstupem, aby šly řádky spárovat i po odstranění neplatných záznamů
+    return pd.DataFrame(X_scaled, columns=FEATURES, index=df.index)
+
+def clean_invoices(df):
+    """Datové typy, odstranění neplatných záznamů a průměrná hodnota položky (vrací kopii)."""
     # Kopie DataFrame pro bezpečnou manipulaci
     df = df.copy()
     
     # 1. Datové typy
-    categorical_columns = ["supplier_name", "customer_name", "category", "note", "transaction_type"]
-    df[categorical_columns] = df[categorical_columns].astype("category")
+    df[CATEGORICAL_COLUMNS] = df[CATEGORICAL_COLUMNS].astype("category")
         
     # 2. Průměrná hodnota položky
     # Explicitní konverze všech číselných sloupců
@@ -28,52 +85,58 @@ def preprocess_data(df):
     
     # Výpočet průměrné hodnoty položky
     df["avg_item_value"] = (df["total_amount"] / df["items_count"].astype(float)).round(2)
+    return df
+
+def group_statistics(df):
+    """Počet faktur, průměr a směrodatná odchylka částky po odběratelích a dodavatelích.
+
+    Při trénování se stejné statistiky skládají po blocích z celé knihy faktur
+    (ml_models/train.py), při predikci se počítají z dávky.
+    """
+    return {
+        key: df.groupby(column, observed=True)["total_amount"].agg(["count", "mean", "std"])
+        for key, column in (("customer", "customer_name"), ("supplier", "supplier_name"))
+    }
+
+def categorize_supplier(supplier_name, supplier_frequency):
+    if supplier_name == "FinDoc AI":
+        return "Special"
+    elif supplier_name in supplier_frequency and supplier_frequency[supplier_name] > SUPPLIER_THRESHOLD:
+        return "Top Supplier"
+    else:
+        return "Active Supplier"
     
-    # 3. Kategorizace dodavatelů a odběratelů (zůstává stejné)
-    supplier_frequency = df["supplier_name"].value_counts()
-    customer_frequency = df["customer_name"].value_counts()
-
-    supplier_treshold = 3000
-    customer_treshold = 4500
-
-    def categorize_supplier(supplier_name):
-        if supplier_name == "FinDoc AI":
-            return "Special"
-        elif supplier_name in supplier_frequency and supplier_frequency[supplier_name] > supplier_treshold:
-            return "Top Supplier"
-        else:
-            return "Active Supplier"
-        
-    def categorize_customer(customer_name):
-        if customer_name == "FinDoc AI":
-            return "Special"
-        elif customer_name in customer_frequency and customer_frequency[customer_name] > customer_treshold:
-            return "Top Customer"
-        else:
-            return "Active Customer"
-        
-    df["supplier_category"] = df["supplier_name"].apply(categorize_supplier).astype("category")
-    df["customer_category"] = df["customer_name"].apply(categorize_customer).astype("category")
+def categorize_customer(customer_name, customer_frequency):
+    if customer_name == "FinDoc AI":
+        return "Special"
+    elif customer_name in customer_frequency and customer_frequency[customer_name] > CUSTOMER_THRESHOLD:
+        return "Top Customer"
+    else:
+        return "Active Customer"
+
+def apply_statistics(df, stats):
+    """Kategorie dodavatelů a odběratelů, časové a statistické charakteristiky."""
+    # 3. Kategorizace dodavatelů a odběratelů
+    supplier_frequency = stats["supplier"]["count"]
+    customer_frequency = stats["customer"]["count"]
+    df["supplier_category"] = df["supplier_name"].apply(
+        categorize_supplier, args=(supplier_frequency,)).astype("category")
+    df["customer_category"] = df["customer_name"].apply(
+        categorize_customer, args=(customer_frequency,)).astype("category")
     
     # 4. Časové charakteristiky
     df["days_to_due"] = (df["due_date"] - df["invoice_date"]).dt.days
     
     # 5. Statistické charakteristiky 
-    customer_avg = df.groupby("customer_name", observed=True)["total_amount"].mean()
-    customer_std = df.groupby("customer_name", observed=True)["total_amount"].std()
-
-    supplier_avg = df.groupby("supplier_name", observed=True)["total_amount"].mean()
-    supplier_std = df.groupby("supplier_name", observed=True)["total_amount"].std()
+    df["customer_mean"] = df["customer_name"].map(stats["customer"]["mean"]).astype(float).round(2)
+    df["customer_std"] = df["customer_name"].map(stats["customer"]["std"]).astype(float).round(2)
+    df["supplier_mean"] = df["supplier_name"].map(stats["supplier"]["mean"]).astype(float).round(2)
+    df["supplier_std"] = df["supplier_name"].map(stats["supplier"]["std"]).astype(float).round(2)
+    return df
 
-    df["customer_mean"] = df["customer_name"].map(customer_avg).astype(float).round(2)
-    df["customer_std"] = df["customer_name"].map(customer_std).astype(float).round(2)
-    df["supplier_mean"] = df["supplier_name"].map(supplier_avg).astype(float).round(2)
-    df["supplier_std"] = df["supplier_name"].map(supplier_std).astype(float).round(2)
-    
+def encode_columns(df, label_encoders):
+    """Label Encoding kategorických sloupců (na místě)."""
     # 6. Label Encoding
-    ENCODERS_PATH = os.path.join(os.path.dirname(__file__), "label_encoders.pkl")
-    label_encoders = joblib.load(ENCODERS_PATH)
-    
     for col, le in label_encoders.items():
         if col in df.columns:  
             # Pokud je některá hodnota neznámá pro encoder, nahraď ji nejčastější hodnotou
@@ -88,15 +151,11 @@ def preprocess_data(df):
             
             df[col + "_encoded"] = le.transform(df[col])
 
+def select_features(df):
+    """Finální výběr příznaků (float64, chybějící hodnoty nahrazené nulami)."""
     # 7. Finální výběr příznaků
-    features = ['total_amount', 'is_month_end', 'items_count', 'avg_item_value',
-       'days_to_due', 'customer_mean', 'customer_std', 'supplier_mean',
-       'supplier_std', 'supplier_name_encoded', 'customer_name_encoded',
-       'category_encoded', 'transaction_type_encoded', 'note_encoded',
-       'supplier_category_encoded', 'customer_category_encoded']
-    
     # Kontrola a oprava chybějících hodnot
-    for feature in features:
+    for feature in FEATURES:
         if feature in df.columns:
             # Nahradit NaN hodnoty nulami
             df[feature] = df[feature].fillna(0)
@@ -107,29 +166,25 @@ def preprocess_data(df):
             # Vytvořit chybějící sloupec s nulami
             df[feature] = 0
     
-    # 8. Scaling 
-    SCALER_PATH = os.path.join(os.path.dirname(__file__), "scaler.pkl")
-    scaler = joblib.load(SCALER_PATH)
-    
-    # Kontrola formátu dat před transformací
-    print(f"Kontrola typů dat před transformací: {df[features].dtypes}")
-    
     # Převedení všech hodnot na float64 pro jistotu
-    df_features = df[features].astype(float)
-    
-    X_scaled = scaler.transform(df_features)
-    
-    return pd.DataFrame(X_scaled, columns=features)
+    return df[FEATURES].astype(float)
 
 def predict_anomalies(model, X):
     """Vrátí predikce a pravděpodobnosti."""
-    y_pred = model.predict(X)
-    y_proba = model.predict_proba(X).max(axis=1)
+    with metrics.timer("predict"):
+        y_pred = model.predict(X)
+        y_proba = model.predict_proba(X).max(axis=1)
+    metrics.inc("predictions_total", len(X))
     return y_pred, y_proba
 
-def batch_predict(input_csv, model_path, output_csv):
+def batch_predict(input_csv, model_path, output_csv, store_path=None, feature_cache=None):
     """
     Načte data z CSV, provede preprocessing, načte model, provede predikci a uloží výsledek.
+
+    S store_path se skórují jen nové nebo změněné faktury a ostatní se doplní
+    z úložiště skóre (viz score_store.py). S feature_cache se předzpracované
+    příznaky čtou z float32 cache a přepočítají se jen při změně vstupu
+    (viz feature_cache.py).
     """
     try:
         # 1. Načtení dat
@@ -138,7 +193,13 @@ def batch_predict(input_csv, model_path, output_csv):
         
         # 2. Preprocessing
         try:
-            X = preprocess_data(df)
+            if feature_cache:
+                from ml_models.feature_cache import load_or_build
+                X, _, rows, _ = load_or_build(input_csv, feature_cache, df=df)
+                # Pozice ve zdrojovém CSV odpovídají indexu df
+                X.index = rows
+            else:
+                X = preprocess_data(df)
             print(f"Preprocessing dokončen, tvar: {X.shape}")
             # Kontrola datových typů po preprocessingu
             print("Datové typy po preprocessingu:")
@@ -151,11 +212,19 @@ def batch_predict(input_csv, model_path, output_csv):
         model = load_model(model_path)
         
         # 4. Predikce
-        y_pred, y_proba = predict_anomalies(model, X)
+        if store_path:
+            from ml_models.score_store import MODEL_ARTIFACTS, ScoreStore, model_fingerprint, predict_incremental
+            y_pred, y_proba, scored = predict_incremental(
+                model, X, df.loc[X.index, "invoice_id"], ScoreStore(store_path),
+                model_fingerprint((model_path, *MODEL_ARTIFACTS[1:]))
+            )
+            print(f"Nově skórováno {scored} z {len(X)} faktur, zbytek z úložiště skóre")
+        else:
+            y_pred, y_proba = predict_anomalies(model, X)
         
         # 5. Uložení výsledků
-        df['anomaly_type_pred'] = y_pred
-        df['anomaly_confidence'] = y_proba
+        df.loc[X.index, 'anomaly_type_pred'] = y_pred
+        df.loc[X.index, 'anomaly_confidence'] = y_proba
         df.to_csv(output_csv, index=False)
         print(f"Výsledky uloženy do {output_csv}")
     
@@ -165,10 +234,23 @@ def batch_predict(input_csv, model_path, output_csv):
         print(traceback.format_exc())
         raise
 
-# Příklad volání:
-# if __name__ == "__main__":
-#     batch_predict(
-#         input_csv="vysledky_faktur.csv",
-#         model_path="xgb_model.pkl",
-#         output_csv="predikce_pdf.csv"
-#     )
+if __name__ == "__main__":
+    import argparse
+    from utils.metrics import add_instrumentation_arguments, instrumented
+
+    parser = argparse.ArgumentParser(description='Dávková predikce anomálií z CSV')
+    parser.add_argument('--input', type=str, default="vysledky_faktur.csv",
+                        help='Vstupní CSV s extrahovanými fakturami (výchozí: vysledky_faktur.csv)')
+    parser.add_argument('--model', type=str, default=os.path.join(os.path.dirname(__file__), "xgb_model.pkl"),
+                        help='Cesta k modelu (výchozí: ml_models/xgb_model.pkl)')
+    parser.add_argument('--output', type=str, default="predikce_pdf.csv",
+                        help='Výstupní CSV s predikcemi (výchozí: predikce_pdf.csv)')
+    parser.add_argument('--store', type=str, default=None,
+                        help='Úložiště skóre (SQLite) pro inkrementální skórování, např. ml_models/anomaly_scores.db')
+    parser.add_argument('--features', type=str, default=None,
+                        help='Cache předzpracovaných příznaků (float32 .npy), např. features.npy')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        batch_predict(args.input, args.model, args.output, store_path=args.store, feature_cache=args.features)
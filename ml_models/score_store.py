@@ -0,0 +1,157 @@
+"""
+Perzistentní úložiště skóre anomálií pro inkrementální skórování.
+
+Skóre (predikce, jistota, čas) se ukládá podle invoice_id spolu s otiskem
+celého vektoru příznaků, který dostává model, a verzí modelu. Při dalším
+běhu se modelu pošlou jen nové nebo změněné faktury, ostatní se doplní
+z úložiště. Změna verze modelu úložiště nemaže – starší záznamy se prostě nenajdou a přepíší se
+při dalším skórování (líná invalidace).
+"""
+
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import metrics
+from ml_models.predict_pdf_batch import FEATURES
+
+ML_DIR = Path(__file__).parent
+DEFAULT_STORE_PATH = ML_DIR / "anomaly_scores.db"
+MODEL_ARTIFACTS = (ML_DIR / "xgb_model.pkl", ML_DIR / "scaler.pkl", ML_DIR / "label_encoders.pkl")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    invoice_id TEXT PRIMARY KEY,
+    feature_hash TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    prediction INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    scored_at TEXT NOT NULL
+)
+"""
+
+
+def model_fingerprint(paths=MODEL_ARTIFACTS):
+    """Verze modelu jako otisk souborů modelu, scaleru a encoderů"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()
+
+
+def feature_hashes(X):
+    """Vrátí otisk vektoru příznaků každého řádku (hex řetězce)
+
+    Otisk zahrnuje všechny příznaky modelu včetně agregací přes celý vstup
+    (průměry a odchylky odběratele/dodavatele, kategorie podle četnosti).
+    Nová faktura partnera tak změní otisk jeho ostatních faktur a ty se
+    přeskórují – uložené skóre vždy odpovídá tomu, co by vrátil model.
+
+    Příznaky se před hashováním převedou na float32 (přesnost, ve které
+    počítá model) – float64 DataFrame z preprocess_data i float32 matice
+    z feature_cache tak mají pro stejnou fakturu stejný otisk.
+    """
+    hashes = pd.util.hash_pandas_object(X[FEATURES].astype(np.float32), index=False).to_numpy()
+    return np.char.mod("%016x", hashes).astype(object)
+
+
+class ScoreStore:
+    """Úložiště skóre v SQLite; každá operace používá vlastní krátké spojení"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = str(path)
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, invoice_ids, hashes, model_version):
+        """Najde uložená skóre pro faktury se stejným otiskem a verzí modelu
+
+        Returns:
+        tuple: (predikce, jistoty) jako pole zarovnaná se vstupem; chybějící = NaN
+        """
+        predictions = np.full(len(invoice_ids), np.nan)
+        confidences = np.full(len(invoice_ids), np.nan)
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE query (pos INTEGER, invoice_id TEXT, feature_hash TEXT)")
+            conn.executemany(
+                "INSERT INTO query VALUES (?, ?, ?)",
+                zip(range(len(invoice_ids)), map(str, invoice_ids), hashes)
+            )
+            rows = conn.execute(
+                "SELECT q.pos, s.prediction, s.confidence FROM query q JOIN scores s "
+                "ON s.invoice_id = q.invoice_id AND s.feature_hash = q.feature_hash AND s.model_version = ?",
+                (model_version,)
+            ).fetchall()
+        if rows:
+            positions, cached_predictions, cached_confidences = (np.array(column) for column in zip(*rows))
+            predictions[positions] = cached_predictions
+            confidences[positions] = cached_confidences
+        return predictions, confidences
+
+    def upsert(self, invoice_ids, hashes, model_version, predictions, confidences):
+        """Uloží nebo přepíše skóre faktur"""
+        scored_at = datetime.now().isoformat(timespec="seconds")
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)",
+                zip(map(str, invoice_ids), hashes, [model_version] * len(hashes),
+                    map(int, predictions), map(float, confidences), [scored_at] * len(hashes))
+            )
+
+    def purge(self, model_version):
+        """Smaže záznamy jiných verzí modelu (volitelný úklid, není nutný pro správnost)"""
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM scores WHERE model_version != ?", (model_version,)).rowcount
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+
+def predict_incremental(model, X, invoice_ids, store, model_version):
+    """Skóruje jen nové nebo změněné faktury, ostatní doplní z úložiště
+
+    Parameters:
+    model: Natrénovaný model s predict/predict_proba
+    X (DataFrame): Výstup preprocess_data (řádky odpovídají invoice_ids)
+    invoice_ids: Identifikátory faktur ve stejném pořadí jako X
+    store (ScoreStore): Úložiště skóre
+    model_version (str): Verze modelu (např. model_fingerprint())
+
+    Returns:
+    tuple: (predikce, jistoty, počet nově skórovaných faktur)
+    """
+    from ml_models.predict_pdf_batch import predict_anomalies
+
+    invoice_ids = np.asarray(invoice_ids).astype(str)
+    hashes = feature_hashes(X)
+    start = time.perf_counter()
+    predictions, confidences = store.lookup(invoice_ids, hashes, model_version)
+    metrics.observe("score_store_lookup_seconds", time.perf_counter() - start)
+
+    missing = np.isnan(predictions)
+    if missing.any():
+        new_predictions, new_confidences = predict_anomalies(model, X[missing])
+        predictions[missing] = new_predictions
+        confidences[missing] = new_confidences
+        store.upsert(invoice_ids[missing], hashes[missing], model_version, new_predictions, new_confidences)
+
+    scored = int(missing.sum())
+    metrics.inc("scores_cached_total", len(missing) - scored)
+    metrics.inc("scores_computed_total", scored)
+    return predictions.astype(int), confidences, scored
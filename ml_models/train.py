@@ -0,0 +1,478 @@
+"""
+Skriptované trénování modelu detekce anomálií (náhrada model_prediction.ipynb).
+
+Z knihy faktur (CSV nebo Parquet ve schématu utils/synthetic_project_data.csv)
+vytvoří xgb_model.pkl, scaler.pkl a label_encoders.pkl se stejnými příznaky
+jako preprocess_data (sdílí jeho funkce). Kniha se čte po blocích, takže
+stačí i na miliony faktur:
+    1. statistiky  – první průchod: počty, průměry a rozptyly částek po
+                     odběratelích a dodavatelích, hodnoty kategorií a tříd
+    2. příznaky    – druhý průchod: příznaky po blocích do float32 matic
+                     na disku (memmap) rozdělených na train/val/test podle
+                     otisku invoice_id, průběžné učení scaleru na train části
+    3. škálování   – škálování matic po blocích na místě
+    4. trénování   – XGBoost s histogramovou metodou (tree_method="hist")
+                     na všech jádrech, early stopping na validační části;
+                     matice se do QuantileDMatrix předávají po blocích
+                     (xgb.DataIter), v paměti jsou jen kvantizované biny
+    5. vyhodnocení – přesnost a classification report na testovací části
+
+Artefakty se ukládají do verzované složky <output_dir>/<verze>/ spolu
+s manifest.json (parametry, počty řádků, metriky, čas a paměť jednotlivých
+kroků). Volba --promote verzi zkopíruje do ml_models/, odkud ji načítá
+predikce (predict_pdf_batch, aplikace, inbox_watcher).
+
+Spuštění (z kořenového adresáře projektu):
+python -m ml_models.train --input utils/synthetic_project_data.csv
+python -m ml_models.train --input faktury.parquet --chunk_size 1000000 --promote
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import metrics
+from ml_models.predict_pdf_batch import (
+    FEATURES, CATEGORICAL_COLUMNS, MODEL_CLASSES, clean_invoices, apply_statistics, encode_columns, select_features
+)
+
+ML_DIR = Path(__file__).parent
+ARTIFACT_NAMES = ("xgb_model.pkl", "scaler.pkl", "label_encoders.pkl")
+
+# Kódované sloupce v pořadí jako v notebooku (label_encoders.pkl)
+ENCODED_COLUMNS = ["supplier_name", "customer_name", "category", "transaction_type", "note",
+                   "supplier_category", "customer_category"]
+SUPPLIER_CATEGORIES = ("Active Supplier", "Special", "Top Supplier")
+CUSTOMER_CATEGORIES = ("Active Customer", "Special", "Top Customer")
+LABEL_COLUMN = "anomaly_type"
+NO_ANOMALY = "No Anomaly"
+
+# Sloupce knihy faktur, které trénování potřebuje
+INPUT_COLUMNS = ["invoice_id", "supplier_name", "customer_name", "category", "note", "transaction_type",
+                 "invoice_date", "due_date", "total_amount", "items", "items_count", "is_month_end", LABEL_COLUMN]
+
+# Rozdělení podle otisku invoice_id (procenta): stejná faktura je při každém
+# přetrénování ve stejné části, poměr 70/20/10 jako v notebooku
+SPLITS = (("train", 70), ("val", 90), ("test", 100))
+
+# Hyperparametry z notebooku; n_estimators je horní mez, skutečný počet určí early stopping
+MODEL_PARAMS = {
+    "max_depth": 10,
+    "min_child_weight": 5,
+    "learning_rate": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "random_state": 42,
+}
+
+
+def _rss_mb():
+    """Aktuální RSS procesu v MB (Linux /proc), jinak None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+def _peak_rss_mb():
+    """Špička RSS procesu v MB (Unix), jinak None"""
+    try:
+        import resource  # na Windows modul není
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def stage(name, report):
+    """Změří čas, RSS na konci a dosavadní špičku paměti kroku a zapíše je do report"""
+    start = time.perf_counter()
+    with metrics.timer("train_stage", stage=name):
+        yield
+    report[name] = {"seconds": round(time.perf_counter() - start, 3),
+                    "rss_mb": round(_rss_mb() or 0, 1), "peak_rss_mb": round(_peak_rss_mb() or 0, 1)}
+    print(f"{name:<12} {report[name]['seconds']:>9.2f} s  RSS {report[name]['rss_mb']:>8.0f} MB  "
+          f"špička {report[name]['peak_rss_mb']:>8.0f} MB")
+
+
+def iter_ledger(path, chunk_size):
+    """Čte knihu faktur po blocích (CSV nebo Parquet) jen s potřebnými sloupci"""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        columns = [column for column in INPUT_COLUMNS if column in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield prepare_chunk(batch.to_pandas())
+    else:
+        for chunk in pd.read_csv(path, usecols=lambda column: column in INPUT_COLUMNS, chunksize=chunk_size,
+                                 parse_dates=["invoice_date", "due_date"]):
+            yield prepare_chunk(chunk)
+
+
+def prepare_chunk(chunk):
+    """Převede blok knihy faktur na vstup preprocess_data (stejné úpravy jako notebook)"""
+    if "items_count" not in chunk.columns:
+        chunk["items_count"] = chunk["items"].fillna("").astype(str).str.count(";") + 1
+    chunk["note"] = chunk["note"].str.replace("Faktura za: ", "", regex=False)
+    chunk[LABEL_COLUMN] = chunk[LABEL_COLUMN].fillna(NO_ANOMALY)
+    chunk["invoice_date"] = pd.to_datetime(chunk["invoice_date"])
+    chunk["due_date"] = pd.to_datetime(chunk["due_date"])
+    return chunk.drop(columns=["items"], errors="ignore")
+
+
+def split_of(invoice_ids):
+    """Část (train/val/test) pro každou fakturu podle stabilního otisku invoice_id"""
+    buckets = pd.util.hash_pandas_object(invoice_ids.astype(str), index=False).to_numpy() % 100
+    bounds = np.array([bound for _, bound in SPLITS])
+    return np.searchsorted(bounds, buckets, side="right")
+
+
+def _moments(df, column):
+    """Počet, průměr a součet čtverců odchylek částek po skupinách jednoho bloku"""
+    moments = df.groupby(column, observed=True)["total_amount"].agg(["count", "mean", "var"])
+    moments.index = moments.index.astype(object)
+    return pd.DataFrame({"count": moments["count"], "mean": moments["mean"],
+                         "m2": (moments["var"] * (moments["count"] - 1)).fillna(0)})
+
+
+def _merge_moments(total, part):
+    """Sloučí momenty dvou bloků (Chanův paralelní algoritmus pro průměr a rozptyl)"""
+    if total is None:
+        return part
+    total, part = total.align(part, fill_value=0)
+    count = total["count"] + part["count"]
+    delta = part["mean"] - total["mean"]
+    return pd.DataFrame({
+        "count": count,
+        "mean": total["mean"] + delta * part["count"] / count,
+        "m2": total["m2"] + part["m2"] + delta ** 2 * total["count"] * part["count"] / count,
+    })
+
+
+def collect_statistics(path, chunk_size):
+    """První průchod knihou: statistiky skupin, hodnoty kategorií, třídy a velikosti částí
+
+    Returns:
+    tuple: (statistiky ve tvaru group_statistics, hodnoty kategorií a tříd, počty řádků částí)
+    """
+    moments = {"customer": None, "supplier": None}
+    vocabulary = {column: set() for column in CATEGORICAL_COLUMNS + [LABEL_COLUMN]}
+    split_rows = np.zeros(len(SPLITS), dtype=np.int64)
+    for chunk in iter_ledger(path, chunk_size):
+        df = clean_invoices(chunk)
+        for key, column in (("customer", "customer_name"), ("supplier", "supplier_name")):
+            moments[key] = _merge_moments(moments[key], _moments(df, column))
+        for column, values in vocabulary.items():
+            values.update(df[column].dropna().unique())
+        split_rows += np.bincount(split_of(df["invoice_id"]), minlength=len(SPLITS))
+
+    stats = {}
+    for key, group in moments.items():
+        count = group["count"].astype(np.int64)
+        std = np.sqrt(group["m2"] / (count - 1)).where(count > 1)
+        stats[key] = pd.DataFrame({"count": count, "mean": group["mean"], "std": std})
+    return stats, vocabulary, split_rows
+
+
+def fit_label_encoders(vocabulary):
+    """Label encodery kategorických sloupců (stejná struktura jako label_encoders.pkl)
+
+    Kategorie dodavatelů a odběratelů mají vždy všechny možné hodnoty – dávka
+    při predikci může mít "Top" firmu, i když ji trénovací data nemají,
+    a kódy zůstávají mezi verzemi stejné.
+    """
+    from sklearn.preprocessing import LabelEncoder
+
+    values = {column: vocabulary[column] for column in CATEGORICAL_COLUMNS}
+    values["supplier_category"] = SUPPLIER_CATEGORIES
+    values["customer_category"] = CUSTOMER_CATEGORIES
+    return {column: LabelEncoder().fit(sorted(values[column])) for column in ENCODED_COLUMNS}
+
+
+def build_matrices(path, chunk_size, stats, label_encoders, label_encoder, split_rows, work_dir):
+    """Druhý průchod knihou: příznaky do float32 memmap matic po částech a učení scaleru
+
+    Returns:
+    tuple: (matice příznaků po částech, třídy po částech, natrénovaný scaler)
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    names = [name for name, _ in SPLITS]
+    X = {name: np.lib.format.open_memmap(Path(work_dir) / f"{name}.npy", mode="w+", dtype=np.float32,
+                                         shape=(int(rows), len(FEATURES)))
+         for name, rows in zip(names, split_rows)}
+    y = {name: np.empty(int(rows), dtype=np.int32) for name, rows in zip(names, split_rows)}
+    offsets = dict.fromkeys(names, 0)
+    scaler = StandardScaler()
+
+    for chunk in iter_ledger(path, chunk_size):
+        df = apply_statistics(clean_invoices(chunk), stats)
+        encode_columns(df, label_encoders)
+        features = select_features(df)
+        labels = label_encoder.transform(df[LABEL_COLUMN])
+        parts = split_of(df["invoice_id"])
+        for i, name in enumerate(names):
+            mask = parts == i
+            start, end = offsets[name], offsets[name] + int(mask.sum())
+            X[name][start:end] = features[mask].to_numpy(dtype=np.float32)
+            y[name][start:end] = labels[mask]
+            offsets[name] = end
+            if name == "train" and end > start:
+                # Scaler se učí jen na trénovací části (jako v notebooku)
+                scaler.partial_fit(features[mask])
+        metrics.inc("train_rows_total", len(df))
+    return X, y, scaler
+
+
+def scale_in_place(matrix, scaler, block_rows):
+    """Naškáluje memmap matici po blocích na místě (bez kopie celé matice v paměti)"""
+    for start in range(0, len(matrix), block_rows):
+        block = pd.DataFrame(matrix[start:start + block_rows], columns=FEATURES)
+        matrix[start:start + block_rows] = scaler.transform(block)
+    matrix.flush()
+
+
+def quantile_matrix(matrix, labels, block_rows, max_bin, n_jobs, ref=None):
+    """QuantileDMatrix z memmap matice čtené po blocích (xgb.DataIter)
+
+    XGBoost z bloků rovnou spočítá kvantily a uloží jen kvantizované biny
+    příznaků – celá float32 matice se do paměti nenačte ani nezkopíruje.
+
+    Parameters:
+    matrix (np.memmap): Naškálovaná matice příznaků
+    labels (np.ndarray): Třídy řádků
+    block_rows (int): Počet řádků předaných najednou
+    max_bin (int): Počet binů histogramu na příznak
+    n_jobs (int): Počet vláken
+    ref (xgb.QuantileDMatrix): Trénovací matice, jejíž kvantily se použijí (pro validační část)
+    """
+    import xgboost as xgb
+
+    class MatrixIter(xgb.DataIter):
+        def __init__(self):
+            self._start = 0
+            super().__init__()
+
+        def next(self, input_data):
+            if self._start >= len(matrix):
+                return False
+            end = self._start + block_rows
+            input_data(data=matrix[self._start:end], label=labels[self._start:end])
+            self._start = end
+            return True
+
+        def reset(self):
+            self._start = 0
+
+    return xgb.QuantileDMatrix(MatrixIter(), max_bin=max_bin, nthread=n_jobs, ref=ref)
+
+
+def predict_in_blocks(model, matrix, block_rows):
+    """Predikce tříd memmap matice po blocích"""
+    return np.concatenate([model.predict(matrix[start:start + block_rows])
+                           for start in range(0, len(matrix), block_rows)])
+
+
+def _save_atomically(source, target):
+    tmp = Path(target).with_name(Path(target).name + ".tmp")
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+def check_classes(classes):
+    """Ověří, že kódy tříd modelu odpovídají popiskům v aplikaci (MODEL_CLASSES)
+
+    Predikce vrací index třídy; jiná množina hodnot anomaly_type v datech
+    (chybějící nebo nová třída) by posunula popisky anomálií v aplikaci.
+
+    Raises:
+    ValueError: Pokud se třídy liší
+    """
+    if list(classes) != list(MODEL_CLASSES):
+        raise ValueError(f"Třídy modelu {list(classes)} neodpovídají popiskům aplikace {list(MODEL_CLASSES)}")
+
+
+def promote(version_dir, target_dir=ML_DIR):
+    """Zkopíruje artefakty verze do ml_models/, odkud je načítá predikce
+
+    Verzi, jejíž třídy neodpovídají MODEL_CLASSES, odmítne (ValueError).
+    """
+    version_dir = Path(version_dir)
+    manifest = json.loads((version_dir / "manifest.json").read_text(encoding="utf-8"))
+    check_classes(manifest["classes"])
+    for name in ARTIFACT_NAMES:
+        _save_atomically(version_dir / name, Path(target_dir) / name)
+    # Manifest až po artefaktech – popisuje verzi, která je aktivní
+    _save_atomically(version_dir / "manifest.json", Path(target_dir) / "model_manifest.json")
+
+
+def train(input_path, output_dir, chunk_size=500_000, n_estimators=500, early_stopping_rounds=20,
+          n_jobs=None, max_bin=256, version=None, work_dir=None):
+    """Natrénuje model z knihy faktur a uloží verzované artefakty
+
+    Parameters:
+    input_path (str): Kniha faktur (CSV nebo Parquet)
+    output_dir (str): Složka verzí; artefakty se uloží do <output_dir>/<verze>/
+    chunk_size (int): Počet řádků čtených najednou
+    n_estimators (int): Maximální počet stromů (skutečný určí early stopping)
+    early_stopping_rounds (int): Počet kol bez zlepšení na validační části, po kterém se trénování ukončí
+    n_jobs (int): Počet vláken XGBoost (None = všechna jádra)
+    max_bin (int): Počet binů histogramu na příznak
+    version (str): Název verze (výchozí: datum a čas)
+    work_dir (str): Složka pro dočasné matice příznaků (výchozí: output_dir)
+
+    Returns:
+    Path: Složka s artefakty verze
+    """
+    import joblib
+    import xgboost as xgb
+    import sklearn
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
+    version = version or datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    version_dir = output_dir / version
+    if version_dir.exists():
+        raise FileExistsError(f"Verze {version_dir} už existuje")
+    n_jobs = n_jobs or os.cpu_count()
+    report = {}
+    wall_start = time.perf_counter()
+
+    print(f"{'krok':<12} {'čas':>11}  {'RSS po kroku':>15}  {'špička':>15}")
+    with tempfile.TemporaryDirectory(dir=work_dir or output_dir, prefix=".train-") as tmp:
+        with stage("statistiky", report):
+            stats, vocabulary, split_rows = collect_statistics(input_path, chunk_size)
+            label_encoders = fit_label_encoders(vocabulary)
+            label_encoder = LabelEncoder().fit(sorted(vocabulary[LABEL_COLUMN]))
+        rows = dict(zip([name for name, _ in SPLITS], map(int, split_rows)))
+        if not rows["train"] or not rows["val"]:
+            raise ValueError(f"Příliš málo faktur pro trénování a validaci: {rows}")
+
+        with stage("příznaky", report):
+            X, y, scaler = build_matrices(input_path, chunk_size, stats, label_encoders, label_encoder,
+                                          split_rows, tmp)
+        with stage("škálování", report):
+            for matrix in X.values():
+                scale_in_place(matrix, scaler, chunk_size)
+
+        with stage("trénování", report):
+            dtrain = quantile_matrix(X["train"], y["train"], chunk_size, max_bin, n_jobs)
+            dval = quantile_matrix(X["val"], y["val"], chunk_size, max_bin, n_jobs, ref=dtrain)
+            params = {key: value for key, value in MODEL_PARAMS.items() if key != "random_state"}
+            booster = xgb.train(
+                {"objective": "multi:softprob", "num_class": len(label_encoder.classes_), "tree_method": "hist",
+                 "max_bin": max_bin, "nthread": n_jobs, "eval_metric": "mlogloss",
+                 "seed": MODEL_PARAMS["random_state"], **params},
+                dtrain, num_boost_round=n_estimators, evals=[(dval, "val")],
+                early_stopping_rounds=early_stopping_rounds, verbose_eval=False
+            )
+            del dtrain, dval
+            # Artefakt zůstává XGBClassifier (predict/predict_proba v predict_pdf_batch)
+            model = xgb.XGBClassifier()
+            model.load_model(bytearray(booster.save_raw("ubj")))
+
+        with stage("vyhodnocení", report):
+            evaluation = {}
+            for name in ("val", "test"):
+                if not len(y[name]):
+                    continue
+                predicted = predict_in_blocks(model, X[name], chunk_size)
+                evaluation[name] = {
+                    "accuracy": round(float(accuracy_score(y[name], predicted)), 6),
+                    "report": classification_report(
+                        y[name], predicted, labels=range(len(label_encoder.classes_)),
+                        target_names=list(label_encoder.classes_), output_dict=True, zero_division=0
+                    ),
+                    "confusion_matrix": confusion_matrix(
+                        y[name], predicted, labels=range(len(label_encoder.classes_))
+                    ).tolist(),
+                }
+            del X
+
+    staging = output_dir / f".{version}.tmp"
+    with stage("uložení", report):
+        staging.mkdir()
+        joblib.dump(model, staging / "xgb_model.pkl")
+        joblib.dump(scaler, staging / "scaler.pkl")
+        joblib.dump(label_encoders, staging / "label_encoders.pkl")
+
+    wall = time.perf_counter() - wall_start
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "source": {"path": str(Path(input_path).resolve()), "size": os.path.getsize(input_path)},
+        "rows": rows,
+        "features": FEATURES,
+        # Predikce vrací index třídy v tomto seznamu
+        "classes": [str(name) for name in label_encoder.classes_],
+        "params": {"n_estimators": n_estimators, "early_stopping_rounds": early_stopping_rounds,
+                   "tree_method": "hist", "max_bin": max_bin, "n_jobs": n_jobs, **MODEL_PARAMS},
+        "best_iteration": int(model.best_iteration),
+        "evaluation": evaluation,
+        "stages": report,
+        "wall_seconds": round(wall, 3),
+        "versions": {"xgboost": xgb.__version__, "scikit-learn": sklearn.__version__,
+                     "pandas": pd.__version__, "numpy": np.__version__},
+    }
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    # Verze se objeví až kompletní (přejmenování složky)
+    os.replace(staging, version_dir)
+
+    print(f"\nTrénovací / validační / testovací faktury: {rows['train']} / {rows['val']} / {rows['test']}")
+    print(f"Stromů po early stopping: {model.best_iteration + 1} z {n_estimators}, vláken: {n_jobs}")
+    for name, result in evaluation.items():
+        print(f"Přesnost ({name}): {result['accuracy']:.4f}")
+    print(f"Celkový čas trénování: {wall:.1f} s, špička paměti {_peak_rss_mb() or 0:.0f} MB")
+    print(f"Artefakty uloženy do {version_dir}")
+    return version_dir
+
+
+if __name__ == "__main__":
+    from utils.metrics import add_instrumentation_arguments, instrumented
+
+    parser = argparse.ArgumentParser(description='Trénování modelu detekce anomálií z knihy faktur')
+    parser.add_argument('--input', type=str, default="utils/synthetic_project_data.csv",
+                        help='Kniha faktur CSV nebo Parquet (výchozí: utils/synthetic_project_data.csv)')
+    parser.add_argument('--output_dir', type=str, default=str(ML_DIR / "versions"),
+                        help='Složka verzí modelu (výchozí: ml_models/versions)')
+    parser.add_argument('--version', type=str, default=None, help='Název verze (výchozí: datum a čas)')
+    parser.add_argument('--chunk_size', type=int, default=500_000,
+                        help='Počet faktur čtených najednou (výchozí: 500000)')
+    parser.add_argument('--n_estimators', type=int, default=500,
+                        help='Maximální počet stromů (výchozí: 500, skutečný určí early stopping)')
+    parser.add_argument('--early_stopping_rounds', type=int, default=20,
+                        help='Počet kol bez zlepšení na validační části před ukončením (výchozí: 20)')
+    parser.add_argument('--n_jobs', type=int, default=None, help='Počet vláken XGBoost (výchozí: všechna jádra)')
+    parser.add_argument('--max_bin', type=int, default=256, help='Počet binů histogramu na příznak (výchozí: 256)')
+    parser.add_argument('--work_dir', type=str, default=None,
+                        help='Složka pro dočasné matice příznaků na disku (výchozí: --output_dir)')
+    parser.add_argument('--promote', action='store_true',
+                        help='Po natrénování zkopíruje verzi do ml_models/ jako aktivní model')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        version_dir = train(args.input, args.output_dir, chunk_size=args.chunk_size, n_estimators=args.n_estimators,
+                            early_stopping_rounds=args.early_stopping_rounds, n_jobs=args.n_jobs,
+                            max_bin=args.max_bin, version=args.version, work_dir=args.work_dir)
+        if args.promote:
+            try:
+                promote(version_dir)
+            except ValueError as error:
+                print(f"Verze {version_dir.name} nebyla aktivována: {error}")
+                raise SystemExit(1)
+            print(f"Verze {version_dir.name} je aktivní v {ML_DIR}")
@@ -0,0 +1,75 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Sémantická cache odpovědí pro opakované nebo přeformulované dotazy
+
+    Ukládá embedding dotazu spolu s odpovědí a verzí indexu, ze které odpověď
+    vznikla. Vyhledává se kosinovou podobností v malé lokální matici vektorů,
+    záznamy expirují po TTL a při zaplnění se vyřazuje nejdéle nepoužitý (LRU).
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: int = 3600, max_entries: int = 256):
+        """
+        Parameters:
+        threshold (float): Minimální kosinová podobnost dotazů pro vrácení uložené odpovědi
+        ttl_seconds (int): Doba platnosti záznamu v sekundách
+        max_entries (int): Maximální počet záznamů (LRU)
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # klíč -> (verze indexu, čas uložení, hodnota)
+        self._vectors = {}             # klíč -> normalizovaný embedding dotazu
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, (_, stored_at, _) in self._entries.items() if now - stored_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+            del self._vectors[key]
+
+    def get(self, query_vector, index_version: str):
+        """Vrátí uloženou hodnotu pro nejpodobnější dotaz nad stejnou verzí indexu, jinak None"""
+        query_vector = self._normalize(query_vector)
+        with self._lock:
+            self._evict_expired(time.time())
+            keys = [key for key, (version, _, _) in self._entries.items() if version == index_version]
+            if keys:
+                similarities = np.vstack([self._vectors[key] for key in keys]) @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][2]
+            self.misses += 1
+            return None
+
+    def put(self, query_vector, index_version: str, value):
+        """Uloží hodnotu pro dotaz; při překročení kapacity vyřadí nejdéle nepoužitý záznam"""
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (index_version, time.time(), value)
+            self._vectors[key] = self._normalize(query_vector)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                del self._vectors[oldest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
@@ -0,0 +1,80 @@
+"""
+Benchmark recall vs. latence pro typy FAISS indexů na syntetickém korpusu.
+
+Spuštění (z kořenového adresáře projektu):
+python -m rag.benchmark_index --n 1000000 --dim 256
+"""
+
+import time
+import argparse
+import numpy as np
+import faiss
+
+from .vector_index import build_index
+from utils.metrics import add_instrumentation_arguments, instrumented
+
+# Konfigurace porovnávaných indexů (typ, parametry)
+BENCHMARK_CONFIGS = [
+    ("flat", {}),
+    ("ivf", {"nlist": 1024, "nprobe": 8}),
+    ("ivf", {"nlist": 1024, "nprobe": 32}),
+    ("hnsw", {"M": 32, "ef_search": 32}),
+    ("hnsw", {"M": 32, "ef_search": 128}),
+    ("ivfpq", {"nlist": 1024, "m": 32, "nbits": 8, "nprobe": 16}),
+    ("hnswpq", {"M": 32, "m": 32, "nbits": 8, "ef_search": 64}),
+]
+
+
+def synthetic_corpus(n, dim, n_clusters=2000, seed=42):
+    """Vygeneruje shlukované, L2 normalizované vektory podobné embeddingům článků"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n)]
+    vectors += 0.5 * rng.standard_normal((n, dim), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found, truth, k):
+    """Podíl skutečných k nejbližších sousedů, které index vrátil"""
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def run_benchmark(n, dim, n_queries, k):
+    corpus = synthetic_corpus(n + n_queries, dim)
+    vectors, queries = corpus[:n], corpus[n:]
+
+    # Přesný výsledek jako reference pro recall
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    print(f"Korpus: {n:,} vektorů, dim={dim}, dotazů={n_queries}, k={k}")
+    print(f"{'index':<8} {'parametry':<40} {'build [s]':>10} {'ms/dotaz':>10} {f'recall@{k}':>10} {'paměť [MB]':>11}")
+
+    for index_type, params in BENCHMARK_CONFIGS:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type, **params)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        latency_ms = (time.perf_counter() - start) / n_queries * 1000
+
+        memory_mb = faiss.serialize_index(index).nbytes / 1024 ** 2
+        print(f"{index_type:<8} {str(params):<40} {build_time:>10.1f} {latency_ms:>10.3f} "
+              f"{recall_at_k(found, truth, k):>10.3f} {memory_mb:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark FAISS indexů (recall vs. latence)')
+    parser.add_argument('--n', type=int, default=1_000_000, help='Počet vektorů v korpusu (výchozí: 1 000 000)')
+    parser.add_argument('--dim', type=int, default=256, help='Dimenze vektorů (výchozí: 256)')
+    parser.add_argument('--queries', type=int, default=1000, help='Počet dotazů (výchozí: 1000)')
+    parser.add_argument('--k', type=int, default=10, help='Počet vrácených sousedů (výchozí: 10)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        run_benchmark(args.n, args.dim, args.queries, args.k)
@@ -0,0 +1,52 @@
+from .tokenizer import count_tokens, truncate_to_tokens
+
+# Výchozí limity kontextu pro generování odpovědi
+DEFAULT_CONTEXT_BUDGET = 1500
+DEFAULT_DOC_TOKENS = 120
+
+
+def format_doc(doc, max_doc_tokens: int = DEFAULT_DOC_TOKENS) -> str:
+    """Zformátuje článek do kompaktní podoby pro LLM
+
+    Ponechá jen jazyk, titulek, zkrácený popis a název zdroje – URL ani datum
+    model pro souhrn nepotřebuje (zobrazují se uživateli zvlášť).
+    """
+    title, _, description = doc.page_content.partition("\n")
+    text = f"[{doc.metadata.get('language', '?')}] {title.strip()}"
+    description = description.strip()
+    if description:
+        text += "\n" + truncate_to_tokens(description, max_doc_tokens)
+    return f"{text}\n({doc.metadata.get('source', '')})"
+
+
+def pack_context(scored_docs, max_tokens: int = DEFAULT_CONTEXT_BUDGET,
+                 max_doc_tokens: int = DEFAULT_DOC_TOKENS, formatted: dict = None):
+    """Naplní rozpočet tokenů články seřazenými podle relevance
+
+    Parameters:
+    scored_docs (list): Dvojice (Document, vzdálenost) z similarity_search_with_score;
+        menší vzdálenost = relevantnější článek
+    max_tokens (int): Maximální velikost kontextu v tokenech
+    max_doc_tokens (int): Maximální délka popisu jednoho článku v tokenech
+    formatted (dict): Sdílená cache zformátovaných článků (id článku -> (text, tokeny));
+        při více dotazech se tak článek vrácený pro několik z nich formátuje
+        a počítá jen jednou
+
+    Returns:
+    tuple: (kontext jako text, počet použitých tokenů)
+    """
+    parts, used = [], 0
+    for doc, _ in sorted(scored_docs, key=lambda pair: pair[1]):
+        if formatted is not None and id(doc) in formatted:
+            part, tokens = formatted[id(doc)]
+        else:
+            part = format_doc(doc, max_doc_tokens)
+            tokens = count_tokens(part) + 1  # + oddělovač
+            if formatted is not None:
+                formatted[id(doc)] = (part, tokens)
+        if used + tokens > max_tokens:
+            # Méně relevantní, ale kratší článek se může ještě vejít
+            continue
+        parts.append(part)
+        used += tokens
+    return "\n\n".join(parts), used
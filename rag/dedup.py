@@ -0,0 +1,73 @@
+import re
+import hashlib
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+SIMHASH_BITS = 64
+
+
+def _shingles(text: str, size: int = 2):
+    """Rozdělí text na překrývající se n-tice slov (shingles)"""
+    words = TOKEN_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return words
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: str) -> int:
+    """Vypočítá 64bitový SimHash textu z hashovaných shingles"""
+    weights = [0] * SIMHASH_BITS
+    for shingle in _shingles(text):
+        digest = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (digest >> bit) & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def find_near_duplicates(texts, max_distance: int = 10):
+    """Seskupí téměř shodné texty pomocí SimHash a LSH přes pásma bitů
+
+    Hash se rozdělí na max_distance + 1 disjunktních pásem; dva texty
+    do vzdálenosti max_distance se musí shodovat alespoň v jednom pásmu,
+    takže stačí porovnávat jen kandidáty ze společných pásem.
+
+    Parameters:
+    texts (list): Texty ve stejném pořadí jako dokumenty
+    max_distance (int): Maximální Hammingova vzdálenost pro shodu (krátké
+        texty titulek + popis se liší cca o 5-9 bitů, nesouvisející o 20+)
+
+    Returns:
+    list: Shluky indexů; první index shluku je jeho reprezentant
+    """
+    bands = max_distance + 1
+    band_bits = SIMHASH_BITS // bands
+    band_mask = (1 << band_bits) - 1
+    hashes = [simhash(text) for text in texts]
+    buckets = defaultdict(list)
+    clusters = {}
+
+    for i, h in enumerate(hashes):
+        keys = [(band, (h >> (band * band_bits)) & band_mask) for band in range(bands)]
+        match = None
+        for key in keys:
+            for candidate in buckets[key]:
+                if hamming_distance(h, hashes[candidate]) <= max_distance:
+                    match = candidate
+                    break
+            if match is not None:
+                break
+
+        if match is None:
+            # Nový reprezentant – do pásem se registrují jen reprezentanti
+            clusters[i] = [i]
+            for key in keys:
+                buckets[key].append(i)
+        else:
+            clusters[match].append(i)
+
+    return list(clusters.values())
@@ -0,0 +1,133 @@
+import re
+import copy
+import math
+import hashlib
+from collections import Counter
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Dostupné embedding backendy (hodnota pro config.EMBEDDING_BACKEND)
+EMBEDDING_BACKENDS = ("openai", "hashing")
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashedTfidfEmbeddings(Embeddings):
+    """Lokální CPU embedding založený na hashovaném TF-IDF.
+
+    Nevyžaduje síť ani stažený model – slova a bigramy se stabilně hashují
+    do vektoru pevné délky, váží se sublineárním TF a IDF naučeným z naposledy
+    vložených dokumentů. Výsledné vektory jsou L2 normalizované, takže
+    L2 vzdálenost ve FAISS odpovídá kosinové podobnosti.
+    """
+
+    # Váhy (IDF) se učí z vkládaných dokumentů – vektory z různých dávek
+    # nejsou srovnatelné (viz partition_embeddings)
+    fits_documents = True
+
+    def __init__(self, n_features: int = 2048, use_bigrams: bool = True):
+        """
+        Parameters:
+        n_features (int): Dimenze výsledného vektoru
+        use_bigrams (bool): Zda kromě slov hashovat i dvojice sousedních slov
+        """
+        self.n_features = n_features
+        self.use_bigrams = use_bigrams
+        self._idf = np.ones(n_features, dtype=np.float32)
+
+    def _tokenize(self, text: str) -> List[str]:
+        """Rozdělí text na malá slova (a případně bigramy)"""
+        words = TOKEN_PATTERN.findall(text.lower())
+        if self.use_bigrams:
+            words += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return words
+
+    def _bucket(self, token: str):
+        """Stabilní hash tokenu -> (index, znaménko); nezávislý na PYTHONHASHSEED"""
+        digest = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        return digest % self.n_features, 1.0 if (digest >> 63) & 1 else -1.0
+
+    def _term_frequencies(self, text: str) -> np.ndarray:
+        """Hashovaný vektor sublineárních četností tokenů"""
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for token, count in Counter(self._tokenize(text)).items():
+            index, sign = self._bucket(token)
+            vector[index] += sign * (1.0 + math.log(count))
+        return vector
+
+    def _fit_idf(self, matrix: np.ndarray):
+        """Naučí IDF váhy z hashovaných četností dokumentů"""
+        doc_freq = np.count_nonzero(matrix, axis=0)
+        self._idf = (np.log((1 + len(matrix)) / (1 + doc_freq)) + 1.0).astype(np.float32)
+
+    def _normalize(self, matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Zembedduje dokumenty; IDF se přepočítá z této dávky"""
+        if not texts:
+            return []
+        matrix = np.vstack([self._term_frequencies(text) for text in texts])
+        self._fit_idf(matrix)
+        return self._normalize(matrix * self._idf).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Zembedduje dotaz s IDF vahami naposledy vložených dokumentů"""
+        vector = self._term_frequencies(text)[np.newaxis, :] * self._idf
+        return self._normalize(vector)[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Zembedduje více dotazů najednou; IDF váhy dokumentů se nemění (na rozdíl od embed_documents)"""
+        if not texts:
+            return []
+        matrix = np.vstack([self._term_frequencies(text) for text in texts])
+        return self._normalize(matrix * self._idf).tolist()
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Zembedduje dávku dotazů jedním voláním, pokud to backend umí
+
+    HashedTfidfEmbeddings má vlastní embed_queries. OpenAIEmbeddings.embed_query
+    je jen embed_documents pro jeden text, takže dávka dotazů jde jedním
+    požadavkem přes embed_documents. Ostatní backendy mohou embedovat dotazy
+    jinak než dokumenty – pro ně se volá embed_query po jednom.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if type(embeddings).__name__ == "OpenAIEmbeddings":
+        return embeddings.embed_documents(texts) if texts else []
+    return [embeddings.embed_query(text) for text in texts]
+
+
+def partition_embeddings(embeddings: Embeddings) -> Embeddings:
+    """Instance embeddingů pro jeden oddíl vektorového indexu
+
+    Backend, který se učí váhy z vkládaných dokumentů (HashedTfidfEmbeddings),
+    dostane vlastní kopii – oddíl pak má IDF naučené ze všech svých článků
+    a jeho vektory i vektory dotazů vznikají se stejnými vahami. Ostatní
+    backendy (OpenAI) mají pevné vektory a sdílí se.
+    """
+    if getattr(embeddings, "fits_documents", False):
+        return copy.copy(embeddings)
+    return embeddings
+
+
+def get_embeddings(backend: str = "openai", openai_api_key: str = None, **kwargs) -> Embeddings:
+    """Vrátí embedding model podle názvu backendu
+
+    Parameters:
+    backend (str): "openai" (OpenAIEmbeddings přes API) nebo "hashing" (lokální TF-IDF)
+    openai_api_key (str): API klíč pro OpenAI, použije se jen pro backend "openai"
+    """
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        from utils.outbound import openai_http_kwargs
+        # Sdílené spojení s limity a opakováním (utils.outbound), kwargs je mohou přepsat
+        return OpenAIEmbeddings(api_key=openai_api_key, **{**openai_http_kwargs(), **kwargs})
+    if backend == "hashing":
+        return HashedTfidfEmbeddings(**kwargs)
+    raise ValueError(f"Neznámý embedding backend '{backend}', povolené: {', '.join(EMBEDDING_BACKENDS)}")
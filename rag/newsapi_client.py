@@ -1,10 +1,12 @@
 import os
+import time
+import hashlib
+import threading
 import requests
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS  
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
@@ -17,45 +19,183 @@ import os
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
+from rag.embeddings import get_embeddings, embed_queries
+from rag.vector_index import PartitionedVectorStore
+from rag.dedup import find_near_duplicates
+from rag.tokenizer import count_tokens
+from rag.context import pack_context, DEFAULT_CONTEXT_BUDGET
+from rag.answer_cache import SemanticAnswerCache
+from utils.metrics import metrics
+from utils.outbound import get_provider, openai_http_kwargs
+
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+
+# Stáří článků (ve dnech), které se stahují a drží ve vektorovém úložišti
+NEWS_WINDOW_DAYS = 30
+
+# Jak dlouho (v sekundách) se používá stažená sada článků, než se při dotazu stáhne znovu
+DEFAULT_REFRESH_SECONDS = 900
+
+# Počet souběžně generovaných odpovědí v query_many
+DEFAULT_MAX_WORKERS = 4
+
+NO_ARTICLES_ANSWER = "Nenalezeny žádné relevantní články v češtině ani angličtině."
+
+
+class NewsSnapshot:
+    """Neměnný stav jedné aktualizace článků, ze kterého čtou dotazy
+
+    Aktualizace sestaví nový snímek stranou a vymění ho jedním přiřazením,
+    takže souběžný dotaz vždy vidí úložiště, verzi indexu a statistiky
+    ze stejné aktualizace.
+    """
+
+    __slots__ = ("vectorstore", "index_version", "dedup_stats", "refreshed_at")
+
+    def __init__(self, vectorstore, index_version, dedup_stats, refreshed_at):
+        self.vectorstore = vectorstore
+        self.index_version = index_version
+        self.dedup_stats = dedup_stats
+        self.refreshed_at = refreshed_at
+
+
 class TechNewsRAG:
     """Univerzální třída pro technologická média s flexibilními API klíči"""
     
-    def __init__(self, newsapi_key: str, openai_api_key: str):
+    def __init__(self, newsapi_key: str, openai_api_key: str, embedding_backend: str = "openai",
+                 index_type: str = "flat", index_params: dict = None,
+                 context_budget: int = DEFAULT_CONTEXT_BUDGET,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS):
         """
         Parameters:
         newsapi_key (str): API klíč pro NewsAPI (z UI/config.py)
         openai_api_key (str): API klíč pro OpenAI (z UI/config.py)
+        embedding_backend (str): "openai" nebo lokální "hashing" (z config.py)
+        index_type (str): Typ FAISS indexu – flat, ivf, hnsw, ivfpq, hnswpq (z config.py)
+        index_params (dict): Build/search parametry indexu, např. {"nlist": 1024, "nprobe": 16}
+        context_budget (int): Maximální velikost kontextu pro LLM v tokenech
+        refresh_seconds (float): Stáří sady článků, po kterém ji dotaz nechá stáhnout znovu
         """
         self.newsapi_key = newsapi_key
         self.openai_api_key = openai_api_key
+        self.embedding_backend = embedding_backend
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.context_budget = context_budget
+        self.refresh_seconds = refresh_seconds
+        self.answer_cache = SemanticAnswerCache()
         self._init_models()
-        self.vectorstore = None  # Bude inicializováno při _refresh_data
+        # Instance je sdílená mezi relacemi aplikace – aktualizace běží pod zámkem
+        # a dotazy čtou jen z neměnného snímku (viz NewsSnapshot)
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
         self._refresh_data()
 
+    @property
+    def vectorstore(self):
+        return self._snapshot.vectorstore if self._snapshot else None
+
+    @property
+    def index_version(self):
+        return self._snapshot.index_version if self._snapshot else None
+
+    @property
+    def dedup_stats(self):
+        return self._snapshot.dedup_stats if self._snapshot else {}
+
     def _init_models(self):
         """Inicializuje LLM a embedding modely"""
-        self.embeddings = OpenAIEmbeddings(api_key=self.openai_api_key)
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.3, api_key=self.openai_api_key)
+        # langchain_openai je těžký import – načte se až při vytvoření instance
+        from langchain_openai import ChatOpenAI
+        self.embeddings = get_embeddings(self.embedding_backend, openai_api_key=self.openai_api_key)
+        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.3, api_key=self.openai_api_key,
+                              **openai_http_kwargs())
 
-    def _refresh_data(self):
-        """Aktualizuje data z obou zdrojů"""
-        
-        # Načtení českých i zahraničních článků
-        docs_cz = self.fetch_news(language="cs", query="technologie OR AI OR umělá inteligence")
-        docs_int = self.fetch_news(language="en", query="technology OR AI OR artificial intelligence")
-        
-        # Kombinace článků
-        combined_docs = docs_cz + docs_int
-        
-        if combined_docs:
-            # Vytvoření FAISS vektorového úložiště
-            self.vectorstore = FAISS.from_documents(combined_docs, self.embeddings)
-        else:
-            # Prázdné úložiště pro případ, že nejsou žádné články
-            self.vectorstore = FAISS.from_texts(["Žádné články nenalezeny"], self.embeddings)
-
-    def fetch_news(self, language: str, query: str):
-        """Získává články pro zadaný jazyk"""
+    def _is_stale(self, snapshot):
+        return snapshot is None or time.time() - snapshot.refreshed_at >= self.refresh_seconds
+
+    def _current_snapshot(self):
+        """Vrátí aktuální snímek; je-li starší než refresh_seconds, nechá ho aktualizovat
+
+        Pokud zastaralá data právě aktualizuje jiné vlákno, dotaz nečeká
+        a použije dosavadní snímek.
+        """
+        snapshot = self._snapshot
+        if not self._is_stale(snapshot):
+            return snapshot
+        return self._refresh_data(wait=snapshot is None)
+
+    def _refresh_data(self, wait: bool = True):
+        """Aktualizuje data z obou zdrojů a vymění snímek, ze kterého čtou dotazy
+
+        Parameters:
+        wait (bool): Počkat na aktualizaci, kterou už provádí jiné vlákno
+            (jinak se hned vrátí dosavadní snímek)
+
+        Returns:
+        NewsSnapshot: Aktuální snímek
+        """
+        if not self._refresh_lock.acquire(blocking=wait):
+            return self._snapshot
+        try:
+            # Během čekání na zámek mohlo data aktualizovat jiné vlákno
+            if self._snapshot is not None and not self._is_stale(self._snapshot):
+                return self._snapshot
+
+            dedup_stats = {"articles": 0, "duplicates": 0, "saved_tokens": 0, "invalid": 0}
+
+            # Načtení českých i zahraničních článků
+            docs_cz = self.fetch_news(language="cs", query="technologie OR AI OR umělá inteligence", stats=dedup_stats)
+            docs_int = self.fetch_news(language="en", query="technology OR AI OR artificial intelligence",
+                                       stats=dedup_stats)
+
+            # Kombinace článků
+            combined_docs = docs_cz + docs_int
+
+            # Úložiště rozdělené podle jazyka a týdne publikace se mezi aktualizacemi
+            # zachovává – zembeddují se jen nové články a přestaví se jen oddíly,
+            # do kterých přibyly. Kopie nemění oddíly snímku, ze kterého čtou běžící
+            # dotazy. Bez článků zůstane prázdné a query vrátí informaci o nenalezení.
+            if self._snapshot is not None:
+                vectorstore = self._snapshot.vectorstore.copy()
+            else:
+                vectorstore = PartitionedVectorStore(self.embeddings, self.index_type, **self.index_params)
+            known = vectorstore.urls()
+            new_docs = {}
+            for doc in combined_docs:
+                if doc.metadata["url"] not in known:
+                    new_docs.setdefault(doc.metadata["url"], doc)
+            new_docs = list(new_docs.values())
+            with metrics.timer("rag_embed"):
+                vectorstore.add_documents(new_docs)
+            metrics.inc("rag_documents_embedded_total", len(new_docs))
+            vectorstore.drop_before(datetime.now() - timedelta(days=NEWS_WINDOW_DAYS))
+
+            self._snapshot = NewsSnapshot(vectorstore, self._index_version(vectorstore.urls()), dedup_stats,
+                                          time.time())
+            metrics.inc("rag_refreshes_total")
+            return self._snapshot
+        finally:
+            self._refresh_lock.release()
+
+    @staticmethod
+    def _cache_version(index_version, language, since):
+        """Klíč verze pro cache odpovědí – odpovědi s jinými filtry se nesmí zaměnit"""
+        return f"{index_version}|{language}|{since}"
+
+    def _index_version(self, urls):
+        """Verze indexu = otisk množiny článků (URL); při stejných článcích zůstává stejná"""
+        urls = sorted(urls)
+        return hashlib.blake2b("\n".join(urls).encode("utf-8"), digest_size=16).hexdigest()
+
+    def fetch_news(self, language: str, query: str, stats: dict = None):
+        """Získává články pro zadaný jazyk
+
+        Parameters:
+        language (str): "cs" nebo "en"
+        query (str): Dotaz pro NewsAPI
+        stats (dict): Statistiky deduplikace, do kterých se připočítají výsledky
+        """
         domains = {
             "cs": "technet.idnes.cz,zive.cz,root.cz,lupa.cz,cnews.cz,cc.cz,chip.cz,itbiz.cz",
             "en": "techcrunch.com,theverge.com,wired.com,engadget.com,arstechnica.com"
@@ -66,34 +206,78 @@ class TechNewsRAG:
             "domains": domains,
             "language": language,
             "sortBy": "relevancy",
-            "from": (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d"),
-            "pageSize": 100,
-            "apiKey": self.newsapi_key
+            "from": (datetime.now() - timedelta(days=NEWS_WINDOW_DAYS)).strftime("%Y-%m-%d"),
+            "pageSize": 100
         }
         
         try:
-            response = requests.get("https://newsapi.org/v2/everything", params=params)
-            return self._process_articles(response.json().get('articles', []), language)
-        except Exception:
+            with metrics.timer("rag_fetch", language=language):
+                # Klíč v hlavičce, ne v URL – URL se objevuje v chybových hláškách
+                response = get_provider("newsapi").get(
+                    NEWSAPI_URL, params=params, headers={"X-Api-Key": self.newsapi_key}
+                )
+                response.raise_for_status()
+                articles = response.json().get('articles', [])
+        except (requests.RequestException, ValueError) as error:
+            # Výpadek NewsAPI nesmí shodit aplikaci – pokračuje se bez článků v tomto jazyce
+            print(f"Stažení článků z NewsAPI ({language}) selhalo: {type(error).__name__}")
             return []
+        return self._process_articles(articles, language, stats)
+
+    def _process_articles(self, articles, language: str, stats: dict = None):
+        """Zpracuje články s ohledem na jazyk a odstraní téměř shodné duplicity
 
-    def _process_articles(self, articles, language: str):
-        """Zpracuje články s ohledem na jazyk"""
+        Poškozený článek (chybějící URL nebo zdroj, neplatné datum) se přeskočí
+        a započítá do stats["invalid"] – jeden vadný záznam z NewsAPI tak
+        neshodí celou aktualizaci.
+        """
+        if stats is None:
+            stats = {"articles": 0, "duplicates": 0, "saved_tokens": 0, "invalid": 0}
         processed = []
         for art in articles:
-            if not art.get('title') or not self._is_valid_source(art['url'], language):
+            try:
+                if not art.get('title') or not self._is_valid_source(art['url'], language):
+                    continue
+                # Datum se ověří hned – vektorový index podle něj řadí články do oddílů
+                datetime.fromisoformat(str(art['publishedAt']).replace("Z", "+00:00"))
+                doc = Document(
+                    page_content=f"{art['title']}\n{art.get('description','')}",
+                    metadata={
+                        "source": art['source']['name'],
+                        "date": art['publishedAt'],
+                        "url": art['url'],
+                        "language": language
+                    }
+                )
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                stats["invalid"] = stats.get("invalid", 0) + 1
+                metrics.inc("rag_invalid_articles_total", language=language)
+                print(f"Přeskočen poškozený článek z NewsAPI ({language}): {type(error).__name__}")
                 continue
-                
-            processed.append(Document(
-                page_content=f"{art['title']}\n{art.get('description','')}",
-                metadata={
-                    "source": art['source']['name'],
-                    "date": art['publishedAt'],
-                    "url": art['url'],
-                    "language": language
-                }
-            ))
-        return processed
+            processed.append(doc)
+        return self._deduplicate(processed, stats)
+
+    def _deduplicate(self, docs, stats: dict = None):
+        """Ponechá z každého shluku téměř shodných článků jen prvního (nejrelevantnějšího)
+        a sloučí do něj zdroje a URL ostatních"""
+        if stats is None:
+            stats = {"articles": 0, "duplicates": 0, "saved_tokens": 0, "invalid": 0}
+        clusters = find_near_duplicates([doc.page_content for doc in docs])
+        unique_docs = []
+        for cluster in clusters:
+            representative = docs[cluster[0]]
+            duplicates = [docs[i] for i in cluster[1:]]
+            if duplicates:
+                sources = [representative.metadata["source"]] + [d.metadata["source"] for d in duplicates]
+                representative.metadata["source"] = ", ".join(dict.fromkeys(sources))
+                representative.metadata["urls"] = [representative.metadata["url"]] + [d.metadata["url"] for d in duplicates]
+            unique_docs.append(representative)
+
+            stats["duplicates"] += len(duplicates)
+            stats["saved_tokens"] += sum(count_tokens(d.page_content) for d in duplicates)
+
+        stats["articles"] += len(docs)
+        return unique_docs
 
     def _is_valid_source(self, url: str, language: str):
         """Validuje domény podle jazyka"""
@@ -105,37 +289,183 @@ class TechNewsRAG:
         domain = parsed_url.netloc.lower().replace("www.", "")
         return any(d in domain for d in domains.get(language, []))
 
-    def query(self, user_input: str):
-        """Zpracuje dotaz včetně obou jazykových verzí"""
-        self._refresh_data()
-        
-        if not self.vectorstore:
-            return "Nenalezeny žádné relevantní články v češtině ani angličtině.", []
+    def query(self, user_input: str, language: str = None, since=None):
+        """Zpracuje dotaz včetně obou jazykových verzí
 
-        # Získání relevantních dokumentů pomocí similarity_search
-        relevant_docs = self.vectorstore.similarity_search(user_input, k=10)
-        
-        if not relevant_docs:
-            return "Nenalezeny žádné relevantní články v češtině ani angličtině.", []
-        
-        context = self._build_context(relevant_docs)
-        answer = self._generate_answer(user_input, context)
-        
-        # Formátování výsledků pro zobrazení
-        results = {
-            "documents": [[doc.page_content for doc in relevant_docs]],
-            "metadatas": [[doc.metadata for doc in relevant_docs]],
-            "distances": [[0.0] * len(relevant_docs)]  
-        }
+        Parameters:
+        user_input (str): Dotaz v přirozeném jazyce
+        language (str): Omezení na články v jazyce "cs" nebo "en" (None = oba)
+        since: Omezení na články publikované od data (date/datetime/ISO řetězec)
+        """
+        # Cache odpovědí se zkouší nad dosavadním snímkem ještě před případnou
+        # aktualizací – opakovaný dotaz tak nečeká na stažení článků
+        snapshot = self._snapshot
+
+        # Embedding dotazu se spočítá jednou pro cache i pro vyhledávání;
+        # odpovědi s jinými filtry se v cache nesmí zaměnit
+        with metrics.timer("rag_embed_query"):
+            query_vector = self.embeddings.embed_query(user_input)
+        checked_version = None
+        if snapshot is not None:
+            checked_version = snapshot.index_version
+            cached = self.answer_cache.get(query_vector, self._cache_version(checked_version, language, since))
+            if cached is not None:
+                metrics.inc("rag_cache_hits_total")
+                return cached
+
+        if self._is_stale(snapshot):
+            snapshot = self._current_snapshot()
+            if snapshot.index_version != checked_version:
+                # Jiná sada článků – odpověď nad ní mohla do cache uložit jiná relace
+                cached = self.answer_cache.get(query_vector, self._cache_version(snapshot.index_version, language, since))
+                if cached is not None:
+                    metrics.inc("rag_cache_hits_total")
+                    return cached
+        metrics.inc("rag_cache_misses_total")
+
+        if not snapshot.vectorstore:
+            return NO_ARTICLES_ANSWER, []
+
+        # Získání relevantních dokumentů jen z oddílů odpovídajících filtrům
+        with metrics.timer("rag_search"):
+            scored_docs = snapshot.vectorstore.similarity_search_with_score(
+                user_input, k=10, language=language, since=since, vector=query_vector
+            )
+
+        if not scored_docs:
+            return NO_ARTICLES_ANSWER, []
+
+        context, tokens = pack_context(scored_docs, self.context_budget)
+        metrics.observe("rag_context_tokens", tokens)
+        with metrics.timer("rag_generate"):
+            answer = self._generate_answer(user_input, context)
         
+        results = self._format_results(scored_docs)
+        self.answer_cache.put(query_vector, self._cache_version(snapshot.index_version, language, since),
+                              (answer, results))
         return answer, results
 
-    def _build_context(self, docs):
-        """Vytvoří multijazyčný kontext z dokumentů"""
-        return "\n\n".join([
-            f"Jazyk: {doc.metadata['language']}\nČlánek: {doc.page_content}\nZdroj: {doc.metadata['source']}\nURL: {doc.metadata['url']}"
-            for doc in docs
-        ])
+    def query_many(self, questions, language: str = None, since=None, max_workers: int = DEFAULT_MAX_WORKERS):
+        """Zpracuje více dotazů najednou (např. pevnou sadu otázek ranního přehledu)
+
+        Všechny dotazy se zembeddují jedním voláním a nejdřív se zkusí cache
+        odpovědí. Data se (jsou-li zastaralá) aktualizují nejvýše jednou pro
+        celou dávku a zbylé dotazy se vyhledají jedním dávkovým vyhledáváním
+        ve FAISS. Články vrácené pro více dotazů se do kontextu formátují jen
+        jednou a stejné dotazy se zpracují jednou. Odpovědi se generují souběžně nejvýše
+        v max_workers vláknech (rychlost a souběh volání OpenAI dál hlídá
+        utils.outbound).
+
+        Parameters:
+        questions (list): Dotazy v přirozeném jazyce
+        language (str): Omezení na články v jazyce "cs" nebo "en" (None = oba)
+        since: Omezení na články publikované od data (date/datetime/ISO řetězec)
+        max_workers (int): Maximální počet souběžně generovaných odpovědí
+
+        Returns:
+        list: Pro každý dotaz (ve stejném pořadí) slovník s klíči question, answer,
+            results (stejné jako u query), cached, context_tokens a timings –
+            doby v sekundách: refresh, embed a search (společné pro dávku),
+            queue (čekání na volné vlákno), generate a total (od začátku dávky
+            po hotovou odpověď)
+        """
+        batch_start = time.perf_counter()
+        shared = {"refresh": 0.0, "embed": 0.0, "search": 0.0}
+        unique = list(dict.fromkeys(questions))
+        answers = {question: {"answer": NO_ARTICLES_ANSWER, "results": [], "cached": False,
+                              "context_tokens": 0, "queue": 0.0, "generate": 0.0, "total": 0.0}
+                   for question in unique}
+
+        # Stejně jako v query: cache se zkouší nad dosavadním snímkem, data se
+        # aktualizují jen pro dotazy, které v ní nejsou, a jen když jsou zastaralá
+        snapshot = self._snapshot
+        pending = []
+        if unique:
+            start = time.perf_counter()
+            with metrics.timer("rag_embed_query"):
+                vectors = embed_queries(self.embeddings, unique)
+            shared["embed"] = time.perf_counter() - start
+            pending = list(zip(unique, vectors))
+            if snapshot is not None:
+                pending = self._answer_from_cache(pending, answers, snapshot.index_version, language, since)
+
+        if pending and self._is_stale(snapshot):
+            start = time.perf_counter()
+            checked_version = snapshot.index_version if snapshot is not None else None
+            snapshot = self._current_snapshot()
+            shared["refresh"] = time.perf_counter() - start
+            if snapshot.index_version != checked_version:
+                pending = self._answer_from_cache(pending, answers, snapshot.index_version, language, since)
+        metrics.inc("rag_cache_misses_total", len(pending))
+
+        if pending and snapshot.vectorstore:
+            cache_version = self._cache_version(snapshot.index_version, language, since)
+            start = time.perf_counter()
+            with metrics.timer("rag_search"):
+                searched = snapshot.vectorstore.similarity_search_with_score_batch(
+                    [question for question, _ in pending], k=10, language=language, since=since,
+                    vectors=[vector for _, vector in pending]
+                )
+            shared["search"] = time.perf_counter() - start
+            formatted = {}
+            jobs = []
+            for (question, vector), scored_docs in zip(pending, searched):
+                if scored_docs:
+                    context, tokens = pack_context(scored_docs, self.context_budget, formatted=formatted)
+                    metrics.observe("rag_context_tokens", tokens)
+                    answers[question]["context_tokens"] = tokens
+                    jobs.append((question, vector, scored_docs, context))
+
+            def generate(question, context, submitted):
+                started = time.perf_counter()
+                with metrics.timer("rag_generate"):
+                    answer = self._generate_answer(question, context)
+                finished = time.perf_counter()
+                return answer, started - submitted, finished - started, finished - batch_start
+
+            if jobs:
+                with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+                    futures = [pool.submit(generate, question, context, time.perf_counter())
+                               for question, _, _, context in jobs]
+                    for (question, vector, scored_docs, _), future in zip(jobs, futures):
+                        answer, queue, generate_seconds, total = future.result()
+                        results = self._format_results(scored_docs)
+                        self.answer_cache.put(vector, cache_version, (answer, results))
+                        answers[question].update(answer=answer, results=results, queue=queue,
+                                                 generate=generate_seconds, total=total)
+
+        output = []
+        for question in questions:
+            item = answers[question]
+            if not item["total"]:
+                # Odpověď z cache nebo bez článků – hotová po společných krocích dávky
+                item["total"] = sum(shared.values())
+            timings = {**shared, "queue": item["queue"], "generate": item["generate"], "total": item["total"]}
+            output.append({"question": question, "answer": item["answer"], "results": item["results"],
+                           "cached": item["cached"], "context_tokens": item["context_tokens"], "timings": timings})
+        metrics.inc("rag_batch_questions_total", len(questions))
+        return output
+
+    def _answer_from_cache(self, pending, answers, index_version, language, since):
+        """Doplní do answers odpovědi z cache a vrátí dvojice (dotaz, vektor), které v ní nejsou"""
+        cache_version = self._cache_version(index_version, language, since)
+        missing = []
+        for question, vector in pending:
+            cached = self.answer_cache.get(vector, cache_version)
+            if cached is not None:
+                metrics.inc("rag_cache_hits_total")
+                answers[question].update(answer=cached[0], results=cached[1], cached=True)
+            else:
+                missing.append((question, vector))
+        return missing
+
+    def _format_results(self, scored_docs):
+        """Výsledky vyhledávání ve formátu pro zobrazení"""
+        return {
+            "documents": [[doc.page_content for doc, _ in scored_docs]],
+            "metadatas": [[doc.metadata for doc, _ in scored_docs]],
+            "distances": [[float(score) for _, score in scored_docs]]
+        }
 
     def _generate_answer(self, query: str, context: str):
         """Generuje univerzální odpověď"""
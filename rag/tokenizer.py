@@ -0,0 +1,55 @@
+import re
+import math
+from functools import lru_cache
+
+# Slova a samostatné interpunkční znaky pro přibližný odhad tokenů
+PIECE_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Načte BPE kódování cl100k_base (gpt-3.5-turbo), pokud je k dispozici lokálně"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Bez tiktoken nebo bez staženého BPE souboru se použije odhad
+        return None
+
+
+def tokenizer_name() -> str:
+    """Vrátí název použitého tokenizeru (cl100k_base, nebo odhad bez tiktoken)"""
+    return "cl100k_base" if _get_encoding() is not None else "odhad (4 znaky = 1 token)"
+
+
+def count_tokens(text: str) -> int:
+    """Spočítá tokeny textu
+
+    Používá tiktoken (cl100k_base); pokud není dostupný, odhadne počet tokenů
+    jako jeden token na každé 4 znaky slova plus jeden na interpunkci.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return sum(math.ceil(len(piece) / 4) for piece in PIECE_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Zkrátí text na nejvýše max_tokens tokenů (na hranici slova) a přidá výpustku"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        truncated = encoding.decode(encoding.encode(text)[:max_tokens])
+        truncated = truncated.rsplit(" ", 1)[0] if " " in truncated else truncated
+    else:
+        words, used = [], 0
+        for word in text.split():
+            used += count_tokens(word)
+            if used > max_tokens:
+                break
+            words.append(word)
+        truncated = " ".join(words)
+    return truncated.rstrip(" ,.;:") + "…"
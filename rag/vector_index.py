@@ -0,0 +1,302 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from rag.embeddings import embed_queries, partition_embeddings
+
+# Výchozí parametry jednotlivých typů indexu (build i search)
+INDEX_DEFAULTS = {
+    "flat": {},
+    "ivf": {"nlist": 1024, "nprobe": 16},
+    "hnsw": {"M": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 1024, "m": 16, "nbits": 8, "nprobe": 16},
+    "hnswpq": {"M": 32, "m": 16, "nbits": 8, "ef_construction": 200, "ef_search": 64},
+}
+
+
+def _factory_string(index_type: str, params: dict) -> str:
+    """Sestaví popis indexu pro faiss.index_factory"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{params['nlist']},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['M']}"
+    if index_type == "ivfpq":
+        return f"IVF{params['nlist']},PQ{params['m']}x{params['nbits']}"
+    if index_type == "hnswpq":
+        return f"HNSW{params['M']},PQ{params['m']}x{params['nbits']}"
+    raise ValueError(f"Neznámý typ indexu '{index_type}', povolené: {', '.join(INDEX_DEFAULTS)}")
+
+
+def _min_train_size(index_type: str, params: dict) -> int:
+    """Minimální počet vektorů, pod kterým nemá trénování indexu smysl"""
+    size = 0
+    if "nlist" in params:
+        size = max(size, 39 * params["nlist"])
+    if "nbits" in params:
+        size = max(size, 39 * 2 ** params["nbits"])
+    return size
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", max_train: int = 100_000, **params):
+    """Vytvoří, natrénuje a naplní FAISS index
+
+    Parameters:
+    vectors (np.ndarray): Matice vektorů (n x dim, float32)
+    index_type (str): flat, ivf, hnsw, ivfpq nebo hnswpq
+    max_train (int): Maximální počet (náhodně vybraných) vektorů pro trénování
+    params: Přepsání výchozích parametrů z INDEX_DEFAULTS
+
+    Pokud je vektorů méně, než index potřebuje k natrénování centroidů,
+    použije se přesný flat index (typicky pro pár stovek článků).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    params = {**INDEX_DEFAULTS.get(index_type, {}), **params}
+
+    if index_type != "flat" and len(vectors) < _min_train_size(index_type, params):
+        index_type, params = "flat", {}
+
+    index = faiss.index_factory(dim, _factory_string(index_type, params))
+    if "ef_construction" in params:
+        # efConstruction je nutné nastavit před přidáním vektorů do grafu
+        index.hnsw.efConstruction = params["ef_construction"]
+
+    if not index.is_trained:
+        train_vectors = vectors
+        if len(vectors) > max_train:
+            rng = np.random.default_rng(42)
+            train_vectors = vectors[np.sort(rng.choice(len(vectors), max_train, replace=False))]
+        index.train(train_vectors)
+    index.add(vectors)
+    set_search_params(index, **params)
+    return index
+
+
+def set_search_params(index, nprobe: int = None, ef_search: int = None, **_):
+    """Nastaví parametry vyhledávání (nprobe pro IVF, efSearch pro HNSW)"""
+    space = faiss.ParameterSpace()
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        space.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search is not None and hasattr(index, "hnsw"):
+        space.set_index_parameter(index, "efSearch", ef_search)
+
+
+def build_vectorstore(docs, embeddings, index_type: str = "flat", vectors=None, **params) -> FAISS:
+    """Náhrada za FAISS.from_documents s volitelným typem indexu
+
+    Vrací standardní LangChain FAISS úložiště, takže volání
+    similarity_search(query, k=10) zůstává beze změny. Předpočítané
+    vektory (vectors) se použijí místo nového volání embed_documents.
+    """
+    if vectors is None:
+        vectors = embeddings.embed_documents([doc.page_content for doc in docs])
+    vectors = np.asarray(vectors, dtype=np.float32)
+    index = build_index(vectors, index_type, **params)
+
+    ids = [str(i) for i in range(len(docs))]
+    docstore = InMemoryDocstore(dict(zip(ids, docs)))
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(ids))
+    )
+
+
+def _to_date(value) -> date:
+    """Převede datum článku (ISO řetězec z NewsAPI), datetime nebo date na date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+
+
+class _Partition:
+    """Jeden oddíl úložiště: FAISS index, jeho články, vektory a embeddingy
+
+    Oddíl se po vytvoření nemění – přidání článků vytvoří nový oddíl, takže
+    dotaz, který právě prohledává starší verzi úložiště, vidí konzistentní stav.
+    """
+
+    def __init__(self, docs, vectors, embeddings, index_type, index_params):
+        self.docs = docs
+        self.vectors = vectors
+        self.embeddings = embeddings
+        self.dates = np.array([_to_date(doc.metadata["date"]) for doc in docs], dtype="datetime64[D]")
+        self.store = build_vectorstore(docs, embeddings, index_type, vectors=vectors, **index_params)
+
+    def older_than(self, since) -> int:
+        """Počet článků oddílu publikovaných před datem since"""
+        return int(np.count_nonzero(self.dates < np.datetime64(since, "D")))
+
+
+class PartitionedVectorStore:
+    """Vektorové úložiště rozdělené na oddíly podle jazyka a týdne publikace
+
+    Každý oddíl (jazyk, pondělí týdne) má vlastní FAISS index. Dotaz s filtrem
+    jazyka nebo data prohledá jen odpovídající oddíly a staré týdny lze
+    zahodit smazáním celého oddílu bez přestavby ostatních.
+
+    Úložiště se mezi aktualizacemi zachovává: copy() vrátí nové úložiště se
+    stejnými (neměnnými) oddíly a add_documents přestaví jen oddíly, do
+    kterých přibyly články. U lokálního backendu "hashing" má každý oddíl
+    vlastní IDF naučené ze všech svých článků a dotaz se pro každý oddíl
+    embedduje s jeho vahami.
+    """
+
+    def __init__(self, embeddings, index_type: str = "flat", **index_params):
+        self.embeddings = embeddings
+        self.index_type = index_type
+        self.index_params = index_params
+        self.partitions = {}  # (jazyk, začátek týdne) -> _Partition
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def copy(self):
+        """Nové úložiště se stejnými oddíly; změny kopie se originálu nedotknou"""
+        store = PartitionedVectorStore(self.embeddings, self.index_type, **self.index_params)
+        store.partitions = dict(self.partitions)
+        return store
+
+    def urls(self) -> set:
+        """URL všech článků v úložišti"""
+        return {doc.metadata["url"] for partition in self.partitions.values() for doc in partition.docs}
+
+    @staticmethod
+    def bucket_start(value) -> date:
+        """Začátek (pondělí) týdne, do kterého datum patří"""
+        day = _to_date(value)
+        return day - timedelta(days=day.weekday())
+
+    def add_documents(self, docs):
+        """Přidá články a přestaví jen oddíly, do kterých přibyly
+
+        Backend s pevnými vektory (OpenAI) zembedduje jen nové články jedným
+        voláním a vektory dosavadních článků oddílu použije znovu. Backend,
+        který se učí váhy z dokumentů ("hashing"), naučí IDF oddílu znovu ze
+        všech jeho článků, takže vektory v jednom oddílu vždy pochází ze
+        stejných vah.
+
+        Returns:
+        int: Počet oddílů, které se přestavěly
+        """
+        if not docs:
+            return 0
+        groups = defaultdict(list)
+        for i, doc in enumerate(docs):
+            groups[(doc.metadata["language"], self.bucket_start(doc.metadata["date"]))].append(i)
+
+        shared_vectors = None
+        for key, indices in groups.items():
+            previous = self.partitions.get(key)
+            partition_docs = (previous.docs if previous else []) + [docs[i] for i in indices]
+            embeddings = partition_embeddings(self.embeddings)
+            if embeddings is self.embeddings:
+                if shared_vectors is None:
+                    shared_vectors = np.asarray(
+                        self.embeddings.embed_documents([doc.page_content for doc in docs]), dtype=np.float32
+                    )
+                vectors = shared_vectors[indices]
+                if previous is not None:
+                    vectors = np.vstack([previous.vectors, vectors])
+            else:
+                vectors = np.asarray(
+                    embeddings.embed_documents([doc.page_content for doc in partition_docs]), dtype=np.float32
+                )
+            self.partitions[key] = _Partition(partition_docs, vectors, embeddings, self.index_type, self.index_params)
+        return len(groups)
+
+    def drop_before(self, cutoff) -> int:
+        """Smaže oddíly, jejichž celý týden leží před datem cutoff; vrací počet smazaných"""
+        cutoff = _to_date(cutoff)
+        expired = [key for key in self.partitions if key[1] + timedelta(days=7) <= cutoff]
+        for key in expired:
+            del self.partitions[key]
+        return len(expired)
+
+    def _select(self, language: str = None, since: date = None):
+        """Oddíly odpovídající filtrům jazyka a data"""
+        return [
+            partition for (lang, start), partition in self.partitions.items()
+            if (language is None or lang == language)
+            and (since is None or start + timedelta(days=7) > since)
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 10, language: str = None, since=None, vector=None):
+        """Vyhledá k nejbližších článků jen v oddílech odpovídajících filtrům
+
+        Parameters:
+        query (str): Dotaz
+        k (int): Počet vrácených článků
+        language (str): "cs", "en" nebo None pro všechny jazyky
+        since: Datum (date/datetime/ISO řetězec), od kterého se články hledají
+        vector (list): Už spočítaný embedding dotazu sdílenými embeddingy (volitelně)
+
+        Returns:
+        list: Dvojice (Document, vzdálenost)
+        """
+        vectors = None if vector is None else [vector]
+        return self.similarity_search_with_score_batch([query], k, language, since, vectors)[0]
+
+    def similarity_search_with_score_batch(self, queries, k: int = 10, language: str = None, since=None,
+                                           vectors=None):
+        """Vyhledá k nejbližších článků pro více dotazů najednou
+
+        Každý vybraný oddíl se prohledá jedním voláním FAISS pro celou matici
+        dotazů místo jednoho volání na dotaz. Výsledek pro každý dotaz je
+        stejný jako u similarity_search_with_score. Oddíl na hraně intervalu
+        since obsahuje i starší články – hledá se v něm o jejich počet víc
+        výsledků, aby po jejich vyřazení zbylo k platných.
+
+        Parameters:
+        queries (list): Dotazy
+        k (int): Počet vrácených článků pro každý dotaz
+        language (str): "cs", "en" nebo None pro všechny jazyky
+        since: Datum (date/datetime/ISO řetězec), od kterého se články hledají
+        vectors (list): Embeddingy dotazů sdílenými embeddingy, pokud už jsou
+            spočítané (např. pro cache odpovědí); oddíly s vlastními vahami
+            embeddují dotazy samy
+
+        Returns:
+        list: Pro každý dotaz seznam dvojic (Document, vzdálenost)
+        """
+        since = _to_date(since) if since is not None else None
+        results = [[] for _ in range(len(queries))]
+        if not len(queries):
+            return results
+
+        query_vectors = {}  # id(embeddings) -> matice dotazů
+        if vectors is not None:
+            query_vectors[id(self.embeddings)] = np.asarray(vectors, dtype=np.float32).reshape(len(queries), -1)
+
+        for partition in self._select(language, since):
+            key = id(partition.embeddings)
+            if key not in query_vectors:
+                query_vectors[key] = np.asarray(
+                    embed_queries(partition.embeddings, list(queries)), dtype=np.float32
+                ).reshape(len(queries), -1)
+            skipped = partition.older_than(since) if since is not None else 0
+            store = partition.store
+            scores, indices = store.index.search(query_vectors[key], min(k + skipped, store.index.ntotal))
+            for query_results, query_scores, query_indices in zip(results, scores, indices):
+                for score, i in zip(query_scores, query_indices):
+                    if i == -1:
+                        # Oddíl má méně než k článků
+                        continue
+                    doc = store.docstore.search(store.index_to_docstore_id[i])
+                    if skipped and _to_date(doc.metadata["date"]) < since:
+                        continue
+                    query_results.append((doc, score))
+        return [sorted(query_results, key=lambda pair: pair[1])[:k] for query_results in results]
+
+    def similarity_search(self, query: str, k: int = 10, language: str = None, since=None):
+        """Stejné rozhraní jako FAISS.similarity_search, navíc s filtry jazyka a data"""
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, language, since)]
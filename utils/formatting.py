@@ -0,0 +1,173 @@
+"""
+Vektorizované české formátování čísel, částek, procent a měsíců.
+
+Funkce pracují nad celým sloupcem najednou (NumPy string ufunc), místo
+Series.apply s Python funkcí pro každý řádek. Přijímají Series, pole
+i jednotlivou hodnotu: Series vrací jako Series se stejným indexem,
+skalár jako str. Výstup odpovídá dřívějšímu řádkovému formátování:
+    format_czk(30336677)        -> "30 336 677,- Kč"
+    format_count(12)            -> "12 ks"
+    format_percent(12.3)        -> "12.3 %"
+    format_decimal(4.25, 1)     -> "4.2 dní" (se suffix=" dní")
+    month_label("2024-03")      -> "Březen 2024"
+"""
+
+import numpy as np
+import pandas as pd
+
+CZECH_MONTH_NAMES = np.array([
+    'Leden', 'Únor', 'Březen', 'Duben', 'Květen', 'Červen',
+    'Červenec', 'Srpen', 'Září', 'Říjen', 'Listopad', 'Prosinec'
+])
+
+THOUSANDS_SEPARATOR = " "
+
+
+def _wrap(values, result):
+    """Vrátí výsledek ve stejném tvaru jako vstup (Series, pole nebo str)"""
+    if isinstance(values, pd.Series):
+        return pd.Series(result.astype(object), index=values.index, name=values.name)
+    if np.ndim(values) == 0:
+        return str(result[0])
+    return result
+
+
+def _render_digits(absolute, decimals=0, separator=None):
+    """Sestaví text nezáporných celých čísel s oddělovačem tisíců a desetinnou tečkou
+
+    Číslice se počítají po řádech nad celým polem (zbytek po dělení 10)
+    a zapisují se zprava do matice kódů Unicode vyplněné mezerami; oddělovače
+    a tečka mají v každém řádku stejnou pozici. Matice se přečte jako pole
+    řetězců a úvodní mezery se odříznou – bez práce po prvcích.
+
+    Parameters:
+    absolute (ndarray): Nezáporná celá čísla (u desetinných čísel už vynásobená 10**decimals)
+    decimals (int): Počet desetinných míst (před ně se vloží tečka)
+    separator (str): Oddělovač tisíců v celé části (None = bez oddělovače)
+
+    Returns:
+    ndarray: Pole řetězců
+    """
+    # Alespoň jedna číslice před tečkou (5 se dvěma desetinnými místy -> "0.05")
+    digits = max(len(str(int(absolute.max(initial=0)))), decimals + 1)
+    integer_digits = digits - decimals
+    width = digits + (1 if decimals else 0) + ((integer_digits - 1) // 3 if separator else 0)
+    output = np.full((absolute.size, width), ord(" "), dtype=np.uint32)
+
+    remaining = absolute.ravel().copy()
+    column = width - 1
+    for k in range(digits):
+        if decimals and k == decimals:
+            output[:, column] = ord(".")
+            column -= 1
+        if separator and k > decimals and (k - decimals) % 3 == 0:
+            # Oddělovač jen tam, kde ještě zbývají číslice celé části
+            output[:, column] = np.where(remaining > 0, ord(separator), ord(" "))
+            column -= 1
+        present = remaining > 0 if k > decimals else True
+        output[:, column] = np.where(present, remaining % 10 + ord("0"), ord(" "))
+        remaining //= 10
+        column -= 1
+    text = output.view(f"U{width}").reshape(absolute.shape)
+    return np.strings.lstrip(text, " ")
+
+
+def group_thousands(values):
+    """Celá čísla jako text s mezerou mezi tisíci (1234567 -> "1 234 567")
+
+    Parameters:
+    values: Celá čísla (Series, pole nebo skalár)
+
+    Returns:
+    ndarray: Pole řetězců
+    """
+    numbers = np.atleast_1d(np.asarray(values, dtype=np.int64))
+    text = _render_digits(np.abs(numbers), separator=THOUSANDS_SEPARATOR)
+    return np.where(numbers < 0, np.strings.add("-", text), text)
+
+
+def format_czk(values):
+    """Částky zaokrouhlené na koruny v českém formátu ("30 336 677,- Kč")"""
+    rounded = np.rint(np.atleast_1d(np.asarray(values, dtype=np.float64)))
+    return _wrap(values, np.strings.add(group_thousands(rounded), ",- Kč"))
+
+
+def format_count(values, suffix=" ks"):
+    """Počty s jednotkou ("12 ks")"""
+    numbers = np.atleast_1d(np.asarray(values, dtype=np.int64))
+    return _wrap(values, np.strings.add(numbers.astype(str), suffix))
+
+
+def _format_fixed(numbers, decimals):
+    """Čísla s pevným počtem desetinných míst; vrací (text, hodnoty těsně u poloviny)"""
+    missing = ~np.isfinite(numbers)
+    shifted = np.abs(np.where(missing, 0, numbers)) * 10 ** decimals
+    text = _render_digits(np.rint(shifted).astype(np.int64), decimals=decimals)
+    text = np.where(np.signbit(numbers) & ~missing, np.strings.add("-", text), text)
+    text = np.where(missing, "nan", text)
+    near_half = np.abs(shifted - np.floor(shifted) - 0.5) <= 1e-9 * np.maximum(shifted, 1)
+    return text, near_half
+
+
+def format_percent(values, suffix=" %"):
+    """Procenta zaokrouhlená na 1 desetinné místo s jednotkou ("12.3 %")
+
+    Hodnoty s více desetinnými místy se vypíšou celé jako dřív ("12.34 %").
+    """
+    numbers = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    if numbers.size == 0:
+        return _wrap(values, np.array([], dtype=str))
+    text, _ = _format_fixed(numbers, 1)
+    irregular = (np.round(numbers, 1) != numbers) & np.isfinite(numbers)
+    if irregular.any():
+        text = text.astype(object)
+        text[irregular] = numbers[irregular].astype(str)
+    return _wrap(values, np.strings.add(text.astype(str), suffix))
+
+
+def format_decimal(values, decimals=1, suffix=""):
+    """Čísla s pevným počtem desetinných míst ("4.2 dní"); chybějící hodnota je "nan"
+
+    Zaokrouhluje se celočíselnou aritmetikou nad celým polem. Hodnoty těsně
+    u poloviny (kde by se násobení a zaokrouhlení mohlo lišit od f"{v:.1f}")
+    se formátují po jedné, takže výstup je vždy stejný jako u f-řetězce.
+    """
+    numbers = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    if numbers.size == 0:
+        return _wrap(values, np.array([], dtype=str))
+    text, near_half = _format_fixed(numbers, decimals)
+    if near_half.any():
+        text = text.astype(object)
+        text[near_half] = [f"{value:.{decimals}f}" for value in numbers[near_half]]
+    return _wrap(values, np.strings.add(text.astype(str), suffix))
+
+
+def month_label(months):
+    """Měsíce jako "Březen 2024"
+
+    Parameters:
+    months: Měsíce jako Period, datum nebo text "YYYY-MM"
+    """
+    series = months if isinstance(months, pd.Series) else pd.Series(np.atleast_1d(months))
+    if isinstance(series.dtype, pd.PeriodDtype):
+        year, month = series.dt.year, series.dt.month
+    else:
+        dates = series if pd.api.types.is_datetime64_any_dtype(series) else pd.to_datetime(
+            series.astype(str), format="%Y-%m"
+        )
+        year, month = dates.dt.year, dates.dt.month
+    labels = np.strings.add(
+        np.strings.add(CZECH_MONTH_NAMES[month.to_numpy() - 1], " "), year.to_numpy().astype(str)
+    )
+    return _wrap(months, labels)
+
+
+def month_order(labels):
+    """Seřadí unikátní popisky měsíců ("Březen 2024") chronologicky – kategorie pro řazení"""
+    unique = pd.unique(pd.Series(labels, dtype=object))
+    if len(unique) == 0:
+        return []
+    name, _, year = np.strings.rpartition(unique.astype(str), " ")
+    month = pd.Series(name).map({value: i for i, value in enumerate(CZECH_MONTH_NAMES)}).to_numpy()
+    order = np.lexsort((month, year.astype(np.int64)))
+    return list(unique[order])
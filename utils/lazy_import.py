@@ -0,0 +1,21 @@
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    """Vrátí modul, který se skutečně načte až při prvním přístupu k jeho atributu
+
+    Hodí se pro těžké knihovny (plotly, openai), které modul potřebuje jen
+    v některých funkcích – samotný import modulu pak startuje rychle.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"Modul '{name}' nebyl nalezen", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
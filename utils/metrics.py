@@ -0,0 +1,209 @@
+"""
+Lehká instrumentace pipeline – časovače, čítače a histogramy.
+
+Metriky se sbírají do globálního registru `metrics` a exportují do JSON
+nebo do textového formátu Prometheus. Příklad:
+
+    from utils.metrics import metrics
+
+    with metrics.timer("pdf_extract"):
+        ...
+    metrics.inc("invoices_extracted_total")
+    metrics.export("metriky.prom")
+"""
+
+import json
+import time
+import bisect
+import cProfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+# Hranice histogramů v sekundách (pokrývají parsování textu i volání LLM)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Kumulativní histogram hodnot s pevnými hranicemi (jako v Prometheus)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # poslední = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def cumulative(self):
+        """Vrátí dvojice (hranice, počet hodnot <= hranice) včetně +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): total for bound, total in self.cumulative()},
+        }
+
+
+class MetricsRegistry:
+    """Registr čítačů a histogramů rozlišených podle názvu a štítků (labels)"""
+
+    def __init__(self, namespace: str = "findoc"):
+        self.namespace = namespace
+        self._counters = {}    # (název, štítky) -> hodnota
+        self._histograms = {}  # (název, štítky) -> Histogram
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Zvýší čítač (název by měl končit na _total)"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Zaznamená hodnotu do histogramu"""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Změří dobu běhu bloku do histogramu <name>_seconds
+
+        Pokud blok skončí výjimkou, zvýší se navíc čítač <name>_errors_total.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """Vrátí aktuální stav metrik jako slovník vhodný pro JSON"""
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ],
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """Vrátí metriky v textovém formátu Prometheus (exposition format 0.0.4)"""
+        def format_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (
+                key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+                for key, value in pairs
+            )
+            return "{" + ",".join(escaped) + "}"
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                full_name = f"{self.namespace}_{name}"
+                if full_name not in seen:
+                    lines.append(f"# TYPE {full_name} counter")
+                    seen.add(full_name)
+                lines.append(f"{full_name}{format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                full_name = f"{self.namespace}_{name}"
+                if full_name not in seen:
+                    lines.append(f"# TYPE {full_name} histogram")
+                    seen.add(full_name)
+                for bound, total in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{full_name}_bucket{format_labels(labels, [('le', le)])} {total}")
+                lines.append(f"{full_name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{full_name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Uloží metriky do souboru – .prom/.txt ve formátu Prometheus, jinak JSON"""
+        path = Path(path)
+        content = self.to_prometheus() if path.suffix in (".prom", ".txt") else self.to_json()
+        path.write_text(content, encoding="utf-8")
+
+
+# Globální registr sdílený celou aplikací
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def profiled(path=None):
+    """Profiluje blok pomocí cProfile a uloží výsledek do path (bez path nedělá nic)
+
+    Výsledek jde prohlédnout např. `python -m pstats soubor.prof` nebo snakeviz.
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"Profil uložen do {path}")
+
+
+def add_instrumentation_arguments(parser):
+    """Přidá do argparse parseru volby --profile a --metrics"""
+    parser.add_argument('--profile', type=str, default=None,
+                        help='Uloží cProfile profil běhu do zadaného souboru (např. beh.prof)')
+    parser.add_argument('--metrics', type=str, default=None,
+                        help='Uloží metriky do souboru – .prom pro Prometheus, jinak JSON')
+
+
+@contextmanager
+def instrumented(args):
+    """Spustí blok s profilováním a na konci exportuje metriky podle voleb CLI"""
+    try:
+        with profiled(getattr(args, "profile", None)):
+            yield
+    finally:
+        if getattr(args, "metrics", None):
+            metrics.export(args.metrics)
+            print(f"Metriky uloženy do {args.metrics}")
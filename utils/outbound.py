@@ -0,0 +1,268 @@
+"""
+Sdílená vrstva pro odchozí volání externích API (OpenAI, NewsAPI).
+
+Každý poskytovatel má jeden sdílený klient s:
+- poolem spojení (spojení se znovu používají mezi dotazy i vlákny Streamlitu),
+- opakováním při 429 a 5xx (a chybách spojení) s exponenciálním čekáním
+  s náhodným rozptylem; hlavička Retry-After má přednost,
+- volitelným omezením rychlosti token bucket (požadavků za sekundu + krátký
+  burst) a limitem souběžných požadavků – zapínají se v OUTBOUND_LIMITS
+  v config.py. Skutečné limity poskytovatele závisí na účtu a modelu,
+  výchozí stav proto nic neškrtí a přetížení řeší opakování s Retry-After.
+
+Do metrik se zapisuje doba čekání ve frontě (outbound_queue_seconds), doba
+požadavků, počty požadavků podle stavového kódu a počty opakování.
+
+Použití:
+    from utils.outbound import get_provider, openai_client
+
+    response = get_provider("newsapi").get(url, params=params)
+    client = openai_client(api_key)   # OpenAI SDK nad sdíleným klientem
+"""
+
+import time
+import random
+import threading
+from functools import lru_cache
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+from utils.metrics import metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Výchozí nastavení poskytovatelů bez omezení rychlosti a souběhu; limity se
+# zapínají přes OUTBOUND_LIMITS v config.py, např.
+# {"openai": {"rate": 5, "burst": 10, "max_concurrency": 8}}
+DEFAULT_LIMITS = {
+    "openai": {},
+    "newsapi": {"max_retries": 3},
+}
+
+# Velikost poolu spojení poskytovatele bez limitu souběžných požadavků
+DEFAULT_POOL_SIZE = 16
+
+try:
+    import config
+except ImportError:
+    config = None
+
+
+class TokenBucket:
+    """Omezení rychlosti: rate tokenů za sekundu, nejvýše burst najednou"""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Počká na volný token a vrátí dobu čekání v sekundách"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _retry_after_seconds(value):
+    """Převede hlavičku Retry-After (sekundy nebo HTTP datum) na sekundy"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class ProviderClient:
+    """Sdílený klient jednoho poskytovatele s limitem rychlosti, souběhu a opakováním"""
+
+    def __init__(self, name, rate=None, burst=None, max_concurrency=None, max_retries=5,
+                 base_delay=0.5, max_delay=30.0, timeout=30.0):
+        """
+        Parameters:
+        name (str): Název poskytovatele (štítek metrik)
+        rate (float): Povolený počet požadavků za sekundu (None = bez omezení)
+        burst (int): Počet požadavků, které mohou odejít najednou (výchozí: rate)
+        max_concurrency (int): Maximální počet souběžných požadavků (None = bez omezení)
+        max_retries (int): Počet opakování při 429/5xx a chybách spojení
+        base_delay (float): Základ exponenciálního čekání v sekundách
+        max_delay (float): Horní mez čekání mezi pokusy v sekundách
+        timeout (float): Timeout jednoho požadavku v sekundách
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate, burst or max(1, int(rate))) if rate else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.pool_size = max_concurrency or DEFAULT_POOL_SIZE
+        self._session = None
+        self._httpx_client = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _slot(self):
+        """Počká na volné místo (souběh) a token (rychlost), jsou-li zapnuté, a změří čekání ve frontě"""
+        start = time.perf_counter()
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            metrics.observe("outbound_queue_seconds", time.perf_counter() - start, provider=self.name)
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    def backoff(self, attempt, retry_after=None):
+        """Doba čekání před dalším pokusem – full jitter, nebo Retry-After od serveru"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def execute(self, send, status_of, retry_after_of=lambda response: None, close=lambda response: None,
+                connection_errors=()):
+        """Odešle požadavek funkcí send a podle potřeby ho zopakuje
+
+        Parameters:
+        send: Funkce bez parametrů, která odešle požadavek a vrátí odpověď
+        status_of: Funkce vracející stavový kód odpovědi
+        retry_after_of: Funkce vracející hodnotu hlavičky Retry-After
+        close: Funkce, která uvolní odpověď před opakováním
+        connection_errors (tuple): Výjimky spojení, které se také opakují
+
+        Returns:
+        Odpověď posledního pokusu (i neúspěšná, pokud došly pokusy)
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._slot(), metrics.timer("outbound_request", provider=self.name):
+                    response = send()
+            except connection_errors as error:
+                metrics.inc("outbound_requests_total", provider=self.name, status="error")
+                if attempt == self.max_retries:
+                    metrics.inc("outbound_failures_total", provider=self.name)
+                    raise
+                metrics.inc("outbound_retries_total", provider=self.name, reason=type(error).__name__)
+                time.sleep(self.backoff(attempt))
+                continue
+
+            status = status_of(response)
+            metrics.inc("outbound_requests_total", provider=self.name, status=status)
+            if status not in RETRY_STATUSES:
+                return response
+            if attempt == self.max_retries:
+                metrics.inc("outbound_failures_total", provider=self.name)
+                return response
+            metrics.inc("outbound_retries_total", provider=self.name, reason=status)
+            delay = self.backoff(attempt, _retry_after_seconds(retry_after_of(response)))
+            close(response)
+            time.sleep(delay)
+
+    @property
+    def session(self):
+        """requests.Session s poolem spojení (pro REST API jako NewsAPI)"""
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def request(self, method, url, **kwargs):
+        """HTTP požadavek přes sdílenou session s limity a opakováním"""
+        import requests
+
+        kwargs.setdefault("timeout", self.timeout)
+        return self.execute(
+            lambda: self.session.request(method, url, **kwargs),
+            status_of=lambda response: response.status_code,
+            retry_after_of=lambda response: response.headers.get("Retry-After"),
+            close=lambda response: response.close(),
+            connection_errors=(requests.ConnectionError, requests.Timeout),
+        )
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def httpx_client(self):
+        """httpx.Client, jehož požadavky procházejí limity a opakováním (pro OpenAI SDK a LangChain)"""
+        with self._lock:
+            if self._httpx_client is None:
+                import httpx
+
+                self._httpx_client = httpx.Client(
+                    transport=_limited_transport(self, httpx.HTTPTransport(
+                        limits=httpx.Limits(max_connections=self.pool_size,
+                                            max_keepalive_connections=self.pool_size)
+                    )),
+                    timeout=self.timeout,
+                )
+            return self._httpx_client
+
+
+def _limited_transport(provider, transport):
+    """Obalí httpx transport tak, že požadavky procházejí ProviderClient.execute"""
+    import httpx
+
+    class LimitedTransport(httpx.BaseTransport):
+        def handle_request(self, request):
+            return provider.execute(
+                lambda: transport.handle_request(request),
+                status_of=lambda response: response.status_code,
+                retry_after_of=lambda response: response.headers.get("Retry-After"),
+                close=lambda response: response.close(),
+                connection_errors=(httpx.TransportError,),
+            )
+
+        def close(self):
+            transport.close()
+
+    return LimitedTransport()
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    """Vrátí sdílený klient poskytovatele (vytvoří ho při prvním použití)"""
+    with _providers_lock:
+        if name not in _providers:
+            limits = {**DEFAULT_LIMITS.get(name, {}), **getattr(config, "OUTBOUND_LIMITS", {}).get(name, {})}
+            _providers[name] = ProviderClient(name, **limits)
+        return _providers[name]
+
+
+def openai_http_kwargs():
+    """Parametry pro OpenAI SDK / LangChain: sdílený httpx klient, opakování řeší tato vrstva"""
+    return {"http_client": get_provider("openai").httpx_client(), "max_retries": 0}
+
+
+@lru_cache(maxsize=8)
+def openai_client(api_key):
+    """OpenAI klient pro daný API klíč nad sdíleným, limitovaným spojením"""
+    import openai
+    return openai.OpenAI(api_key=api_key, **openai_http_kwargs())
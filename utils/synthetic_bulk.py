@@ -0,0 +1,266 @@
+"""
+Vektorizovaný generátor velkých objemů syntetických faktur pro zátěžové testy.
+
+Na rozdíl od utils.synthetic_data negeneruje faktury po řádcích – částky,
+data, zpoždění, kategorie i anomálie se losují jako NumPy pole najednou
+a texty (popisy položek) se vybírají z předem vygenerovaných zásob.
+Schéma a podíl anomálií (cca 9 %) odpovídají utils/synthetic_project_data.csv,
+výstup se zapisuje po blocích do Parquet nebo CSV.
+
+Spuštění (z kořenového adresáře projektu):
+python -m utils.synthetic_bulk --n 10000000 --output faktury.parquet
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from faker import Faker
+
+from utils.synthetic_data import (
+    ANOMALY_RATE, ANOMALY_TYPES, CATEGORIES, COLUMNS, INCOME_SHARE, OWN_COMPANY, create_firm_info
+)
+
+# Velikost zásob předgenerovaných textů
+PHRASE_POOL_SIZE = 1024
+ITEMS_POOL_SIZE = 4096
+
+# Počty položek běžné faktury a anomálie "Unusual Number of Items"
+ITEM_COUNTS = range(1, 6)
+UNUSUAL_ITEM_COUNTS = range(15, 21)
+
+
+def build_pools(seed=None):
+    """Předgeneruje firemní údaje, fráze položek a spojené seznamy položek
+
+    Faker se volá jen při přípravě zásob, samotné generování faktur už
+    pracuje pouze s indexy do těchto polí.
+    """
+    faker = Faker("cs_CZ")
+    faker.seed_instance(seed)
+    rng = np.random.default_rng(seed)
+
+    # Pořadí kategorií: nejdřív výdajové, pak příjmové; firmy v pořadí kategorií
+    category_type = []
+    category_names = []
+    category_companies = []
+    for transaction_type, categories in CATEGORIES.items():
+        for category, companies in categories.items():
+            category_type.append(transaction_type)
+            category_names.append(category)
+            category_companies.append(companies)
+    companies = [company for group in category_companies for company in group] + [OWN_COMPANY]
+
+    firm_info = create_firm_info(faker)
+    phrases = np.array([faker.bs() for _ in range(PHRASE_POOL_SIZE)], dtype=object)
+
+    def join_pool(count):
+        picks = rng.integers(0, PHRASE_POOL_SIZE, size=(ITEMS_POOL_SIZE, count))
+        return np.array(['; '.join(row) for row in phrases[picks]], dtype=object)
+
+    return {
+        "category_names": np.array(category_names, dtype=object),
+        "category_is_income": np.array([t == 'Příjmy' for t in category_type]),
+        "category_sizes": np.array([len(group) for group in category_companies]),
+        "category_offsets": np.cumsum([0] + [len(group) for group in category_companies[:-1]]),
+        "companies": np.array(companies, dtype=object),
+        "ico": np.array([firm_info[c]['ico'] for c in companies], dtype=np.int64),
+        "dic": np.array([firm_info[c]['dic'] for c in companies], dtype=object),
+        "account": np.array([firm_info[c]['account'] for c in companies], dtype=object),
+        "phrases": phrases.astype(str),
+        "items": {count: join_pool(count) for count in list(ITEM_COUNTS) + list(UNUSUAL_ITEM_COUNTS)},
+    }
+
+
+def _pick_items(rng, counts, pools):
+    """Vybere pro každý řádek seznam položek ze zásoby odpovídající počtu položek"""
+    items = np.empty(len(counts), dtype=object)
+    for count in np.unique(counts):
+        rows = np.flatnonzero(counts == count)
+        items[rows] = pools["items"][count][rng.integers(0, ITEMS_POOL_SIZE, size=len(rows))]
+    return items
+
+
+def _items_with_amounts(rng, size, pools):
+    """Vygeneruje položky s částkou v závorce pro anomálii 'Items Total Mismatch'
+
+    Returns:
+    tuple: (texty položek, součet částek položek)
+    """
+    max_count = ITEM_COUNTS[-1]
+    counts = rng.integers(ITEM_COUNTS[0], max_count + 1, size=size)
+    amounts = np.round(rng.uniform(100, 10000, size=(size, max_count)), 2)
+    amounts[np.arange(max_count) >= counts[:, None]] = 0
+    pieces = np.char.add(
+        np.char.add(pools["phrases"][rng.integers(0, PHRASE_POOL_SIZE, size=(size, max_count))], " ("),
+        np.char.add(np.char.mod("%.2f", amounts), " CZK)")
+    )
+    items = pieces[:, 0]
+    for column in range(1, max_count):
+        joined = np.char.add(np.char.add(items, "; "), pieces[:, column])
+        items = np.where(counts > column, joined, items)
+    return items.astype(object), amounts.sum(axis=1)
+
+
+def generate_invoice_chunk(n, rng, pools, year=2024, start_id=1):
+    """Vygeneruje blok n faktur jako DataFrame se schématem synthetic_project_data.csv
+
+    Parameters:
+    n (int): Počet faktur v bloku
+    rng (np.random.Generator): Zdroj náhody
+    pools (dict): Zásoby z build_pools
+    year (int): Rok vystavení faktur
+    start_id (int): Pořadové číslo první faktury v bloku
+    """
+    # Kategorie a firma: příjem 60 %, kategorie i firma v ní rovnoměrně
+    is_income = rng.random(n) < INCOME_SHARE
+    income_categories = np.flatnonzero(pools["category_is_income"])
+    expense_categories = np.flatnonzero(~pools["category_is_income"])
+    category = np.where(
+        is_income,
+        income_categories[rng.integers(0, len(income_categories), size=n)],
+        expense_categories[rng.integers(0, len(expense_categories), size=n)],
+    )
+    company = pools["category_offsets"][category] + (rng.random(n) * pools["category_sizes"][category]).astype(np.int64)
+    own = len(pools["companies"]) - 1
+    supplier = np.where(is_income, own, company)
+    customer = np.where(is_income, company, own)
+
+    # Data
+    year_start = np.datetime64(f"{year}-01-01")
+    days_in_year = (np.datetime64(f"{year + 1}-01-01") - year_start).astype(np.int64)
+    invoice_date = year_start + rng.integers(0, days_in_year, size=n).astype("timedelta64[D]")
+    due_date = invoice_date + rng.integers(7, 31, size=n).astype("timedelta64[D]")
+    # Zpoždění: polovina faktur v termínu, zbytek 1-90 dní
+    delay = np.where(rng.random(n) < 0.5, 0, rng.integers(1, 91, size=n))
+    payment_date = due_date + delay.astype("timedelta64[D]")
+
+    total_amount = np.round(rng.uniform(500, 500000, size=n), 2)
+    items = _pick_items(rng, rng.integers(ITEM_COUNTS[0], ITEM_COUNTS[-1] + 1, size=n), pools)
+    note_category = category.copy()
+
+    # Anomálie
+    is_anomaly = rng.random(n) < ANOMALY_RATE
+    anomaly_names = np.array(list(ANOMALY_TYPES), dtype=object)
+    anomaly_code = np.full(n, -1)
+    anomaly_code[is_anomaly] = rng.choice(len(anomaly_names), size=int(is_anomaly.sum()), p=list(ANOMALY_TYPES.values()))
+
+    rows = np.flatnonzero(anomaly_code == 0)  # Items Total Mismatch + Unusual Due Date
+    items[rows], items_total = _items_with_amounts(rng, len(rows), pools)
+    total_amount[rows] = np.round(items_total * 0.9, 2)
+    due_date[rows] = invoice_date[rows] + rng.choice([1, 2, 60, 90], size=len(rows)).astype("timedelta64[D]")
+
+    rows = np.flatnonzero(anomaly_code == 1)  # High Value + Short Due Date
+    total_amount[rows] = np.round(rng.uniform(400000, 1000000, size=len(rows)), 2)
+    due_date[rows] = invoice_date[rows] + rng.integers(1, 4, size=len(rows)).astype("timedelta64[D]")
+
+    rows = np.flatnonzero(anomaly_code == 2)  # Unusual Number of Items
+    items[rows] = _pick_items(rng, rng.integers(UNUSUAL_ITEM_COUNTS[0], UNUSUAL_ITEM_COUNTS[-1] + 1, size=len(rows)), pools)
+
+    rows = np.flatnonzero(anomaly_code == 3)  # Unusual Service for Customer
+    # Jiná kategorie stejného typu transakce: posun o 1..(počet-1) v rámci skupiny
+    for group in (income_categories, expense_categories):
+        group_rows = rows[np.isin(category[rows], group)]
+        position = np.searchsorted(group, category[group_rows])
+        shift = rng.integers(1, len(group), size=len(group_rows))
+        note_category[group_rows] = group[(position + shift) % len(group)]
+
+    # Číslo faktury: dvojčíslí roku + pořadí doplněné na 7 číslic
+    ids = np.arange(start_id, start_id + n, dtype=np.int64)
+    digits = np.maximum(7, np.floor(np.log10(ids)).astype(np.int64) + 1)
+    invoice_id = (year % 100) * 10 ** digits + ids
+
+    invoice_day = invoice_date.astype("datetime64[D]")
+    month_start = invoice_day.astype("datetime64[M]")
+    last_day = (month_start + np.timedelta64(1, "M")).astype("datetime64[D]") - np.timedelta64(1, "D")
+
+    return pd.DataFrame({
+        'invoice_id': invoice_id,
+        'supplier_name': pools["companies"][supplier],
+        'supplier_ico': pools["ico"][supplier],
+        'supplier_dic': pools["dic"][supplier],
+        'supplier_account': pools["account"][supplier],
+        'customer_name': pools["companies"][customer],
+        'customer_ico': pools["ico"][customer],
+        'customer_dic': pools["dic"][customer],
+        'category': pools["category_names"][category],
+        'invoice_date': invoice_date.astype("datetime64[ns]"),
+        'due_date': due_date.astype("datetime64[ns]"),
+        'total_amount': total_amount,
+        'currency': 'CZK',
+        'transaction_type': np.where(is_income, 'Příjmy', 'Výdaje').astype(object),
+        'variable_symbol': rng.integers(0, 10 ** 10, size=n),
+        'note': "Faktura za: " + pools["category_names"][note_category],
+        'items': items,
+        'payment_status': np.where(delay == 0, 'Paid', 'Delayed').astype(object),
+        'delay_days': delay,
+        'payment_date': payment_date.astype("datetime64[ns]"),
+        'is_month_end': invoice_day == last_day,
+        'is_anomaly': is_anomaly,
+        'anomaly_type': np.where(is_anomaly, anomaly_names[np.maximum(anomaly_code, 0)], None),
+    }, columns=COLUMNS)
+
+
+def iter_invoice_chunks(n, chunk_size=1_000_000, seed=None, year=2024):
+    """Postupně generuje n faktur po blocích velikosti chunk_size
+
+    Každý blok má vlastní generátor odvozený ze seedu a pořadí bloku,
+    takže výsledek je reprodukovatelný a bloky na sobě nezávisí.
+
+    Yields:
+    DataFrame: Blok faktur
+    """
+    pools = build_pools(seed)
+    seed_sequence = np.random.SeedSequence(seed)
+    for chunk_index, start in enumerate(range(0, n, chunk_size)):
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        yield generate_invoice_chunk(min(chunk_size, n - start), rng, pools, year=year, start_id=start + 1)
+
+
+def write_invoices(output, n, chunk_size=1_000_000, seed=None, year=2024):
+    """Zapíše n faktur po blocích do Parquet (.parquet) nebo CSV (ostatní přípony)
+
+    Returns:
+    int: Počet zapsaných faktur
+    """
+    output = Path(output)
+    written = 0
+    if output.suffix == ".parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in iter_invoice_chunks(n, chunk_size, seed=seed, year=year):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table)
+                written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        for chunk in iter_invoice_chunks(n, chunk_size, seed=seed, year=year):
+            chunk.to_csv(output, mode="w" if written == 0 else "a", header=written == 0, index=False)
+            written += len(chunk)
+    return written
+
+
+if __name__ == "__main__":
+    import time
+
+    parser = argparse.ArgumentParser(description='Vektorizovaný generátor velkých objemů syntetických faktur')
+    parser.add_argument('--n', type=int, default=1_000_000, help='Počet faktur (výchozí: 1000000)')
+    parser.add_argument('--output', type=str, default="synthetic_invoices.parquet",
+                        help='Výstupní soubor .parquet nebo .csv (výchozí: synthetic_invoices.parquet)')
+    parser.add_argument('--chunk_size', type=int, default=1_000_000, help='Velikost bloku (výchozí: 1000000)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed pro reprodukovatelnost (výchozí: 42)')
+    parser.add_argument('--year', type=int, default=2024, help='Rok vystavení faktur (výchozí: 2024)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = write_invoices(args.output, args.n, chunk_size=args.chunk_size, seed=args.seed, year=args.year)
+    elapsed = time.perf_counter() - start
+    print(f"Vygenerováno {count} faktur do {args.output} za {elapsed:.1f} s ({count / elapsed:,.0f} faktur/s)")
@@ -0,0 +1,421 @@
+"""
+Generátor syntetických faktur (převzato z notebooku synthetic_data.ipynb).
+
+Generování je deterministické – stejný seed vrací stejná data i PDF, takže
+jde použít pro reprodukovatelné benchmarky a testy v libovolném měřítku.
+
+Spuštění (z kořenového adresáře projektu):
+python -m utils.synthetic_data --n 2040 --seed 42 --csv synthetic_project_data.csv --pdf_dir faktury --pdf_count 200
+"""
+
+import io
+import os
+import re
+import random
+import calendar
+import argparse
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+from faker import Faker
+
+# Firmy vystupující v syntetických fakturách
+ALL_COMPANIES = [
+    'IT vývoj s.r.o.', 'IT podpora a.s.', 'IT cloud s.r.o.',
+    'Plyn Servis a.s.', 'Elektřina s.r.o.', 'Voda a Služby s.r.o.',
+    'Personál Services s.r.o.', 'Logistika a.s.', 'Autopark s.r.o.',
+    'PHM distribuce s.r.o.', 'Právo & Partners s.r.o.', 'Poradenství s.r.o.',
+    'Nájem a správa s.r.o.', 'CloudEra a.s.', 'Komunikační Platformy s.r.o.',
+    'Nová Generace IT s.r.o.', 'Bankovnictví a.s.', 'Finanční Group s.r.o.',
+    'Technologie s.r.o.', 'AI StartUp s.r.o.', 'Virtuální Kancelář s.r.o.',
+    'FinDoc AI'
+]
+
+OWN_COMPANY = 'FinDoc AI'
+
+# Kategorie transakcí
+CATEGORIES = {
+    'Výdaje': {
+        'IT': ['IT vývoj s.r.o.', 'IT podpora a.s.', 'IT cloud s.r.o.'],
+        'Energie': ['Plyn Servis a.s.', 'Elektřina s.r.o.', 'Voda a Služby s.r.o.'],
+        'Mzdy': ['Personál Services s.r.o.'],
+        'Doprava': ['Logistika a.s.', 'Autopark s.r.o.', 'PHM distribuce s.r.o.'],
+        'Služby': ['Právo & Partners s.r.o.', 'Poradenství s.r.o.', 'Nájem a správa s.r.o.']
+    },
+    'Příjmy': {
+        'SaaS': ['CloudEra a.s.', 'Komunikační Platformy s.r.o.', 'Nová Generace IT s.r.o.'],
+        'Konzultace': ['Bankovnictví a.s.', 'Finanční Group s.r.o.'],
+        'Licence': ['Technologie s.r.o.', 'AI StartUp s.r.o.', 'Virtuální Kancelář s.r.o.']
+    }
+}
+
+INCOME_SHARE = 0.6
+ANOMALY_RATE = 0.09
+ANOMALY_TYPES = {
+    'Items Total Mismatch + Unusual Due Date': 0.35,
+    'High Value + Short Due Date': 0.35,
+    'Unusual Number of Items': 0.2,
+    'Unusual Service for Customer': 0.1,
+}
+
+# Sloupce ve stejném pořadí jako utils/synthetic_project_data.csv
+COLUMNS = [
+    'invoice_id', 'supplier_name', 'supplier_ico', 'supplier_dic', 'supplier_account',
+    'customer_name', 'customer_ico', 'customer_dic', 'category', 'invoice_date', 'due_date',
+    'total_amount', 'currency', 'transaction_type', 'variable_symbol', 'note', 'items',
+    'payment_status', 'delay_days', 'payment_date', 'is_month_end', 'is_anomaly', 'anomaly_type'
+]
+
+# Dvojice (běžný, tučný) font s podporou české diakritiky – macOS, Linux, Windows
+FONT_CANDIDATES = [
+    ('/System/Library/Fonts/Supplemental/Arial.ttf', '/System/Library/Fonts/Supplemental/Arial Bold.ttf'),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+]
+
+
+def create_firm_info(faker):
+    """Vygeneruje IČO, DIČ a číslo účtu pro každou firmu"""
+    return {
+        company: {
+            'ico': faker.random_int(100000000, 999999999),
+            'dic': f'CZ{faker.random_int(100000000, 999999999)}',
+            'account': faker.iban()
+        }
+        for company in ALL_COMPANIES
+    }
+
+
+def add_anomaly(invoice, is_income, rng, faker):
+    """Vloží do faktury jeden z typů anomálií"""
+    anomaly_type = rng.choices(list(ANOMALY_TYPES), weights=list(ANOMALY_TYPES.values()))[0]
+
+    invoice['is_anomaly'] = True
+    invoice['anomaly_type'] = anomaly_type
+
+    if anomaly_type == 'Items Total Mismatch + Unusual Due Date':
+        invoice['items'] = '; '.join([f"{faker.bs()} ({rng.uniform(100, 10000):.2f} CZK)"
+                                      for _ in range(rng.randint(1, 5))])
+        invoice['total_amount'] = round(sum(float(item.split('(')[1].split(' ')[0])
+                                            for item in invoice['items'].split('; ')) * 0.9, 2)
+        invoice['due_date'] = invoice['invoice_date'] + pd.DateOffset(days=rng.choice([1, 2, 60, 90]))
+
+    elif anomaly_type == 'High Value + Short Due Date':
+        invoice['total_amount'] = round(rng.uniform(400000, 1000000), 2)
+        invoice['due_date'] = invoice['invoice_date'] + pd.DateOffset(days=rng.randint(1, 3))
+
+    elif anomaly_type == 'Unusual Number of Items':
+        invoice['items'] = '; '.join([faker.bs() for _ in range(rng.randint(15, 20))])
+
+    elif anomaly_type == 'Unusual Service for Customer':
+        category_type = 'Příjmy' if is_income else 'Výdaje'
+        current = invoice['note'].split(': ')[1]
+        new_category = rng.choice([c for c in CATEGORIES[category_type] if c != current])
+        invoice['note'] = f"Faktura za: {new_category}"
+
+    return invoice
+
+
+def iter_invoices(n=2040, seed=None, year=2024, start_id=1):
+    """Postupně generuje n syntetických faktur jako slovníky
+
+    Parameters:
+    n (int): Počet faktur
+    seed (int): Seed pro reprodukovatelnost (None = náhodná data)
+    year (int): Rok vystavení faktur
+    start_id (int): Pořadové číslo první faktury
+
+    Yields:
+    dict: Faktura se sloupci podle COLUMNS
+    """
+    rng = random.Random(seed)
+    faker = Faker("cs_CZ")
+    faker.seed_instance(seed)
+    firm_info = create_firm_info(faker)
+
+    for invoice_id in range(start_id, start_id + n):
+        # Základní parametry
+        is_income = rng.random() < INCOME_SHARE
+        category_type = 'Příjmy' if is_income else 'Výdaje'
+        category = rng.choice(list(CATEGORIES[category_type]))
+        company = rng.choice(CATEGORIES[category_type][category])
+
+        # Dodavatel a odběratel
+        supplier_name = OWN_COMPANY if is_income else company
+        customer_name = company if is_income else OWN_COMPANY
+
+        invoice_date = pd.Timestamp(faker.date_between(start_date=date(year, 1, 1), end_date=date(year, 12, 31)))
+
+        invoice = {
+            'invoice_id': f"{year % 100:02d}{invoice_id:07d}",
+            'supplier_name': supplier_name,
+            'supplier_ico': firm_info[supplier_name]['ico'],
+            'supplier_dic': firm_info[supplier_name]['dic'],
+            'supplier_account': firm_info[supplier_name]['account'],
+            'customer_name': customer_name,
+            'customer_ico': firm_info[customer_name]['ico'],
+            'customer_dic': firm_info[customer_name]['dic'],
+            'category': category,
+            'invoice_date': invoice_date,
+            'due_date': invoice_date + pd.Timedelta(days=rng.randint(7, 30)),
+            'total_amount': round(rng.uniform(500, 500000), 2),
+            'currency': 'CZK',
+            'transaction_type': 'Příjmy' if supplier_name == OWN_COMPANY else 'Výdaje',
+            'variable_symbol': faker.random_number(digits=10),
+            'note': f"Faktura za: {category}",
+            'items': '; '.join([faker.bs() for _ in range(rng.randint(1, 5))]),
+            'payment_status': None,
+            'delay_days': None,
+            'payment_date': None,
+            'is_month_end': None,
+            'is_anomaly': False,
+            'anomaly_type': None
+        }
+
+        # Zpoždění platby
+        delay = rng.choice([0, rng.randint(1, 90)])
+        invoice['delay_days'] = delay
+        invoice['payment_date'] = invoice['due_date'] + pd.Timedelta(days=delay)
+        invoice['payment_status'] = 'Paid' if delay == 0 else 'Delayed'
+
+        # Určení, zda se jedná o poslední den měsíce
+        last_day_of_month = calendar.monthrange(invoice_date.year, invoice_date.month)[1]
+        invoice['is_month_end'] = invoice_date.day == last_day_of_month
+
+        # Generování anomálií
+        if rng.random() < ANOMALY_RATE:
+            invoice = add_anomaly(invoice, is_income, rng, faker)
+
+        yield invoice
+
+
+def generate_invoices(n=2040, seed=None, year=2024):
+    """Vygeneruje n syntetických faktur jako DataFrame (schéma synthetic_project_data.csv)"""
+    return pd.DataFrame(list(iter_invoices(n, seed=seed, year=year)), columns=COLUMNS)
+
+
+def to_extracted_frame(df):
+    """Převede faktury na tvar výstupu create_invoice_dataframe (vstup pro preprocess_data)
+
+    Odpovídá tomu, co vznikne vykreslením faktur do PDF a jejich zpětnou
+    extrakcí, jen bez časově náročného průchodu přes PDF.
+    """
+    note = df['note'].str.replace('Faktura za: ', '', regex=False)
+    invoice_date = pd.to_datetime(df['invoice_date'])
+    return pd.DataFrame({
+        'invoice_id': df['invoice_id'].astype(str),
+        'supplier_name': df['supplier_name'],
+        'supplier_ico': df['supplier_ico'].astype(str),
+        'supplier_dic': df['supplier_dic'],
+        'supplier_account': df['supplier_account'],
+        'customer_name': df['customer_name'],
+        'customer_ico': df['customer_ico'].astype(str),
+        'customer_dic': df['customer_dic'],
+        'invoice_date': invoice_date,
+        'due_date': pd.to_datetime(df['due_date']),
+        'variable_symbol': df['variable_symbol'].astype(str),
+        'items_count': df['items'].str.count('; ') + 1,
+        'category': note,
+        'transaction_type': df['transaction_type'],
+        'note': note,
+        'total_amount': df['total_amount'].map('{:.2f}'.format),
+        # Stejně jako is_month_end_or_two_days_before v entity_extractor
+        'is_month_end': invoice_date.dt.days_in_month - invoice_date.dt.day <= 2,
+    })
+
+
+def register_fonts(regular=None, bold=None):
+    """Zaregistruje fonty 'Arial' a 'Arial-Bold' pro ReportLab
+
+    Bez zadaných cest se použije první dostupná dvojice z FONT_CANDIDATES.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if 'Arial' in pdfmetrics.getRegisteredFontNames() and regular is None:
+        return
+    if regular is None:
+        for candidate_regular, candidate_bold in FONT_CANDIDATES:
+            if os.path.exists(candidate_regular) and os.path.exists(candidate_bold):
+                regular, bold = candidate_regular, candidate_bold
+                break
+        else:
+            raise FileNotFoundError("Nebyl nalezen žádný font s českou diakritikou, zadejte cestu k TTF fontu")
+    pdfmetrics.registerFont(TTFont('Arial', regular))
+    pdfmetrics.registerFont(TTFont('Arial-Bold', bold or regular))
+
+
+def parse_item_and_amount(item):
+    """
+    Rozdělí položku na popis a částku (pokud je uvedena v závorce)
+    """
+    match = re.search(r'\((.*?)\s*CZK\)', item)
+    if match:
+        amount_str = match.group(1).replace(',', '.').replace(' ', '')
+        amount = float(amount_str)
+        desc = re.sub(r'\s*\(.*?\)\s*', '', item).strip()
+        return desc, amount
+    return item.strip(), None
+
+
+def distribute_amounts(n, total, rng=random):
+    """
+    Rozdělí celkovou částku na n náhodných částek (součet je total)
+    """
+    if n == 0:
+        return []
+    amounts = [rng.uniform(100, 5000) for _ in range(n)]
+    total_generated = sum(amounts)
+    return [round(amount * total / total_generated, 2) for amount in amounts]
+
+
+def render_invoice_pdf(invoice, output=None, rng=random):
+    """Vykreslí fakturu do PDF
+
+    Parameters:
+    invoice: Řádek faktury (dict nebo pandas Series)
+    output: Cesta nebo file-like objekt; bez zadání se PDF vrátí jako bytes
+    rng: Zdroj náhody pro dopočet částek položek bez ceny
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    register_fonts()
+    buffer = io.BytesIO() if output is None else None
+    # invariant=1 vynechá čas vytvoření a náhodné ID – stejný vstup dá stejné PDF
+    c = canvas.Canvas(buffer if output is None else str(output), pagesize=A4, invariant=1)
+    y_position = 800  # Počáteční Y pozice
+
+    # Záhlaví
+    c.setFont("Arial-Bold", 16)
+    c.drawString(50, y_position, "FAKTURA - DAŇOVÝ DOKLAD")
+    y_position -= 30
+
+    # Číslo faktury
+    c.setFont("Arial-Bold", 12)
+    c.drawString(50, y_position, f"Číslo faktury: {invoice['invoice_id']}")
+    y_position -= 40
+
+    # Dodavatel
+    c.setFont("Arial-Bold", 12)
+    c.drawString(50, y_position, "Dodavatel:")
+    c.setFont("Arial", 10)
+    y_position -= 15
+    c.drawString(50, y_position, invoice['supplier_name'])
+    y_position -= 15
+    c.drawString(50, y_position, f"IČO: {invoice['supplier_ico']}")
+    y_position -= 15
+    c.drawString(50, y_position, f"DIČ: {invoice['supplier_dic']}")
+    y_position -= 15
+    c.drawString(50, y_position, f"Č. účtu: {invoice['supplier_account']}")
+    y_position -= 40
+
+    # Odběratel
+    c.setFont("Arial-Bold", 12)
+    c.drawString(50, y_position, "Odběratel:")
+    c.setFont("Arial", 10)
+    y_position -= 15
+    c.drawString(50, y_position, invoice['customer_name'])
+    y_position -= 15
+    c.drawString(50, y_position, f"IČO: {invoice['customer_ico']}")
+    y_position -= 15
+    c.drawString(50, y_position, f"DIČ: {invoice['customer_dic']}")
+    y_position -= 40
+
+    # Detaily fakturace
+    c.setFont("Arial-Bold", 12)
+    c.drawString(50, y_position, "Detaily fakturace:")
+    c.setFont("Arial", 10)
+    y_position -= 15
+    c.drawString(50, y_position, f"Variabilní symbol: {invoice['variable_symbol']}")
+    y_position -= 15
+    c.drawString(50, y_position, f"Datum vystavení: {pd.to_datetime(invoice['invoice_date']).strftime('%d.%m.%Y')}")
+    y_position -= 15
+    c.drawString(50, y_position, f"Datum splatnosti: {pd.to_datetime(invoice['due_date']).strftime('%d.%m.%Y')}")
+    y_position -= 40
+
+    # Tabulka položek
+    c.setFont("Arial", 10)
+    c.drawString(50, y_position, f"{invoice['note']}")
+    y_position -= 20
+
+    # Zpracování položek
+    parsed_items = [parse_item_and_amount(item) for item in invoice['items'].split('; ')]
+
+    # Rozdělení na položky s a bez částek
+    items_with_amount = [(desc, amt) for desc, amt in parsed_items if amt is not None]
+    items_without_amount = [desc for desc, amt in parsed_items if amt is None]
+
+    # Generování částek
+    generated_amounts = []
+    if items_without_amount:
+        if items_with_amount:
+            generated_amounts = [rng.uniform(100, 5000) for _ in items_without_amount]
+        else:
+            generated_amounts = distribute_amounts(len(items_without_amount), invoice['total_amount'], rng)
+
+    # Vykreslování položek
+    for desc, amount in items_with_amount + list(zip(items_without_amount, generated_amounts)):
+        c.drawString(50, y_position, desc)
+        c.drawString(400, y_position, f"{amount:.2f} CZK")
+        y_position -= 20
+
+    # Celková částka
+    c.setFont("Arial-Bold", 12)
+    c.drawString(50, y_position - 40, f"Celkem: {invoice['total_amount']:.2f} CZK")
+
+    c.save()
+    return buffer.getvalue() if buffer is not None else None
+
+
+def iter_pdf_invoices(df, num_invoices=None, seed=None):
+    """Postupně vykresluje vzorek faktur do PDF v paměti
+
+    Parameters:
+    df (DataFrame): Faktury ve schématu synthetic_project_data.csv
+    num_invoices (int): Počet faktur k vykreslení (None = všechny)
+    seed (int): Seed pro výběr vzorku a dopočet částek položek
+
+    Yields:
+    tuple: (název souboru, obsah PDF jako bytes)
+    """
+    rng = random.Random(seed)
+    sample = df if num_invoices is None else df.sample(n=num_invoices, random_state=seed)
+    for _, invoice in sample.iterrows():
+        yield f"faktura_{invoice['invoice_id']}.pdf", render_invoice_pdf(invoice, rng=rng)
+
+
+def generate_pdf_invoices(df, output_dir=".", num_invoices=200, seed=None):
+    """Uloží vzorek faktur jako PDF soubory do output_dir a vrátí jejich cesty
+
+    Parameter num_invoices určuje počet faktur k vygenerování (None = všechny).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for file_name, content in iter_pdf_invoices(df, num_invoices=num_invoices, seed=seed):
+        path = output_dir / file_name
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generátor syntetických faktur (CSV a PDF)')
+    parser.add_argument('--n', type=int, default=2040, help='Počet faktur (výchozí: 2040)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed pro reprodukovatelnost (výchozí: 42)')
+    parser.add_argument('--year', type=int, default=2024, help='Rok vystavení faktur (výchozí: 2024)')
+    parser.add_argument('--csv', type=str, default="synthetic_project_data.csv",
+                        help='Výstupní CSV soubor (výchozí: synthetic_project_data.csv)')
+    parser.add_argument('--pdf_dir', type=str, default=None, help='Složka pro PDF faktury (bez zadání se PDF negenerují)')
+    parser.add_argument('--pdf_count', type=int, default=200, help='Počet PDF faktur (výchozí: 200)')
+    args = parser.parse_args()
+
+    invoices = generate_invoices(args.n, seed=args.seed, year=args.year)
+    invoices.to_csv(args.csv, index=False)
+    print(f"Vygenerováno {len(invoices)} faktur do {args.csv}")
+
+    if args.pdf_dir:
+        paths = generate_pdf_invoices(invoices, args.pdf_dir, num_invoices=min(args.pdf_count, len(invoices)), seed=args.seed)
+        print(f"Vygenerováno {len(paths)} PDF faktur do {args.pdf_dir}")